@@ -0,0 +1,152 @@
+"""
+Benchmark of MemsourceAPI bulk workflows against local mock server
+
+usage: python benchmarks/bench_api.py --latency 0.02 --jobs 20
+       python benchmarks/bench_api.py --slow-rate 0.05 --slow-latency 2 --timeout 5 --hedge
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from libmemsource.api import MemsourceAPI, pretranslate_project, check_async_is_complete
+from libmemsource.metrics import MetricsCollector
+from libmemsource.mock_server import MockMemsourceServer
+from libmemsource.resilience import CircuitBreaker, HedgePolicy
+
+def percentile(values, percent):
+    """
+    Get percentile of values
+
+    Args:
+        values (list): numbers
+        percent (float): percentile such as 99
+
+    Returns:
+        float: percentile
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_benchmark(name, func, memsource_api):
+    """
+    Run workflow and measure calls/s, latency and peak memory
+
+    Args:
+        name (str): workflow name
+        func (callable): workflow function
+        memsource_api (MemsourceAPI): memsource_api object with MetricsCollector
+
+    Returns:
+        dict: benchmark result
+    """
+    durations = []
+    def hook(event):
+        if event['event'] == "call":
+            durations.append(event['duration'])
+    memsource_api.metrics.add_hook(hook)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memsource_api.metrics.remove_hook(hook)
+    return {
+        "workflow": name,
+        "calls": len(durations),
+        "seconds": elapsed,
+        "callsPerSecond": len(durations) / elapsed if elapsed else 0.0,
+        "p50": percentile(durations, 50),
+        "p99": percentile(durations, 99),
+        "peakMemory": peak,
+    }
+
+def main():
+    """
+    Run all benchmarks
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=60)
+    parser.add_argument("--jobs", type=int, default=20, help="jobs per project")
+    parser.add_argument("--segments", type=int, default=2000, help="segments per job")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="rate of slow responses")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="seconds added to slow responses")
+    parser.add_argument("--timeout", type=float, help="request timeout of MemsourceAPI")
+    parser.add_argument("--hedge", action="store_true", help="send backup request of slow GET")
+    parser.add_argument("--circuit-breaker", action="store_true", help="fail fast failing endpoints")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    server = MockMemsourceServer(projects=args.projects, jobs_per_project=args.jobs, segments_per_job=args.segments,
+                                 latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                 slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    dest_dir = tempfile.mkdtemp()
+    with server:
+        memsource_api = MemsourceAPI("bench", "bench", metrics=MetricsCollector(), base_url=server.base_url, timeout=args.timeout,
+                                     hedge=HedgePolicy() if args.hedge else None,
+                                     circuit_breaker=CircuitBreaker() if args.circuit_breaker else None)
+        project_uid = next(memsource_api.iter_projects())['uid']
+        jobs = memsource_api.list_jobs(project_uid)
+        job_uids = [job['uid'] for job in jobs['content']]
+        paths = memsource_api.download_mxlf_files(project_uid, job_uids, dest_dir)
+
+        def list_all():
+            for project in memsource_api.iter_projects():
+                memsource_api.list_jobs(project['uid'])
+
+        def segments(workers):
+            return lambda: sum(1 for _ in memsource_api.iter_job_segments(project_uid, job_uids[0], window=200, workers=workers))
+
+        def bilingual_one_by_one():
+            for job_uid in job_uids:
+                memsource_api.download_mxlf_file(project_uid, job_uid)
+
+        def bilingual_batch():
+            memsource_api.download_mxlf_files(project_uid, job_uids, os.path.join(dest_dir, "batch"))
+
+        def upload():
+            for path in paths.values():
+                memsource_api.upload_mxlf_file(path)
+
+        def pretranslate():
+            async_req_id = pretranslate_project(memsource_api, project_uid, jobs)
+            check_async_is_complete(memsource_api, async_req_id)
+
+        benchmarks = [
+            ("list projects and jobs", list_all),
+            ("segments (1 worker)", segments(1)),
+            (f"segments ({args.workers} workers)", segments(args.workers)),
+            ("bilingual download one by one", bilingual_one_by_one),
+            ("bilingual download batch", bilingual_batch),
+            ("bilingual upload", upload),
+            ("pretranslate and wait", pretranslate),
+        ]
+        results = [run_benchmark(name, func, memsource_api) for name, func in benchmarks]
+    shutil.rmtree(dest_dir)
+
+    if args.json:
+        print(json.dumps(results, indent=1))
+        return
+    print(f"{'workflow':<32}{'calls':>7}{'sec':>9}{'calls/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'peak KiB':>10}")
+    for result in results:
+        print(f"{result['workflow']:<32}{result['calls']:>7}{result['seconds']:>9.3f}{result['callsPerSecond']:>10.1f}"
+              f"{result['p50'] * 1000:>9.1f}{result['p99'] * 1000:>9.1f}{result['peakMemory'] / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark of Mxliff parse and write
+
+usage: python benchmarks/bench_mxliff.py --sizes 1000 10000 --save baseline.json
+       python benchmarks/bench_mxliff.py --sizes 1000 10000 --baseline baseline.json --threshold 1.2
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from libmemsource.mxliff import Mxliff, create_trans_unit, iter_trans_units
+from mxliff_corpus import generate_mxliff
+
+def measure(func, repeat, setup=None):
+    """
+    Measure best time and peak memory
+
+    Args:
+        func (callable): function to measure
+        repeat (int): repeat count. the best time is used
+        setup (callable, optional): Defaults to None. function creating argument of func. not measured
+
+    Returns:
+        tuple: (seconds, peak memory bytes)
+    """
+    best = None
+    for _ in range(repeat):
+        args = [setup()] if setup else []
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    args = [setup()] if setup else []
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def bench_file(path, repeat):
+    """
+    Run benchmarks of a mxliff file
+
+    Args:
+        path (str): mxliff path
+        repeat (int): repeat count
+
+    Returns:
+        dict: phase to (seconds, peak memory bytes)
+    """
+    results = {}
+    results["init"] = measure(lambda: Mxliff(path), repeat)
+
+    mxliff = Mxliff(path)
+    trans_units = [trans_unit for file in mxliff.files for trans_unit in file.trans_units]
+    def set_only_tag_flag():
+        for trans_unit in trans_units:
+            trans_unit.set_only_tag_flag()
+    results["set_only_tag_flag"] = measure(set_only_tag_flag, repeat)
+
+    elements = mxliff.root.findall('xliff:file/xliff:body/xliff:group/xliff:trans-unit', mxliff.namespace)
+    def create_all_trans_units():
+        for element in elements:
+            create_trans_unit(element, mxliff.namespace)
+    results["create_trans_unit"] = measure(create_all_trans_units, repeat)
+    results["iter_trans_units"] = measure(lambda: sum(1 for _ in iter_trans_units(path, metadata=True)), repeat)
+
+    def load_for_write():
+        mxliff = Mxliff(path)
+        mxliff.path = f"{path}.out"
+        return mxliff
+    results["back_to_xlf"] = measure(lambda mxliff: mxliff.back_to_xlf(), repeat, setup=load_for_write)
+    results["rewrite"] = measure(lambda: Mxliff.rewrite(path, f"{path}.out", lambda trans_unit: trans_unit.source.string), repeat)
+    return results
+
+def main():
+    """
+    Run benchmarks and compare with baseline
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="trans units of generated files")
+    parser.add_argument("--tag-density", type=float, default=0.2)
+    parser.add_argument("--nesting-depth", type=int, default=2)
+    parser.add_argument("--marks", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="save results to json file")
+    parser.add_argument("--baseline", help="compare with saved json file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="allowed ratio to baseline time")
+    args = parser.parse_args()
+
+    corpus_dir = tempfile.mkdtemp()
+    results = {}
+    try:
+        for size in args.sizes:
+            path = os.path.join(corpus_dir, f"corpus{size}.mxliff")
+            generate_mxliff(path, trans_units=size, tag_density=args.tag_density,
+                            nesting_depth=args.nesting_depth, marks=args.marks)
+            for phase, (seconds, peak) in bench_file(path, args.repeat).items():
+                results[f"{phase}:{size}"] = {"seconds": seconds, "peakMemory": peak}
+    finally:
+        shutil.rmtree(corpus_dir)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    regressions = []
+    print(f"{'phase:trans units':<28}{'ms':>10}{'peak KiB':>12}{'vs base':>10}")
+    for name, result in results.items():
+        ratio = ""
+        if name in baseline and baseline[name]['seconds']:
+            value = result['seconds'] / baseline[name]['seconds']
+            ratio = f"{value:.2f}x"
+            if value > args.threshold:
+                regressions.append(name)
+        print(f"{name:<28}{result['seconds'] * 1000:>10.1f}{result['peakMemory'] / 1024:>12.0f}{ratio:>10}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as save_file:
+            json.dump(results, save_file, indent=1)
+    if regressions:
+        print(f"Regression: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
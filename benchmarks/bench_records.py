@@ -0,0 +1,182 @@
+"""
+Benchmark of parsing list responses into dicts and into records.
+Responses are pages of PAGE_SIZE objects same as list_projects and list_jobs,
+and all pages of a listing are kept like list_jobs does.
+
+usage: python benchmarks/bench_records.py --pages 1 200 --save baseline.json
+       python benchmarks/bench_records.py --pages 1 200 --baseline baseline.json --threshold 1.2
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from libmemsource.records import JobRecord, ProjectRecord
+
+STATUSES = ("NEW", "ACCEPTED", "COMPLETED", "CANCELLED")
+PAGE_SIZE = 50
+
+def generate_projects(page_number, total_pages):
+    """
+    Generate page of list_projects response body with fields of real responses
+
+    Args:
+        page_number (int): page number
+        total_pages (int): total pages
+
+    Returns:
+        bytes: response body
+    """
+    content = [{
+        "uid": f"p{index:020d}",
+        "internalId": index,
+        "id": str(index),
+        "name": f"Project {index}",
+        "dateCreated": "2024-01-01T00:00:00+0000",
+        "dateModified": "2024-01-02T00:00:00+0000",
+        "domain": {"id": "1", "name": "Domain"},
+        "subDomain": None,
+        "owner": {"firstName": "Owner", "lastName": "Name", "userName": "owner", "email": "owner@example.com",
+                  "role": "ADMIN", "id": "1", "uid": "u1"},
+        "client": {"id": "2", "uid": "c1", "name": "Client"},
+        "sourceLang": "en",
+        "targetLangs": ["de", "fr", "ja"],
+        "references": [],
+        "userRole": "ADMIN",
+        "status": STATUSES[index % len(STATUSES)],
+        "dateDue": None,
+        "note": "",
+    } for index in range(page_number * PAGE_SIZE, (page_number + 1) * PAGE_SIZE)]
+    return json.dumps({"totalElements": total_pages * PAGE_SIZE, "totalPages": total_pages, "pageSize": PAGE_SIZE,
+                       "pageNumber": page_number, "numberOfElements": PAGE_SIZE, "content": content}).encode("utf-8")
+
+def generate_jobs(page_number, total_pages):
+    """
+    Generate page of list_jobs response body with fields of real responses
+
+    Args:
+        page_number (int): page number
+        total_pages (int): total pages
+
+    Returns:
+        bytes: response body
+    """
+    content = [{
+        "uid": f"j{index:020d}",
+        "innerId": str(index + 1),
+        "status": STATUSES[index % len(STATUSES)],
+        "providers": [{"type": "USER", "id": "3", "uid": "u3"}],
+        "targetLang": ("de", "fr", "ja")[index % 3],
+        "workflowLevel": 1,
+        "workflowStep": {"name": "Translation", "id": "4", "uid": "w4", "order": 1, "lqaEnabled": False},
+        "filename": f"file{index}.docx",
+        "dateDue": "2024-02-01T00:00:00+0000",
+        "dateCreated": "2024-01-01T00:00:00+0000",
+        "updateSourceDate": None,
+        "imported": True,
+        "jobAssignedEmailTemplate": None,
+        "notificationIntervalInMinutes": -1,
+        "continuous": False,
+        "sourceFileUid": f"s{index:020d}",
+    } for index in range(page_number * PAGE_SIZE, (page_number + 1) * PAGE_SIZE)]
+    return json.dumps({"totalElements": total_pages * PAGE_SIZE, "totalPages": total_pages, "pageSize": PAGE_SIZE,
+                       "pageNumber": page_number, "numberOfElements": PAGE_SIZE, "content": content}).encode("utf-8")
+
+def parse_dicts(body):
+    """
+    Parse response body same as the default path of MemsourceAPI
+
+    Args:
+        body (bytes): response body
+
+    Returns:
+        dict: json
+    """
+    return json.loads(body.decode("utf-8").split('\n')[0])
+
+def measure(func, repeat):
+    """
+    Measure best time, peak memory while parsing and memory kept by the result
+
+    Args:
+        func (callable): function to measure
+        repeat (int): repeat count. the best time is used
+
+    Returns:
+        tuple: (seconds, peak memory bytes, retained memory bytes)
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+def main():
+    """
+    Run benchmarks and compare with baseline
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 200], help=f"pages of {PAGE_SIZE} objects to parse")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="save results to json file")
+    parser.add_argument("--baseline", help="compare with saved json file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="allowed ratio to baseline time")
+    args = parser.parse_args()
+
+    endpoints = (
+        ("projects", generate_projects, ProjectRecord),
+        ("jobs", generate_jobs, JobRecord),
+    )
+    results = {}
+    for pages in args.pages:
+        for name, generate, record_type in endpoints:
+            bodies = [generate(page_number, pages) for page_number in range(pages)]
+            modes = (
+                ("dict", lambda: [parse_dicts(body) for body in bodies]),
+                ("record", lambda: [record_type.loads(body) for body in bodies]),
+            )
+            for mode, func in modes:
+                seconds, peak, retained = measure(func, args.repeat)
+                results[f"{name}:{mode}:{pages * PAGE_SIZE}"] = {
+                    "seconds": seconds, "peakMemory": peak, "retainedMemory": retained}
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    regressions = []
+    print(f"{'endpoint:mode:objects':<28}{'ms':>10}{'peak KiB':>12}{'kept KiB':>12}{'vs base':>10}")
+    for name, result in results.items():
+        ratio = ""
+        if name in baseline and baseline[name]['seconds']:
+            value = result['seconds'] / baseline[name]['seconds']
+            ratio = f"{value:.2f}x"
+            if value > args.threshold:
+                regressions.append(name)
+        print(f"{name:<28}{result['seconds'] * 1000:>10.1f}{result['peakMemory'] / 1024:>12.0f}"
+              f"{result['retainedMemory'] / 1024:>12.0f}{ratio:>10}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as save_file:
+            json.dump(results, save_file, indent=1)
+    if regressions:
+        print(f"Regression: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
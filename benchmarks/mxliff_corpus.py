@@ -0,0 +1,100 @@
+"""
+Synthetic mxliff generator for benchmarks
+
+usage: python benchmarks/mxliff_corpus.py out_dir --trans-units 10000 --count 3
+"""
+import argparse
+import os
+import random
+
+WORDS = ("memsource", "translation", "segment", "quality", "project", "language", "file", "target",
+         "source", "workflow", "review", "glossary", "match", "editor", "vendor", "deadline")
+
+def create_text(rand, tag_density, nesting_depth, tag_counter, depth=0):
+    """
+    Create source text with placeholder tags {N} and format tags {N&gt;...&lt;N}
+
+    Args:
+        rand (random.Random): random generator
+        tag_density (float): rate of words followed by tag
+        nesting_depth (int): max nesting depth of format tags
+        tag_counter (list): one element list of next tag number
+        depth (int, optional): Defaults to 0. current nesting depth
+
+    Returns:
+        str: escaped xml text
+    """
+    parts = []
+    for _ in range(rand.randint(3, 12)):
+        parts.append(rand.choice(WORDS))
+        if rand.random() < tag_density:
+            tag_counter[0] = tag_counter[0] + 1
+            number = tag_counter[0]
+            if depth < nesting_depth and rand.random() < 0.5:
+                inner = create_text(rand, tag_density / 2, nesting_depth, tag_counter, depth + 1)
+                parts.append(f"{{{number}&gt;{inner}&lt;{number}}}")
+            else:
+                parts.append(f"{{{number}}}")
+    return " ".join(parts)
+
+def generate_mxliff(path, trans_units=1000, files=1, tag_density=0.2, nesting_depth=2, marks=2, only_tag_rate=0.05, seed=0):
+    """
+    Generate mxliff file
+
+    Args:
+        path (str): output path
+        trans_units (int, optional): Defaults to 1000. trans units in each <file>
+        files (int, optional): Defaults to 1. <file> elements
+        tag_density (float, optional): Defaults to 0.2. rate of words followed by tag
+        nesting_depth (int, optional): Defaults to 2. max nesting depth of format tags
+        marks (int, optional): Defaults to 2. metadata marks in each trans unit
+        only_tag_rate (float, optional): Defaults to 0.05. rate of trans units having only tags
+        seed (int, optional): Defaults to 0. random seed
+    """
+    rand = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as mxliff:
+        mxliff.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" '
+                     'xmlns:m="http://www.memsource.com/mxlf/2.0" version="1.2">\n')
+        for file_index in range(files):
+            mxliff.write(f'<file original="file{file_index}.docx" source-language="en" target-language="ja" '
+                         f'datatype="x-undefined" m:job-uid="job{seed:04d}{file_index:04d}" m:level="1">\n<body>\n')
+            for unit_index in range(trans_units):
+                tag_counter = [0]
+                if rand.random() < only_tag_rate:
+                    source = "{1}"
+                else:
+                    source = create_text(rand, tag_density, nesting_depth, tag_counter)
+                target = source if rand.random() < 0.5 else ""
+                mark_elements = "".join(
+                    f'<m:mark id="{mark}"><m:type>code</m:type><m:content>&lt;b id="{mark}"&gt;</m:content></m:mark>'
+                    for mark in range(1, marks + 1))
+                mxliff.write(f'<group id="{unit_index}" m:para-id="{unit_index}">'
+                             f'<trans-unit id="{file_index}:{unit_index}" xml:space="preserve" m:confirmed="0" m:locked="false">'
+                             f'<source>{source}</source><target>{target}</target>'
+                             f'<m:tunit-metadata>{mark_elements}</m:tunit-metadata>'
+                             '</trans-unit></group>\n')
+            mxliff.write('</body>\n</file>\n')
+        mxliff.write('</xliff>\n')
+
+def main():
+    """
+    Generate mxliff corpus
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=1, help="number of mxliff files")
+    parser.add_argument("--trans-units", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=1, help="<file> elements in each mxliff")
+    parser.add_argument("--tag-density", type=float, default=0.2)
+    parser.add_argument("--nesting-depth", type=int, default=2)
+    parser.add_argument("--marks", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(args.out_dir, exist_ok=True)
+    for index in range(args.count):
+        generate_mxliff(os.path.join(args.out_dir, f"corpus{index}.mxliff"), args.trans_units, args.files,
+                        args.tag_density, args.nesting_depth, args.marks, seed=args.seed + index)
+
+if __name__ == "__main__":
+    main()
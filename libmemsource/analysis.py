@@ -0,0 +1,316 @@
+"""
+This modules is to read memsource analysis csv without keeping the whole text in memory
+"""
+import codecs
+import csv
+import tempfile
+from array import array
+
+ANALYSIS_DELIMITER = ';'
+SPOOL_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+HEADER_FIRST_CELLS = ("File", "Job", "Filename", "File name")
+TOTAL_FIRST_CELLS = ("Total", "Sum")
+
+def parse_number(value):
+    """
+    Parse number cell of analysis csv
+
+    Args:
+        value (str): cell such as "1234", "12.5" or "95%"
+
+    Returns:
+        float: number. empty or invalid cell is 0.0
+    """
+    value = value.strip().rstrip('%').replace(',', '')
+    if value == "":
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+class AnalysisRecord():
+    """
+    Object of one file row in analysis
+
+    Args:
+        file (str): file name
+        job_uid (str or None): job uid if the analysis has job uid column
+        values (array): numbers in the order of AnalysisReader.columns
+    """
+    __slots__ = ('file', 'job_uid', 'values')
+
+    def __init__(self, file, job_uid, values):
+        self.file = file
+        self.job_uid = job_uid
+        self.values = values
+
+    @property
+    def key(self):
+        """
+        Job uid or file name if job uid is not available
+
+        Returns:
+            str: key of record
+        """
+        return self.job_uid or self.file
+
+class AnalysisReader():
+    """
+    Object reading analysis csv row by row.
+    The csv has band header row ("File";...;"Repetitions";;;"100%";...)
+    and optional measure header row (;;;"Segments";"Words";"Characters";...).
+
+    Args:
+        stream (file object): text file object of analysis csv
+        delimiter (str, optional): Defaults to ANALYSIS_DELIMITER. csv delimiter
+    """
+
+    def __init__(self, stream, delimiter=ANALYSIS_DELIMITER):
+        self.rows = csv.reader(stream, delimiter=delimiter)
+        self.info = {}
+        self.columns = []
+        self.numeric_indexes = []
+        self.job_uid_index = None
+        self.__pending_row = None
+        self.__read_header()
+
+    def __read_header(self):
+        """
+        Read analysis information rows and header rows
+        """
+        band_row = None
+        for row in self.rows:
+            if row and row[0].strip() in HEADER_FIRST_CELLS:
+                band_row = row
+                break
+            if len(row) >= 2 and row[0].strip():
+                self.info[row[0].strip()] = row[1].strip()
+        if band_row is None:
+            return
+
+        measure_row = next(self.rows, None)
+        if measure_row is not None and measure_row and measure_row[0].strip():
+            # no measure row. the row is data
+            self.__pending_row = measure_row
+            measure_row = None
+
+        band = ""
+        for index, cell in enumerate(band_row):
+            cell = cell.strip()
+            if cell:
+                band = cell
+            measure = measure_row[index].strip() if measure_row is not None and index < len(measure_row) else ""
+            if measure_row is not None:
+                if measure == "":
+                    self.__set_info_column(index, band)
+                    continue
+                self.columns.append((band, measure))
+            else:
+                if index == 0 or cell == "" or "job" in cell.lower():
+                    self.__set_info_column(index, cell)
+                    continue
+                self.columns.append((cell, ""))
+            self.numeric_indexes.append(index)
+
+    def __set_info_column(self, index, name):
+        name = name.lower()
+        if "job" in name and ("uid" in name or "id" in name):
+            self.job_uid_index = index
+
+    def __iter__(self):
+        rows = self.rows
+        if self.__pending_row is not None:
+            rows = self.__chain_pending(rows)
+        numeric_indexes = self.numeric_indexes
+        job_uid_index = self.job_uid_index
+        for row in rows:
+            if not row or not row[0].strip():
+                # blank row ends file rows
+                break
+            if row[0].strip() in TOTAL_FIRST_CELLS:
+                continue
+            values = array('d', [parse_number(row[index]) if index < len(row) else 0.0 for index in numeric_indexes])
+            job_uid = row[job_uid_index].strip() if job_uid_index is not None and job_uid_index < len(row) else None
+            yield AnalysisRecord(row[0].strip(), job_uid, values)
+
+    def __chain_pending(self, rows):
+        pending_row = self.__pending_row
+        self.__pending_row = None
+        yield pending_row
+        yield from rows
+
+    def to_table(self):
+        """
+        Read all rows to columnar table
+
+        Returns:
+            AnalysisTable: analysis table
+        """
+        table = AnalysisTable(self.columns)
+        for record in self:
+            table.append(record)
+        return table
+
+class AnalysisTable():
+    """
+    Object of analysis numbers stored as column arrays
+
+    Args:
+        columns (list): (band, measure) tuples such as ("100%", "Words")
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.keys = []
+        self.data = [array('d') for _ in self.columns]
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def bands(self):
+        """
+        Bands in column order
+
+        Returns:
+            list: band names such as "Repetitions" and "100%"
+        """
+        return list(dict.fromkeys(band for band, _ in self.columns))
+
+    def append(self, record):
+        """
+        Add record
+
+        Args:
+            record (AnalysisRecord): file row of analysis
+        """
+        self.keys.append(record.key)
+        for column, value in zip(self.data, record.values):
+            column.append(value)
+
+    def extend(self, table):
+        """
+        Add all rows of other table, e.g. analysis of other project. missing columns are filled with 0
+
+        Args:
+            table (AnalysisTable): analysis table
+        """
+        for column in table.columns:
+            if column not in self.index:
+                self.index[column] = len(self.columns)
+                self.columns.append(column)
+                self.data.append(array('d', bytes(8 * len(self.keys))))
+        for column, values in zip(self.columns, self.data):
+            if column in table.index:
+                values.extend(table.data[table.index[column]])
+            else:
+                values.extend(array('d', bytes(8 * len(table.keys))))
+        self.keys.extend(table.keys)
+
+    def column(self, band, measure):
+        """
+        Get column array
+
+        Args:
+            band (str): band such as "100%"
+            measure (str): measure such as "Words"
+
+        Returns:
+            array: numbers of all rows
+        """
+        return self.data[self.index[(band, measure)]]
+
+    def total(self, measure="Words"):
+        """
+        Sum of all rows per band
+
+        Args:
+            measure (str, optional): Defaults to "Words". measure to sum
+
+        Returns:
+            dict: band to sum
+        """
+        return {band: sum(self.data[i]) for i, (band, column_measure) in enumerate(self.columns) if column_measure == measure}
+
+    def by_job(self, measure="Words"):
+        """
+        Sum per job (or file if job uid is not available) and band
+
+        Args:
+            measure (str, optional): Defaults to "Words". measure to sum
+
+        Returns:
+            dict: job uid to dict of band to sum
+        """
+        indexes = [(band, self.data[i]) for i, (band, column_measure) in enumerate(self.columns) if column_measure == measure]
+        result = {}
+        for row, key in enumerate(self.keys):
+            bands = result.setdefault(key, dict.fromkeys((band for band, _ in indexes), 0.0))
+            for band, values in indexes:
+                bands[band] = bands[band] + values[row]
+        return result
+
+def iter_csv_lines(reader, chunk_size=READ_CHUNK_SIZE):
+    """
+    Split text into lines for csv.reader same as open(newline="").
+    Iterating codecs.StreamReader splits lines at unicode line breaks such as U+2028 in cells too
+
+    Args:
+        reader (codecs.StreamReader): text reader
+        chunk_size (int, optional): Defaults to READ_CHUNK_SIZE. characters read at once
+
+    Yields:
+        str: line with "\n". "\r" is handled by csv.reader
+    """
+    rest = ""
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if rest:
+        yield rest
+
+def read_analysis(memsource_api, analysis_id, log_format="CSV_EXTENDED"):
+    """
+    Download analysis and read it to table. the csv is spooled to temporary file if it is large
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        analysis_id (int): analysis ID
+        log_format (str, optional): Defaults to "CSV_EXTENDED". Enum: "CSV" "CSV_EXTENDED"
+
+    Returns:
+        AnalysisTable: analysis table
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        memsource_api.download_analysis(analysis_id, log_format, stream=spool)
+        spool.seek(0)
+        return AnalysisReader(iter_csv_lines(codecs.getreader("utf-8-sig")(spool))).to_table()
+
+def read_analyses(memsource_api, analysis_ids, log_format="CSV_EXTENDED"):
+    """
+    Download analyses and read them to one table, e.g. for cross project report
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        analysis_ids (list): analysis IDs
+        log_format (str, optional): Defaults to "CSV_EXTENDED". Enum: "CSV" "CSV_EXTENDED"
+
+    Returns:
+        AnalysisTable: analysis table
+    """
+    table = None
+    for analysis_id in analysis_ids:
+        analysis_table = read_analysis(memsource_api, analysis_id, log_format)
+        if table is None:
+            table = analysis_table
+        else:
+            table.extend(analysis_table)
+    return table
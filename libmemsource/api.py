@@ -2,19 +2,53 @@
 This modules is to handle memsource using API
 """
 import urllib.request
+import gzip
 import json
+import logging
 import os
+import re
+import socket
 import ssl
+import tempfile
+import zipfile
 import copy
-from datetime import date
+import contextlib
+import mmap
+import collections
+import itertools
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime, timedelta, timezone
 from retry import retry
+from retry.api import retry_call
+from .token_cache import parse_expires
+from .metrics import endpoint_name, body_size
+from .project_index import ProjectIndex
+from .records import JobRecord, ProjectRecord
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://cloud.memsource.com/web/api2"
+
+COPY_CHUNK_SIZE = 1024 * 1024
+MXLF_HEADER_SIZE = 64 * 1024
+MXLF_JOB_UID_PATTERN = re.compile(rb'm:job-uid="([^"]*)"')
+SAFE_UID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
 class APIException(Exception):
     """API Exception"""
     def __init__(self, message):
         self.message = message
+class CircuitOpenException(APIException):
+    """Circuit Open Exception"""
+class ServerErrorException(APIException):
+    """Server Error Exception. HTTP status code is 5xx"""
+class RequestNotSentException(APIException):
+    """Request Not Sent Exception. connection failed before the request was sent"""
 class ProjectIDException(Exception):
     """Project ID Execption"""
     def __init__(self, message):
@@ -31,15 +65,40 @@ class MemsourceAPI:
     Args:
         username (str): Memsoruce username
         password (str): Memsoruce password
+        token_cache (obj, optional): Defaults to None. token cache object such as FileTokenCache.
+                                     login is skipped when the cache has a valid token
+        refresh_margin (int, optional): Defaults to 300. seconds before expiry to login again
+        metrics (MetricsCollector, optional): Defaults to None. collector of per endpoint metrics
+        base_url (str, optional): Defaults to DEFAULT_BASE_URL. base url of API, e.g. local mock server
+        timeout (float, optional): Defaults to None. seconds to wait connection and each read of response. no timeout if None
+        hedge (HedgePolicy, optional): Defaults to None. send backup request of GET without stream when the response is slow
+        circuit_breaker (CircuitBreaker, optional): Defaults to None. fail fast calls to endpoints failing continuously
+        compress_uploads (bool, optional): Defaults to False. send uploaded files gzip compressed with Content-Encoding header
+        rate_limiter (TokenBucket, optional): Defaults to None. object with acquire() and try_acquire() taking a token per API call,
+                                              such as SharedTokenBucket shared by processes
     """
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, token_cache=None, refresh_margin=300, metrics=None, base_url=DEFAULT_BASE_URL,
+                 timeout=None, hedge=None, circuit_breaker=None, compress_uploads=False, rate_limiter=None):
         self.username = username
         self.password = password
+        self.base_url = base_url.rstrip('/')
         self.token = ""
+        self.token_expires = None
+        self.token_cache = token_cache
+        self.refresh_margin = timedelta(seconds=refresh_margin)
         self.api_calls = 0
-        result = self.__get_token()
-        self.token = result['token']
+        self.metrics = metrics
+        self.timeout = timeout
+        self.hedge = hedge
+        self.circuit_breaker = circuit_breaker
+        self.compress_uploads = compress_uploads
+        self.rate_limiter = rate_limiter
+        self.__token_lock = threading.Lock()
+        self.__calls_lock = threading.Lock()
+        self.__backup_slots = None if hedge is None else threading.BoundedSemaphore(hedge.max_workers)
+        if not self.__load_cached_token():
+            self.__login()
 
     def __get_token(self):
         """
@@ -49,15 +108,82 @@ class MemsourceAPI:
             str: Memsource token
         """
 
-        url = "https://cloud.memsource.com/web/api2/v1/auth/login"
+        url = f"{self.base_url}/v1/auth/login"
         headers = {"Content-Type" : "application/json"}
         obj = {"userName" : self.username, "password" : self.password}
 
-        print('Loging to Memsource...')
-        result = self.__call_rest(url, "POST", body=obj, headers=headers)
+        logger.info('Loging to Memsource...', extra={'uid': self.username})
+        result = self.__call_rest(url, "POST", body=obj, headers=headers, auth=False)
         return result
 
-    def __call_rest(self, url, method, body=None, params=None, headers=None):
+    def __login(self):
+        """
+        Login to Memsource and store the token to token cache
+        """
+        result = self.__get_token()
+        self.token = result['token']
+        self.token_expires = parse_expires(result.get('expires'))
+        if self.token_cache is not None:
+            self.token_cache.save(self.__token_cache_key(), self.token, self.token_expires)
+
+    def __load_cached_token(self):
+        """
+        Load token from token cache
+
+        Returns:
+            bool: True if valid token is loaded
+        """
+        if self.token_cache is None:
+            return False
+        cached = self.token_cache.load(self.__token_cache_key())
+        if cached is None:
+            return False
+        token, expires = cached
+        if expires is not None and self.__is_expiring(expires):
+            return False
+        self.token = token
+        self.token_expires = expires
+        return True
+
+    def __token_cache_key(self):
+        """
+        Get key of token cache. tokens of other servers such as mock server are cached separately
+
+        Returns:
+            str: username or base url and username
+        """
+        if self.base_url == DEFAULT_BASE_URL:
+            return self.username
+        return f"{self.base_url} {self.username}"
+
+    def __is_expiring(self, expires):
+        """
+        Check token expires within refresh margin
+
+        Args:
+            expires (datetime): expiry of token
+
+        Returns:
+            bool: True if token should be refreshed
+        """
+        return expires - self.refresh_margin <= datetime.now(timezone.utc)
+
+    def __refresh_token(self, expired_token=None):
+        """
+        Login again if the token is expiring or rejected
+
+        Args:
+            expired_token (str, optional): Defaults to None. token rejected by Memsource
+        """
+        with self.__token_lock:
+            # another thread already refreshed the token
+            if expired_token is not None and self.token != expired_token:
+                return
+            if expired_token is None and (self.token_expires is None or not self.__is_expiring(self.token_expires)):
+                return
+            self.__login()
+
+    def __call_rest(self, url, method, body=None, params=None, headers=None, auth=True, stream=None, compress=False, record_type=None):
         """
         Call REST using urllib.request
 
@@ -67,16 +193,26 @@ class MemsourceAPI:
             body (dict or something, optional): Defaults to None. request body
             params (dict, optional): Defaults to None. query paramaeters
             headers (dict, optional): Defaults to None. request headers
+            auth (bool, optional): Defaults to True. send token and login again when token is expired
+            stream (file object, optional): Defaults to None. binary file object to write response body in chunks
+            compress (bool, optional): Defaults to False. body can be gzip compressed if compress_uploads is enabled
+            record_type (type, optional): Defaults to None. Record class. json objects of the record are parsed into records
 
         Returns:
-            json or str: If response content type is json, return json. else if octet-stream return response body as str.
+            json or str or int: If response content type is json, return json. else if octet-stream return response body as str.
+                                If stream is given, return written bytes.
         """
         if params is None:
             params = {}
         if headers is None:
-            headers = {'Authorization' : f'ApiToken {self.token}'}
-        else:
-            headers['Authorization'] = f'ApiToken {self.token}'
+            headers = {}
+        headers.setdefault('Accept-Encoding', 'gzip, deflate')
+        if compress and self.compress_uploads and body is not None:
+            with gzip_upload_body(body) as compressed:
+                headers = dict(headers)
+                headers['Content-Encoding'] = 'gzip'
+                headers['Content-Length'] = str(os.fstat(compressed.fileno()).st_size)
+                return self.__call_rest(url, method, compressed, params, headers, auth, stream, record_type=record_type)
 
         if isinstance(body, dict):# Convert Python object to JSON
             data = json.dumps(body).encode("utf-8")
@@ -85,40 +221,235 @@ class MemsourceAPI:
         else:
             data = body
 
-        # countup api calls
-        self.api_calls = self.api_calls + 1
+        if auth and self.token_expires is not None:
+            self.__refresh_token()
 
         # Prepare http request then POST
         encoded_param = urllib.parse.urlencode(params)
         req_url = f'{url}?{encoded_param}'
-        request = urllib.request.Request(req_url, data=data, method=method, headers=headers)
+        relogin = auth
+        # hedged request is only sent for idempotent GET without stream
+        hedge = self.hedge if method == "GET" and stream is None else None
+        # endpoint is only needed when metrics, debug log or failure isolation is enabled
+        if (self.metrics is not None or self.circuit_breaker is not None or hedge is not None
+                or logger.isEnabledFor(logging.DEBUG)):
+            endpoint = endpoint_name(method, url)
+        else:
+            endpoint = None
+        while True:
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow(endpoint):
+                raise CircuitOpenException(f'Circuit of "{endpoint}" is open')
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self.__count_call()
+            token = self.token
+            if auth:
+                headers['Authorization'] = f'ApiToken {token}'
+            request = urllib.request.Request(req_url, data=data, method=method, headers=headers)
+            if endpoint is not None:
+                start = time.perf_counter()
+            try:
+                if hedge is not None:
+                    status, result, received = self.__send_hedged(request, endpoint, record_type)
+                else:
+                    status, result, received = self.__send(request, stream, record_type)
+            except urllib.error.HTTPError as err:#If HTTP status code is 4xx or 5xx
+                if self.circuit_breaker is not None:
+                    if err.code >= 500:
+                        self.circuit_breaker.record_failure(endpoint)
+                    else:
+                        self.circuit_breaker.record_success(endpoint)
+                error_body = decode_response(err, err.headers.get('Content-Encoding')).read()
+                if endpoint is not None:
+                    self.__record_call(endpoint, start, data, len(error_body), err.code, err)
+                if err.code == 401 and relogin:# token is expired or revoked
+                    relogin = False
+                    logger.info('Token is rejected. Loging to Memsource again...')
+                    self.__refresh_token(expired_token=token)
+                    if hasattr(data, 'seek'):
+                        data.seek(0)
+                    self.__record_retry(endpoint)
+                    continue
+                exception_type = ServerErrorException if err.code >= 500 else APIException
+                raise exception_type(json.loads(error_body.decode('utf-8')))
+            except (urllib.error.URLError, socket.timeout, ConnectionError) as err:#If HTTP connection is fails or timed out
+                if endpoint is not None:
+                    self.__record_call(endpoint, start, data, 0, None, err)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(endpoint)
+                logger.error('Connection to Memsource failed: %s', err, extra={'endpoint': url})
+                # urlopen raises URLError of these reasons while connecting, so nothing is sent yet
+                if isinstance(err, urllib.error.URLError) and isinstance(err.reason, (ConnectionRefusedError, socket.gaierror)):
+                    raise RequestNotSentException(err)
+                raise APIException(err)
+            except BaseException as err:# e.g. IncompleteRead, broken json, broken compression or error of stream
+                # every call allowed by the circuit breaker must be recorded, or the trial call of half open circuit never ends
+                if endpoint is not None:
+                    self.__record_call(endpoint, start, data, 0, None, err)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(endpoint)
+                raise
+            if endpoint is not None:
+                self.__record_call(endpoint, start, data, received, status)
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success(endpoint)
+            if hedge is not None:
+                hedge.observe(endpoint, time.perf_counter() - start)
+            return result
+
+    def __send(self, request, stream=None, record_type=None):
+        """
+        Send request once
+
+        Args:
+            request (urllib.request.Request): request
+            stream (file object, optional): Defaults to None. binary file object to write response body in chunks
+            record_type (type, optional): Defaults to None. Record class to parse json response
+
+        Returns:
+            tuple: http status code, result and received bytes
+        """
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
+        with urllib.request.urlopen(request, **kwargs) as response:
+            status = response.getcode()
+            body = decode_response(response, response.headers.get('Content-Encoding'))
+            if stream is not None:
+                received = copy_stream(body, stream)
+                return status, received, received
+            content_type = ""
+            response_header = response.getheaders()
+            for head in response_header:
+                if head[0] == "Content-Type":
+                    content_type = head[1]
+                    break
+            raw_body = body.read()
+        if record_type is not None and raw_body and content_type == "application/json":
+            # parse bytes directly without decoding the whole body to str
+            return status, record_type.loads(raw_body), len(raw_body)
+        response_body = raw_body.decode("utf-8")
+        result = None
+        if response_body == "":
+            result = None
+        elif content_type == "application/json":
+            result = json.loads(response_body.split('\n')[0])
+        elif content_type == "application/octet-stream":
+            result = response_body
+        elif content_type == "application/tmx":
+            result = response_body
+        elif content_type == "application/tbx":
+            result = response_body
+        elif content_type == "":
+            result = str(status)
+        return status, result, len(raw_body)
+
+    def __send_hedged(self, request, endpoint, record_type=None):
+        """
+        Send request and send backup request if no response arrives in delay of hedge policy.
+        The first successful response is used
+
+        Args:
+            request (urllib.request.Request): GET request
+            endpoint (str): endpoint name
+            record_type (type, optional): Defaults to None. Record class to parse json response
+
+        Returns:
+            tuple: http status code, result and received bytes
+        """
+        with self.__calls_lock:
+            if self.__backup_slots is None:
+                # hedge is set after __init__
+                self.__backup_slots = threading.BoundedSemaphore(self.hedge.max_workers)
+        delay = self.hedge.delay(endpoint)
+        futures = [self.__start_send(request, record_type)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and not self.__backup_slots.acquire(blocking=False):
+            logger.debug('Skipping backup request of %s. Too many backup requests are running', endpoint, extra={'endpoint': endpoint})
+        elif not done and self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            # backup request is skipped instead of exceeding rate limit
+            self.__backup_slots.release()
+            logger.debug('Skipping backup request of %s by rate limit', endpoint, extra={'endpoint': endpoint})
+        elif not done:
+            logger.debug('Sending backup request of %s after %.3fs', endpoint, delay, extra={'endpoint': endpoint})
+            self.__count_call()
+            self.__record_retry(endpoint)
+            backup = self.__start_send(request, record_type)
+            backup.add_done_callback(lambda _: self.__backup_slots.release())
+            futures.append(backup)
+        error = None
+        for future in as_completed(futures):
+            try:
+                return future.result()
+            except Exception as err:
+                if error is None:
+                    error = err
+        raise error
+
+    def __start_send(self, request, record_type=None):
+        """
+        Send request in a new thread. Each request has its own thread,
+        so slow or hung requests never delay other requests in a queue
+
+        Args:
+            request (urllib.request.Request): request
+            record_type (type, optional): Defaults to None. Record class to parse json response
+
+        Returns:
+            Future: future of result of __send
+        """
+        future = Future()
+
+        def send():
+            try:
+                future.set_result(self.__send(request, None, record_type))
+            except BaseException as err:
+                future.set_exception(err)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=send, daemon=True).start()
+        return future
+
+    def __count_call(self):
+        """
+        Count up api calls. calls are counted from many threads
+        """
+        with self.__calls_lock:
+            self.api_calls = self.api_calls + 1
+
+    def __record_call(self, endpoint, start, data, bytes_received, status, error=None):
+        """
+        Record a call to metrics and debug log
+
+        Args:
+            endpoint (str): endpoint name
+            start (float): time.perf_counter() when the call is started
+            data (bytes or file object): request body
+            bytes_received (int): response body size
+            status (int): http status code
+            error (Exception, optional): Defaults to None. raised exception
+        """
+        duration = time.perf_counter() - start
+        if self.metrics is not None:
+            # failure of metrics must not fail the api call
+            try:
+                self.metrics.record_call(endpoint, duration, body_size(data), bytes_received, status, error)
+            except Exception:
+                logger.warning('Failed to record metrics of %s', endpoint, exc_info=True)
+        logger.debug('%s %s %.3fs', endpoint, status, duration,
+                     extra={'endpoint': endpoint, 'status': status, 'duration': duration})
+
+    def __record_retry(self, endpoint):
+        """
+        Record a retry to metrics
+
+        Args:
+            endpoint (str): endpoint name
+        """
+        if self.metrics is None:
+            return
         try:
-            with urllib.request.urlopen(request) as response:
-                content_type = ""
-                response_header = response.getheaders()
-                for head in response_header:
-                    if head[0] == "Content-Type":
-                        content_type = head[1]
-                        break
-                response_body = response.read().decode("utf-8")
-                if response_body == "":
-                    result = None
-                elif content_type == "application/json":
-                    result = json.loads(response_body.split('\n')[0])
-                elif content_type == "application/octet-stream":
-                    result = response_body
-                elif content_type == "application/tmx":
-                    result = response_body
-                elif content_type == "application/tbx":
-                    result = response_body
-                elif content_type == "":
-                    result = str(response.getcode())
-        except urllib.error.HTTPError as err:#If HTTP status code is 4xx or 5xx
-            raise APIException(json.loads(err.read().decode('utf-8')))
-        except urllib.error.URLError as err:#If HTTP connection is fails
-            print(err)
-            raise APIException(err)
-        return result
+            self.metrics.record_retry(endpoint)
+        except Exception:
+            logger.warning('Failed to record metrics of %s', endpoint, exc_info=True)
 
     def get_termbase(self, termbase_uid):
         """Get termbase
@@ -126,24 +457,25 @@ class MemsourceAPI:
         Args:
             termbase_uid (int): tertmbase uid
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/termBases/{termbase_uid}"
+        url = f"{self.base_url}/v1/termBases/{termbase_uid}"
         params = {}
-        print(f'Getting tb "{termbase_uid}"...')
+        logger.info('Getting tb "%s"...', termbase_uid, extra={'uid': termbase_uid})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
-    def export_termbase(self, termbase_uid, export_format="Tbx"):
+    def export_termbase(self, termbase_uid, export_format="Tbx", stream=None):
         """
         Export termbase
 
         Args:
             termbase_uid (int): termbase uid
             format (str, optional): Tbx, Xlsx. Defaults to "Tbx".
+            stream (file object, optional): Defaults to None. binary file object to write exported file in chunks
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/termBases/{termbase_uid}/export"
+        url = f"{self.base_url}/v1/termBases/{termbase_uid}/export"
         params = {'format': export_format}
-        print(f'Download tb "{termbase_uid}"...')
-        result = self.__call_rest(url, "GET", params=params)
+        logger.info('Download tb "%s"...', termbase_uid, extra={'uid': termbase_uid})
+        result = self.__call_rest(url, "GET", params=params, stream=stream)
         return result
 
     def get_job(self, project_uid, job_uid):
@@ -156,9 +488,9 @@ class MemsourceAPI:
         Returns:
             json: job datails
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/jobs/{job_uid}"
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/{job_uid}"
         params = {}
-        print(f'Getting "{project_uid}:{job_uid}" jobs datals...')
+        logger.info('Getting "%s:%s" jobs datals...', project_uid, job_uid, extra={'uid': job_uid})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
@@ -172,16 +504,16 @@ class MemsourceAPI:
         Returns:
             Obj : async object
         """
-        url = f"https://cloud.memsource.com/web/api2/v2/projects/{project_uid}/jobs/{job_uid}/targetFile"
+        url = f"{self.base_url}/v2/projects/{project_uid}/jobs/{job_uid}/targetFile"
         params = {
             "projectUid": project_uid,
             "jobUid": job_uid,
         }
         result = self.__call_rest(url, "PUT", params=params)
-        print(f"Creating download target file async of {job_uid}...")
+        logger.info('Creating download target file async of %s...', job_uid, extra={'uid': job_uid})
         return result
 
-    def download_target_file_based_on_async_request(self, project_uid, job_uid, async_request_id, target_file_format="ORIGINAL"):
+    def download_target_file_based_on_async_request(self, project_uid, job_uid, async_request_id, target_file_format="ORIGINAL", stream=None):
         """Download target file based on async request
 
         Args:
@@ -189,15 +521,16 @@ class MemsourceAPI:
             job_uid (str): Job UID
             async_request_id (int): Async request ID
             target_file_format (str, optional): Target file format. Defaults to "ORIGINAL". Enum: "ORIGINAL" "PDF"
+            stream (file object, optional): Defaults to None. binary file object to write target file. required for binary files
 
         Returns:
             _type_: _description_
         """
-        url = f"https://cloud.memsource.com/web/api2/v2/projects/{project_uid}/jobs/{job_uid}/downloadTargetFile/{async_request_id}"
+        url = f"{self.base_url}/v2/projects/{project_uid}/jobs/{job_uid}/downloadTargetFile/{async_request_id}"
         params = {'format': target_file_format}
 
-        print(f'Downloading "{job_uid}" target file...')
-        result = self.__call_rest(url, "GET", params=params)
+        logger.info('Downloading "%s" target file...', job_uid, extra={'uid': job_uid})
+        result = self.__call_rest(url, "GET", params=params, stream=stream)
         return result
 
     def get_workflow_steps(self, project_uid):
@@ -208,26 +541,54 @@ class MemsourceAPI:
             json: workflow level
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/workflowSteps"
+        url = f"{self.base_url}/v1/projects/{project_uid}/workflowSteps"
         params = {}
 
         result = self.__call_rest(url, "GET", params=params)
         return result
 
-    def list_projects(self):
+    def list_projects(self, records=False):
         """
         Get All Project in Memsource
 
+        Args:
+            records (bool, optional): Defaults to False. projects in content are ProjectRecord instead of dict to keep less memory
+
         Returns:
             json: project json
         """
 
-        url = "https://cloud.memsource.com/web/api2/v1/projects/"
+        url = f"{self.base_url}/v1/projects/"
         params = {}
 
-        result = self.__call_rest(url, "GET", params=params)
+        result = self.__call_rest(url, "GET", params=params, record_type=ProjectRecord if records else None)
         return result
 
+    def iter_projects(self, page_size=50, created_in_last_hours=None, records=False):
+        """
+        Iterate all projects in Memsource page by page
+
+        Args:
+            page_size (int, optional): Defaults to 50. projects per page (max 50)
+            created_in_last_hours (int, optional): Defaults to None. only projects created in last hours
+            records (bool, optional): Defaults to False. yield ProjectRecord instead of dict to keep less memory
+
+        Yields:
+            dict or ProjectRecord: project json
+        """
+        url = f"{self.base_url}/v1/projects/"
+        page_number = 0
+        while True:
+            params = {'pageNumber': page_number, 'pageSize': page_size}
+            if created_in_last_hours is not None:
+                params['createdInLastHours'] = created_in_last_hours
+            logger.info('Getting projects list page %s...', page_number)
+            result = self.__call_rest(url, "GET", params=params, record_type=ProjectRecord if records else None)
+            yield from result['content']
+            if result['totalPages'] - 1 <= result['pageNumber']:
+                break
+            page_number = page_number + 1
+
     def create_project_from_template(self, template_uid:str, name:str, source_lang:str=None, target_langs:list=None, workflow_steps:list=None, date_due:date=None, note:str=None, client_id:str=None):
         """Create Project from Template
 
@@ -244,7 +605,7 @@ class MemsourceAPI:
         Returns:
             dict: Admin Project Manager V2
         """
-        url = f"https://cloud.memsource.com/web/api2/v2/projects/applyTemplate/{template_uid}"
+        url = f"{self.base_url}/v2/projects/applyTemplate/{template_uid}"
         params = {}
         headers = {"Content-Type" : "application/json"}
 
@@ -261,7 +622,7 @@ class MemsourceAPI:
         if client_id:
             obj["client"] = {"id": client_id}
 
-        print(f'Creating project using {template_uid}...')
+        logger.info('Creating project using %s...', template_uid, extra={'uid': template_uid})
         result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
         return result
 
@@ -272,10 +633,10 @@ class MemsourceAPI:
         Args:
             project_uid (str): project UID
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}"
+        url = f"{self.base_url}/v1/projects/{project_uid}"
         params = {}
 
-        print(f'Getting "{project_uid}" project...')
+        logger.info('Getting "%s" project...', project_uid, extra={'uid': project_uid})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
@@ -316,7 +677,7 @@ class MemsourceAPI:
             # lqa_profile_id (str, optional): lqa_profile_id. Defaults to None.
             # archived (bool, optional): archived. Defaults to None.
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}"
+        url = f"{self.base_url}/v1/projects/{project_uid}"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -353,7 +714,7 @@ class MemsourceAPI:
             # ],
             # "archived": archived
 }
-        print(f'Editing "{project_uid}" project...')
+        logger.info('Editing "%s" project...', project_uid, extra={'uid': project_uid})
         result = self.__call_rest(url, "PUT", body=obj, params=params, headers=headers)
         return result
 
@@ -411,7 +772,7 @@ class MemsourceAPI:
             _type_: _description_
         """
         params = {}
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/jobs"
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs"
 
         if workflow_settings is None:
             workflow_settings = []
@@ -436,28 +797,115 @@ class MemsourceAPI:
             "Memsource" : json.dumps(memsource),
             }
 
-        source_file = open(source_file_path, 'rb').read()
-        print('Creating job ...')
-        result = self.__call_rest(url, "POST", body=source_file, params=params, headers=headers)
+        with open_upload_body(source_file_path) as source_file:
+            logger.info('Creating job ...', extra={'uid': project_uid})
+            result = self.__call_rest(url, "POST", body=source_file, params=params, headers=headers, compress=True)
         return result
 
+    def create_jobs_from_directory(self, project_uid, root, target_langs, workers=4, manifest_path=None, tries=3, delay=5, **job_options):
+        """Create jobs from all files in directory tree concurrently.
+        Sub directories of root are set to path of the jobs.
+
+        Args:
+            project_uid (str): Project UID
+            root (str): root directory of source files
+            target_langs (list): List of target locale code
+            workers (int, optional): Defaults to 4. concurrent uploads
+            manifest_path (str, optional): Defaults to None. json lines file recording created jobs and errors.
+                                           a line is appended for each file, e.g. {"path": "a/b.txt", "jobUids": [...]}.
+                                           files with jobUids are skipped, so a failed run can be resumed
+            tries (int, optional): Defaults to 3. tries of each upload. creating job is not idempotent,
+                                   so only connection failure before sending the request and 5xx are retried.
+                                   5xx after the job is created can still make duplicated jobs
+            delay (int, optional): Defaults to 5. seconds between tries
+            job_options: other arguments of create_job such as due and workflow_settings
+
+        Raises:
+            APIException: some files could not be uploaded. their errors are recorded in manifest as {"error": message}
+                          and they are uploaded again by the next run
 
-    def list_jobs(self, project_uid, workflow_level=1, page_number=0, prev_result=None):
+        Returns:
+            dict: relative path of source file to created job uids
+        """
+        manifest = {} if manifest_path is None else read_manifest(manifest_path)
+
+        pending = []
+        for directory, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                source_file_path = os.path.join(directory, filename)
+                if manifest_path is not None and os.path.abspath(source_file_path) == os.path.abspath(manifest_path):
+                    continue
+                relative_path = os.path.relpath(source_file_path, root).replace(os.sep, "/")
+                # failed files are recorded as dict
+                if not isinstance(manifest.get(relative_path), list):
+                    pending.append(relative_path)
+
+        lock = threading.Lock()
+        manifest_file = None
+        if manifest_path is not None:
+            manifest_file = open(manifest_path, "a", encoding="utf-8")
+            if manifest_file.tell() > 0 and not manifest_ends_with_newline(manifest_path):
+                # end broken line of crashed run
+                manifest_file.write("\n")
+        def record(relative_path, value):
+            with lock:
+                manifest[relative_path] = value
+                if manifest_file is not None:
+                    line = {"path": relative_path}
+                    line.update({"jobUids": value} if isinstance(value, list) else value)
+                    manifest_file.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    # lines of created jobs must survive crash of this process
+                    manifest_file.flush()
+
+        def upload(relative_path):
+            job_path = os.path.dirname(relative_path) or None
+            result = retry_call(self.create_job,
+                                fargs=[os.path.join(root, relative_path), project_uid, target_langs],
+                                fkwargs=dict(job_options, path=job_path),
+                                exceptions=(RequestNotSentException, ServerErrorException),
+                                tries=tries, delay=delay, logger=logger)
+            record(relative_path, [job['uid'] for job in result['jobs']])
+
+        failures = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(upload, relative_path): relative_path for relative_path in pending}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as err:# pylint: disable=broad-except
+                        message = err.message if isinstance(err, APIException) else repr(err)
+                        logger.error('Failed to create job from "%s": %s', futures[future], message, extra={'uid': project_uid})
+                        failures[futures[future]] = message
+                        try:
+                            record(futures[future], {"error": str(message)})
+                        except OSError as write_err:
+                            logger.error('Failed to write manifest "%s": %s', manifest_path, write_err, extra={'uid': project_uid})
+        finally:
+            if manifest_file is not None:
+                manifest_file.close()
+        if failures:
+            raise APIException({"failedFiles": failures})
+        return manifest
+
+
+    def list_jobs(self, project_uid, workflow_level=1, page_number=0, prev_result=None, records=False):
         """
         Get jobs list in project
 
         Args:
             project_uid (str): To get project UID
             workflow_level (int): To get workflow level
+            records (bool, optional): Defaults to False. jobs in content are JobRecord instead of dict to keep less memory
 
         Returns:
             json: jobs list in project
         """
-        url = f"https://cloud.memsource.com/web/api2/v2/projects/{project_uid}/jobs"
+        url = f"{self.base_url}/v2/projects/{project_uid}/jobs"
         params = {'workflowLevel': workflow_level, 'pageNumber': page_number}
 
-        print(f'Getting "{project_uid}:{workflow_level}:{page_number}" jobs list...')
-        result = self.__call_rest(url, "GET", params=params)
+        logger.info('Getting "%s:%s:%s" jobs list...', project_uid, workflow_level, page_number, extra={'uid': project_uid})
+        result = self.__call_rest(url, "GET", params=params, record_type=JobRecord if records else None)
 
         if not prev_result is None:
             prev_result['content'].extend(result['content'])
@@ -465,7 +913,7 @@ class MemsourceAPI:
 
         # 全ファイルを再帰処理する
         if result['totalPages'] - 1 > result['pageNumber']:
-            self.list_jobs(project_uid, workflow_level, page_number + 1, result)
+            self.list_jobs(project_uid, workflow_level, page_number + 1, result, records)
 
         return result
 
@@ -491,7 +939,7 @@ class MemsourceAPI:
         Returns:
             json: asyncRequests
         """
-        url = "https://cloud.memsource.com/web/api2/v2/analyses"
+        url = f"{self.base_url}/v2/analyses"
         params = {}
         headers = {"Content-Type" : "application/json"}
 
@@ -511,7 +959,7 @@ class MemsourceAPI:
             "name": name,
             }
 
-        print('Creating analysis ...')
+        logger.info('Creating analysis ...')
         result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
         return result
 
@@ -525,11 +973,11 @@ class MemsourceAPI:
         Returns:
             json: jobs data
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/applyTemplate/{template_uid}/assignProviders"
+        url = f"{self.base_url}/v1/projects/{project_uid}/applyTemplate/{template_uid}/assignProviders"
         params = {}
         headers = {"Content-Type" : "application/json"}
 
-        print('Assigning providers from template ...')
+        logger.info('Assigning providers from template ...', extra={'uid': project_uid})
         result = self.__call_rest(url, "POST", params=params, body=None, headers=headers)
         return result
 
@@ -544,13 +992,13 @@ class MemsourceAPI:
         Returns:
             json: jobs data
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/applyTemplate/{template_uid}/assignProviders/forJobParts"
+        url = f"{self.base_url}/v1/projects/{project_uid}/applyTemplate/{template_uid}/assignProviders/forJobParts"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
             "jobs": list(map(change_uid_to_dict, job_uids)),
             }
-        print('Assigning providers from template ...')
+        logger.info('Assigning providers from template ...', extra={'uid': project_uid})
         result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
         return result
 
@@ -563,28 +1011,29 @@ class MemsourceAPI:
         Returns:
             json: analysis result
         """
-        url = f"https://cloud.memsource.com/web/api2/v3/analyses/{analysis_id}"
+        url = f"{self.base_url}/v3/analyses/{analysis_id}"
         params = {'format': format}
 
-        print(f'Getting "{analysis_id}" analysis...')
+        logger.info('Getting "%s" analysis...', analysis_id, extra={'uid': analysis_id})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
-    def download_analysis(self, analysis_id, log_format="CSV_EXTENDED"):
+    def download_analysis(self, analysis_id, log_format="CSV_EXTENDED", stream=None):
         """Download analysis
 
         Args:
             analysis_id (int): analysis ID
             log_format (str, optional): analysis format. Defaults to "CSV_EXTENDED". Enum: "CSV" "CSV_EXTENDED" "LOG" "JSON"
+            stream (file object, optional): Defaults to None. binary file object to write analysis in chunks
 
         Returns:
             [type]: [description]
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/analyses/{analysis_id}/download"
+        url = f"{self.base_url}/v1/analyses/{analysis_id}/download"
         params = {'format': log_format}
 
-        print(f'Downloading "{analysis_id}" analysis...')
-        result = self.__call_rest(url, "GET", params=params)
+        logger.info('Downloading "%s" analysis...', analysis_id, extra={'uid': analysis_id})
+        result = self.__call_rest(url, "GET", params=params, stream=stream)
         return result
 
     def get_segments(self, project_uid, job_uid, begin_index, end_index):
@@ -601,13 +1050,79 @@ class MemsourceAPI:
             json: segment data
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/jobs/{job_uid}/segments"
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/{job_uid}/segments"
         params = {'beginIndex': begin_index, 'endIndex': end_index}
 
-        print(f'Getting "{project_uid}:{job_uid}:{begin_index}:{end_index}" segment data...')
+        logger.info('Getting "%s:%s:%s:%s" segment data...', project_uid, job_uid, begin_index, end_index, extra={'uid': job_uid})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
+    def get_segments_count(self, project_uid, job_uids):
+        """
+        Get segments count of jobs
+
+        Args:
+            project_uid (str): Project UID
+            job_uids (list): Job UIDs
+
+        Returns:
+            json: segments count result
+        """
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/segmentsCount"
+        params = {}
+        headers = {"Content-Type" : "application/json"}
+        obj = {
+            "jobs": list(map(change_uid_to_dict, job_uids)),
+            }
+        logger.info('Getting segments count of "%s"...', project_uid, extra={'uid': project_uid})
+        result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
+        return result
+
+    def iter_job_segments(self, project_uid, job_uid, window=500, workers=4):
+        """
+        Iterate all segments of job. The job is split into windows of segments
+        and the windows are fetched concurrently.
+
+        Args:
+            project_uid (str): Project UID
+            job_uid (str): Job UID
+            window (int, optional): Defaults to 500. segments per get_segments call
+            workers (int, optional): Defaults to 4. concurrent get_segments calls
+
+        Yields:
+            dict: segment json in job order
+        """
+        result = self.get_segments_count(project_uid, [job_uid])
+        total = result['segmentsCountsResults'][0]['counts']['segmentsCount']
+        begin_indexes = iter(range(0, total, window))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # keep at most "workers" windows in memory
+            futures = collections.deque()
+            for begin_index in itertools.islice(begin_indexes, workers):
+                futures.append(executor.submit(self.get_segments, project_uid, job_uid, begin_index, begin_index + window - 1))
+            while futures:
+                segment_dict = futures.popleft().result()
+                begin_index = next(begin_indexes, None)
+                if begin_index is not None:
+                    futures.append(executor.submit(self.get_segments, project_uid, job_uid, begin_index, begin_index + window - 1))
+                yield from segment_dict["segments"]
+
+    def get_job_segments_by_workflow_level(self, project_uid, job_uid, window=500, workers=4):
+        """
+        Get all segments of job grouped by workflow level
+
+        Args:
+            project_uid (str): Project UID
+            job_uid (str): Job UID
+            window (int, optional): Defaults to 500. segments per get_segments call
+            workers (int, optional): Defaults to 4. concurrent get_segments calls
+
+        Returns:
+            dict: workflow level to segment list
+        """
+        return self.group_segments_by_workflow_level(self.iter_job_segments(project_uid, job_uid, window, workers))
+
     def pretranslate_using_tm(self, project_uid, job_uids):
         """
         Pretranslate jobs using tm
@@ -619,7 +1134,7 @@ class MemsourceAPI:
             json: jobs list in project
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/jobs/preTranslate"
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/preTranslate"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -634,7 +1149,7 @@ class MemsourceAPI:
             ]
             }
 
-        print(f'Pretranslating (jobids: "{job_uids}") in (projectid: "{project_uid}") ...')
+        logger.info('Pretranslating (jobids: "%s") in (projectid: "%s") ...', job_uids, project_uid, extra={'uid': project_uid})
         result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
         return result
 
@@ -649,7 +1164,7 @@ class MemsourceAPI:
             json: async Response
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/async/{async_request_id}"
+        url = f"{self.base_url}/v1/async/{async_request_id}"
         params = {}
 
         result = self.__call_rest(url, "GET", params=params)
@@ -662,24 +1177,25 @@ class MemsourceAPI:
         Args:
             job_uid (str): Job id
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/jobs/{job_uid}/conversations"
+        url = f"{self.base_url}/v1/jobs/{job_uid}/conversations"
         params = {}
-        print(f'Getting concersations (job_uid: "{job_uid}")...')
+        logger.info('Getting concersations (job_uid: "%s")...', job_uid, extra={'uid': job_uid})
         result = self.__call_rest(url, "GET", params=params)
         return result
 
-    def download_tmx_file(self, tm_id):
+    def download_tmx_file(self, tm_id, stream=None):
         """
         Download tmx file with tm_id
 
         Args:
             tm_id (str): TM id
+            stream (file object, optional): Defaults to None. binary file object to write tmx file in chunks
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/transMemories/{tm_id}/export"
+        url = f"{self.base_url}/v1/transMemories/{tm_id}/export"
         params = {}
         # headers = {"Content-Type" : "application/json"}
-        print(f'Downloading TMX (tm_id: "{tm_id}")...')
-        result = self.__call_rest(url, "GET", params=params)
+        logger.info('Downloading TMX (tm_id: "%s")...', tm_id, extra={'uid': tm_id})
+        result = self.__call_rest(url, "GET", params=params, stream=stream)
         return result
 
     def create_tb(self, name, langs, client_id=None):
@@ -691,7 +1207,7 @@ class MemsourceAPI:
             langs ([list]): Languages
             client_id ([str], optional): client_id. Defaults to None.
         """
-        url = "https://cloud.memsource.com/web/api2/v1/termBases"
+        url = f"{self.base_url}/v1/termBases"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -701,7 +1217,7 @@ class MemsourceAPI:
         if client_id is not None:
             obj["client"] = {"id": client_id}
         result = self.__call_rest(url, "POST", body=obj, params=params, headers=headers)
-        print(f"Creating TB {name} ...")
+        logger.info('Creating TB %s ...', name)
         return result
 
     def upload_tb(self, tb_file_path, tb_id, charset="UTF-8", strict_lang_matching="false", update_terms="true"):
@@ -712,7 +1228,7 @@ class MemsourceAPI:
             tb_file_path (str): TB file path
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/termBases/{tb_id}/upload"
+        url = f"{self.base_url}/v1/termBases/{tb_id}/upload"
         params = {
             'charset': charset,
             'strictLangMatching': strict_lang_matching,
@@ -720,9 +1236,9 @@ class MemsourceAPI:
             }
         filename = os.path.basename(tb_file_path)
         headers = {"Content-Type" : "application/octet-stream", "Content-Disposition" : f"filename*=UTF-8''{filename}"}
-        tb_file = open(tb_file_path, 'rb').read()
-        result = self.__call_rest(url, "POST", body=tb_file, params=params, headers=headers)
-        print(f"Uploading TB file {tb_file_path}...")
+        with open_upload_body(tb_file_path) as tb_file:
+            result = self.__call_rest(url, "POST", body=tb_file, params=params, headers=headers, compress=True)
+        logger.info('Uploading TB file %s...', tb_file_path, extra={'uid': tb_id})
         return result
 
     def edit_tb(self, tb_id, name, langs):
@@ -736,7 +1252,7 @@ class MemsourceAPI:
         Returns:
             obj: result obj
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/termBases/{tb_id}"
+        url = f"{self.base_url}/v1/termBases/{tb_id}"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -744,7 +1260,7 @@ class MemsourceAPI:
             "langs": langs,
         }
         result = self.__call_rest(url, "PUT", body=obj, params=params, headers=headers)
-        print(f"Editing TB {name}...")
+        logger.info('Editing TB %s...', name, extra={'uid': tb_id})
         return result
 
     def clear_tb(self, tb_id):
@@ -757,7 +1273,7 @@ class MemsourceAPI:
         Returns:
             json: result json
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/termBases/{tb_id}/terms"
+        url = f"{self.base_url}/v1/termBases/{tb_id}/terms"
         params = {}
         result = self.__call_rest(url, "DELETE", params=params)
         return result
@@ -772,7 +1288,7 @@ class MemsourceAPI:
             target_lang ([list]): Target Lang
             client_id ([str], optional): client_id. Defaults to None.
         """
-        url = "https://cloud.memsource.com/web/api2/v1/transMemories"
+        url = f"{self.base_url}/v1/transMemories"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -783,7 +1299,7 @@ class MemsourceAPI:
         if client_id is not None:
             obj["client"] = {"id": client_id}
         result = self.__call_rest(url, "POST", body=obj, params=params, headers=headers)
-        print(f"Creating TM {name} ...")
+        logger.info('Creating TM %s ...', name)
         return result
 
     def upload_tmx(self, tmx_file_path, tm_id):
@@ -794,51 +1310,124 @@ class MemsourceAPI:
             tmx_file_path (str): tmx file path
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/transMemories/{tm_id}/import"
+        url = f"{self.base_url}/v1/transMemories/{tm_id}/import"
         params = {}
         filename = os.path.basename(tmx_file_path)
         headers = {"Content-Type" : "application/octet-stream", "Content-Disposition" : f"filename*=UTF-8''{filename}"}
-        tmx_file = open(tmx_file_path, 'rb').read()
-        result = self.__call_rest(url, "POST", body=tmx_file, params=params, headers=headers)
-        print(f"Uploading TMX {tmx_file_path}...")
+        with open_upload_body(tmx_file_path) as tmx_file:
+            result = self.__call_rest(url, "POST", body=tmx_file, params=params, headers=headers, compress=True)
+        logger.info('Uploading TMX %s...', tmx_file_path, extra={'uid': tm_id})
         return result
 
-    def download_mxlf_file(self, project_uid, job_uid):
+    def download_mxlf_file(self, project_uid, job_uid, stream=None):
         """
         Download mxlf file with jobs_uid filename
 
         Args:
             project_uid (str): Project UID
             job_uid (str): Job UID
+            stream (file object, optional): Defaults to None. binary file object to write mxlf file in chunks
         """
 
-        url = f"https://cloud.memsource.com/web/api2/v1/projects/{project_uid}/jobs/bilingualFile"
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/bilingualFile"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {"jobs": [{"uid": job_uid}]}
 
-        print(f'Downloading mxlf file (jobid: "{job_uid}") in (projectid: "{project_uid}")...')
-        result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers)
+        logger.info('Downloading mxlf file (jobid: "%s") in (projectid: "%s")...', job_uid, project_uid, extra={'uid': job_uid})
+        result = self.__call_rest(url, "POST", params=params, body=obj, headers=headers, stream=stream)
         return result
 
+    def download_mxlf_files(self, project_uid, job_uids, dest_dir, batch_size=100):
+        """
+        Download mxlf files of many jobs with as few calls as possible.
+        The response is written to disk in chunks and the archive is extracted to per job files.
+
+        Args:
+            project_uid (str): Project UID
+            job_uids (list): Job UIDs
+            dest_dir (str): destination directory
+            batch_size (int, optional): Defaults to 100. jobs per call
+
+        Returns:
+            dict: job uid to downloaded file path "<dest_dir>/<job uid>.mxliff".
+                archived file path is used as key and file path if job uid is not found in the file
+
+        Raises:
+            APIException: job uid is not valid file name, or archived file path is outside dest_dir or written twice
+        """
+
+        url = f"{self.base_url}/v1/projects/{project_uid}/jobs/bilingualFile"
+        params = {}
+        os.makedirs(dest_dir, exist_ok=True)
+        paths = {}
+        for begin in range(0, len(job_uids), batch_size):
+            batch = job_uids[begin:begin + batch_size]
+            headers = {"Content-Type" : "application/json"}
+            obj = {"jobs": list(map(change_uid_to_dict, batch))}
+            logger.info('Downloading %s mxlf files in (projectid: "%s")...', len(batch), project_uid, extra={'uid': project_uid})
+            with tempfile.TemporaryFile(dir=dest_dir) as archive:
+                self.__call_rest(url, "POST", params=params, body=obj, headers=headers, stream=archive)
+                archive.seek(0)
+                if not zipfile.is_zipfile(archive):
+                    # single job is not archived
+                    archive.seek(0)
+                    path = os.path.join(dest_dir, f"{batch[0]}.mxliff")
+                    with open(path, "wb") as mxlf_file:
+                        copy_stream(archive, mxlf_file)
+                    paths[batch[0]] = path
+                    continue
+                with zipfile.ZipFile(archive) as zip_file:
+                    for info in zip_file.infolist():
+                        if info.is_dir():
+                            continue
+                        # file names in archive can be the same in jobs, so the name is known after reading job uid
+                        mxlf_file = tempfile.NamedTemporaryFile(dir=dest_dir, suffix=".part", delete=False)
+                        try:
+                            with zip_file.open(info) as member, mxlf_file:
+                                head = member.read(MXLF_HEADER_SIZE)
+                                mxlf_file.write(head)
+                                copy_stream(member, mxlf_file)
+                            match = MXLF_JOB_UID_PATTERN.search(head)
+                            if match:
+                                key = match.group(1).decode("utf-8", "replace")
+                                # job uid is used as file name
+                                if not SAFE_UID_PATTERN.fullmatch(key):
+                                    raise APIException(f'Job uid "{key}" of "{info.filename}" is not valid file name')
+                                path = os.path.join(dest_dir, f"{key}.mxliff")
+                            else:
+                                key = safe_member_path(info.filename)
+                                path = os.path.join(dest_dir, key)
+                                os.makedirs(os.path.dirname(path), exist_ok=True)
+                            if key in paths:
+                                raise APIException(f'"{info.filename}" is archived twice in (projectid: "{project_uid}")')
+                            os.replace(mxlf_file.name, path)
+                        except BaseException:
+                            os.remove(mxlf_file.name)
+                            raise
+                        paths[key] = path
+        return paths
+
     def upload_mxlf_file(self, mxlf_file_path):
         """
         Upload mxlf file
 
         Args:
-            mxlf_file_path (str): mxlf file path
+            mxlf_file_path (str or bytes): mxlf file path, or mxlf content as bytes, memoryview or mmap
 
         Returns:
             json: result json
         """
 
-        url = "https://cloud.memsource.com/web/api2/v1/bilingualFiles"
+        url = f"{self.base_url}/v1/bilingualFiles"
         params = {'saveToTransMemory': "None"}
         headers = {"Content-Type" : "application/octet-stream"}
-        mxlf_file_obj = open(mxlf_file_path, "rb")
-        print(f'Uploading "{mxlf_file_path}" ...')
-        result = self.__call_rest(url, "PUT", body=mxlf_file_obj, params=params, headers=headers)
-        mxlf_file_obj.close()
+        with open_upload_body(mxlf_file_path) as mxlf_file_obj:
+            if isinstance(mxlf_file_path, (str, os.PathLike)):
+                logger.info('Uploading "%s" ...', mxlf_file_path)
+            else:
+                logger.info('Uploading mxlf file (%s bytes) ...', mxlf_file_obj.nbytes)
+            result = self.__call_rest(url, "PUT", body=mxlf_file_obj, params=params, headers=headers, compress=True)
         return result
 
     def search_tm(self, tm_id, query, source_lang, target_langs):
@@ -854,7 +1443,7 @@ class MemsourceAPI:
         Returns:
             json: result json
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/transMemories/{tm_id}/search"
+        url = f"{self.base_url}/v1/transMemories/{tm_id}/search"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -875,7 +1464,7 @@ class MemsourceAPI:
         Returns:
             json: result json
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/transMemories/{tm_id}/targetLanguages"
+        url = f"{self.base_url}/v1/transMemories/{tm_id}/targetLanguages"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
@@ -894,7 +1483,7 @@ class MemsourceAPI:
         Returns:
             json: result json
         """
-        url = f"https://cloud.memsource.com/web/api2/v1/transMemories/{tm_id}"
+        url = f"{self.base_url}/v1/transMemories/{tm_id}"
         params = {}
         result = self.__call_rest(url, "DELETE", params=params)
         return result
@@ -910,14 +1499,14 @@ class MemsourceAPI:
         Returns:
             json: qa result
         """
-        url = f"https://cloud.memsource.com/web/api2/v3/projects/{project_uid}/jobs/qualityAssurances/run/"
+        url = f"{self.base_url}/v3/projects/{project_uid}/jobs/qualityAssurances/run/"
         params = {}
         headers = {"Content-Type" : "application/json"}
         obj = {
             "jobs": list(map(change_uid_to_dict, job_uids)),
             }
         result = self.__call_rest(url, "POST", body=obj, params=params, headers=headers)
-        print(f"Running QA (batch) {project_uid} ...")
+        logger.info('Running QA (batch) %s ...', project_uid, extra={'uid': project_uid})
         return result
 
     @staticmethod
@@ -937,6 +1526,229 @@ class MemsourceAPI:
                 segment_list.append(segment)
         return segment_list
 
+    @staticmethod
+    def group_segments_by_workflow_level(segments):
+        """Group segments by workflow level in single pass
+
+        Args:
+            segments (iterable): Segment list such as segment_dict["segments"] or iter_job_segments()
+
+        Returns:
+            dict: workflow level to segment list
+        """
+        segment_lists = {}
+        for segment in segments:
+            level = segment["workflowLevel"]
+            if level in segment_lists:
+                segment_lists[level].append(segment)
+            else:
+                segment_lists[level] = [segment]
+        return segment_lists
+
+class DecodedResponse():
+    """
+    Readable object decoding gzip or deflate response in chunks without reading the whole compressed body
+
+    Args:
+        response (file object): response
+        encoding (str): "gzip" or "deflate"
+    """
+
+    def __init__(self, response, encoding):
+        self.response = response
+        self.encoding = encoding
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        self.buffer = bytearray()
+        self.first_chunk = True
+        self.eof = False
+
+    def __fill(self):
+        """
+        Decode next chunk of response to buffer
+        """
+        chunk = self.response.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            self.buffer += self.decompressor.flush()
+            self.eof = True
+            return
+        try:
+            self.buffer += self.decompressor.decompress(chunk)
+        except zlib.error:
+            if self.encoding != "deflate" or not self.first_chunk:
+                raise
+            # some servers send deflate without zlib header
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            self.buffer += self.decompressor.decompress(chunk)
+        self.first_chunk = False
+
+    def read(self, size=-1):
+        """
+        Read decoded body
+
+        Args:
+            size (int, optional): Defaults to -1. max bytes to read. all bytes if negative
+
+        Returns:
+            bytes: decoded body
+        """
+        while not self.eof and (size is None or size < 0 or len(self.buffer) < size):
+            self.__fill()
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+def decode_response(response, encoding):
+    """
+    Wrap response to decode Content-Encoding
+
+    Args:
+        response (file object): response
+        encoding (str or None): Content-Encoding header
+
+    Returns:
+        file object: readable object of decoded body
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return DecodedResponse(response, "gzip")
+    if encoding == "deflate":
+        return DecodedResponse(response, "deflate")
+    return response
+
+@contextlib.contextmanager
+def gzip_upload_body(body):
+    """
+    Compress upload body to temporary file in chunks
+
+    Args:
+        body (bytes or file object): request body
+
+    Yields:
+        file object: gzip compressed body
+    """
+    if isinstance(body, dict):
+        body = json.dumps(body).encode("utf-8")
+    with tempfile.TemporaryFile() as compressed:
+        with gzip.GzipFile(fileobj=compressed, mode='wb') as gzip_file:
+            if hasattr(body, 'read'):
+                copy_stream(body, gzip_file)
+            else:
+                with memoryview(body) as view:
+                    view = view.cast('B')
+                    for offset in range(0, view.nbytes, COPY_CHUNK_SIZE):
+                        gzip_file.write(view[offset:offset + COPY_CHUNK_SIZE])
+        compressed.seek(0)
+        yield compressed
+
+@contextlib.contextmanager
+def open_upload_body(source):
+    """
+    Open upload body without reading the file to memory.
+    The file is memory-mapped and sent from the mapped pages
+
+    Args:
+        source (str or bytes): file path, or bytes, memoryview or mmap
+
+    Yields:
+        memoryview: request body
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        with memoryview(source) as view:
+            yield view
+        return
+    with open(source, 'rb') as source_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            # empty file cannot be mapped
+            with memoryview(b"") as view:
+                yield view
+            return
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                yield view
+
+def copy_stream(src, dst, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Copy binary stream in chunks
+
+    Args:
+        src (file object): readable binary file object
+        dst (file object): writable binary file object
+        chunk_size (int, optional): Defaults to COPY_CHUNK_SIZE. chunk size
+
+    Returns:
+        int: copied bytes
+    """
+    copied = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return copied
+        dst.write(chunk)
+        copied = copied + len(chunk)
+
+def safe_member_path(name):
+    """
+    Make relative path of archived file which stays in the destination directory
+
+    Args:
+        name (str): file name in archive
+
+    Raises:
+        APIException: name is absolute or goes to parent directory
+
+    Returns:
+        str: normalized relative path
+    """
+    path = os.path.normpath(name.replace("\\", "/"))
+    if os.path.isabs(path) or os.path.splitdrive(path)[0] or path == os.pardir or path.startswith(os.pardir + os.sep):
+        raise APIException(f'Archived file "{name}" is outside destination directory')
+    return path
+
+def manifest_ends_with_newline(path):
+    """
+    Check the last byte of manifest
+
+    Args:
+        path (str): manifest path
+
+    Returns:
+        bool: True if the file is empty or ends with newline
+    """
+    with open(path, "rb") as manifest_file:
+        if manifest_file.seek(0, os.SEEK_END) == 0:
+            return True
+        manifest_file.seek(-1, os.SEEK_END)
+        return manifest_file.read(1) == b"\n"
+
+def read_manifest(path):
+    """
+    Read json lines manifest of create_jobs_from_directory. the last line of each path is used
+
+    Args:
+        path (str): manifest path
+
+    Returns:
+        dict: relative path to job uids, or to {"error": message} if the file failed
+    """
+    manifest = {}
+    if not os.path.exists(path):
+        return manifest
+    with open(path, encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                # line being written when the process crashed
+                logger.warning('Skipping broken line of manifest "%s"', path)
+                continue
+            if "jobUids" in obj:
+                manifest[obj['path']] = obj['jobUids']
+            else:
+                manifest[obj['path']] = {"error": obj.get('error')}
+    return manifest
+
 def change_uid_to_dict(uid):
     """
     Change UID to dict
@@ -970,15 +1782,14 @@ def get_index_from_value_and_key(data, val, key, value_type):
         value_type (type): value type
 
     Returns:
-        int or None: index number
+        int or None: index number of the last match
     """
 
-    index = None
-    for i, project_dict in enumerate(data):
-        if project_dict[key] == value_type(val):
-            index = i
-    if index is not None:
-        return index
+    val = value_type(val)
+    # the last match is returned, so search from the end
+    for i in range(len(data) - 1, -1, -1):
+        if data[i][key] == val:
+            return i
     return None
 
 def get_project_content(project_list, internal_id, key):
@@ -986,7 +1797,8 @@ def get_project_content(project_list, internal_id, key):
     Get project content by internal id
 
     Args:
-        project_list (json): Project list json
+        project_list (json or ProjectIndex): Project list json or ProjectIndex.
+                                             ProjectIndex is faster when many ids are looked up
         internal_id (str): internal id
         key (str): to get content json key
 
@@ -994,9 +1806,14 @@ def get_project_content(project_list, internal_id, key):
         str: Project uid
     """
 
+    if isinstance(project_list, ProjectIndex):
+        project = project_list.get_by_internal_id(internal_id)
+        if project is None:
+            raise ProjectIDException(f'Project id "{internal_id}" is not found in Memsource ...')
+        return project[key]
+
     index = get_index_from_value_and_key(project_list['content'], internal_id, "internalId", type(0))
     if index is None:
-        print(f'Project id "{internal_id}" is not found in Memsource ...')
         raise ProjectIDException(f'Project id "{internal_id}" is not found in Memsource ...')
     return project_list['content'][index][key]
 
@@ -1034,7 +1851,7 @@ def check_async_is_complete(memsource_api, async_req_id):
 
     result = memsource_api.get_async_request(async_req_id)
     if result['asyncResponse']:
-        print(f'Async request of "{async_req_id}" is completed.')
+        logger.info('Async request of "%s" is completed.', async_req_id, extra={'uid': async_req_id})
         return True
     else:
         raise AsyncRequestException(f'Async request of "{async_req_id}"  has not been completed yet')
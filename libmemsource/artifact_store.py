@@ -0,0 +1,335 @@
+"""
+This modules is to keep downloaded files under content hashes and reuse them instead of downloading again
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from .api import check_async_is_complete
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+
+class HashingWriter():
+    """
+    Writable object writing to file while calculating sha256
+
+    Args:
+        stream (file object): binary file object to write
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        """
+        Write data
+
+        Args:
+            data (bytes): data
+
+        Returns:
+            int: written bytes
+        """
+        self.hash.update(data)
+        self.size = self.size + len(data)
+        return self.stream.write(data)
+
+class ArtifactStore():
+    """
+    Object storing artifacts as content addressed files with SQLite index of keys.
+    Keys such as "tmx/{tm_id}" point to the content and the same content is stored once.
+    Least recently used contents are removed when total size exceeds max_bytes.
+    The directory can be shared by processes and machines.
+
+    Args:
+        root (str): directory of the store
+        max_bytes (int, optional): Defaults to DEFAULT_MAX_BYTES. max total size of contents
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self.__lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " digest TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " key TEXT PRIMARY KEY,"
+                " digest TEXT NOT NULL,"
+                " version TEXT,"
+                " stored_at REAL NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts (digest)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close index database
+        """
+        self.connection.close()
+
+    def object_path(self, digest):
+        """
+        Get path of content
+
+        Args:
+            digest (str): sha256 hex digest
+
+        Returns:
+            str: path of content file
+        """
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def get(self, key, version=None, max_age=None):
+        """
+        Get path of fresh artifact
+
+        Args:
+            key (str): artifact key
+            version (str, optional): Defaults to None. artifact is fresh only if it was stored with this version
+            max_age (float, optional): Defaults to None. artifact is fresh only if it was stored in max_age seconds
+
+        Returns:
+            str or None: path of content file. None if artifact is missing or stale
+        """
+        with self.__lock, self.connection:
+            row = self.connection.execute(
+                "SELECT digest, version, stored_at FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            digest, stored_version, stored_at = row
+            if version is not None and str(version) != stored_version:
+                return None
+            if max_age is not None and time.time() - stored_at > max_age:
+                return None
+            path = self.object_path(digest)
+            if not os.path.exists(path):
+                # evicted by other process
+                self.connection.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+                return None
+            self.connection.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        return path
+
+    def put(self, key, download, version=None):
+        """
+        Store artifact
+
+        Args:
+            key (str): artifact key
+            download (callable): download(stream) writing content to binary file object
+            version (str, optional): Defaults to None. version of artifact such as dateModified
+
+        Returns:
+            str: path of content file
+        """
+        with tempfile.NamedTemporaryFile(dir=os.path.join(self.root, "tmp"), delete=False) as temp_file:
+            writer = HashingWriter(temp_file)
+            try:
+                download(writer)
+            except Exception:
+                temp_file.close()
+                os.remove(temp_file.name)
+                raise
+        digest = writer.hash.hexdigest()
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # same content may be stored by other process. both files have same content
+        os.replace(temp_file.name, path)
+
+        now = time.time()
+        with self.__lock, self.connection:
+            row = self.connection.execute("SELECT digest FROM artifacts WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (digest, writer.size, now))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                (key, digest, None if version is None else str(version), now))
+            if row is not None and row[0] != digest:
+                self.__remove_unreferenced(row[0])
+        logger.debug('Stored "%s" as %s (%s bytes)', key, digest, writer.size)
+        self.__evict(self.max_bytes, keep=digest)
+        return path
+
+    def fetch(self, key, download, version=None, max_age=None):
+        """
+        Get path of fresh artifact or download it
+
+        Args:
+            key (str): artifact key
+            download (callable): download(stream) writing content to binary file object
+            version (str, optional): Defaults to None. expected version
+            max_age (float, optional): Defaults to None. max age in seconds
+
+        Returns:
+            str: path of content file
+        """
+        path = self.get(key, version, max_age)
+        if path is not None:
+            logger.debug('Using stored "%s"', key)
+            return path
+        return self.put(key, download, version)
+
+    def remove(self, key):
+        """
+        Remove artifact
+
+        Args:
+            key (str): artifact key
+        """
+        with self.__lock, self.connection:
+            row = self.connection.execute("SELECT digest FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self.connection.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            self.__remove_unreferenced(row[0])
+
+    def total_size(self):
+        """
+        Get total size of contents
+
+        Returns:
+            int: bytes
+        """
+        with self.__lock:
+            return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """
+        Remove least recently used contents until total size is max_bytes or less
+
+        Args:
+            max_bytes (int, optional): Defaults to self.max_bytes. max total size
+
+        Returns:
+            int: number of removed contents
+        """
+        return self.__evict(self.max_bytes if max_bytes is None else max_bytes)
+
+    def __evict(self, max_bytes, keep=None):
+        removed = 0
+        with self.__lock, self.connection:
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            for digest, size in self.connection.execute(
+                    "SELECT digest, size FROM blobs ORDER BY last_access").fetchall():
+                if total <= max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                self.connection.execute("DELETE FROM artifacts WHERE digest = ?", (digest,))
+                self.__remove_blob(digest)
+                total = total - size
+                removed = removed + 1
+        if removed:
+            logger.info('Evicted %s artifacts', removed)
+        return removed
+
+    def __remove_unreferenced(self, digest):
+        if self.connection.execute("SELECT 1 FROM artifacts WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+            self.__remove_blob(digest)
+
+    def __remove_blob(self, digest):
+        self.connection.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+
+def fetch_tmx(store, memsource_api, tm_id, version=None, max_age=None):
+    """
+    Get TMX export of TM from store or download it
+
+    Args:
+        store (ArtifactStore): artifact store
+        memsource_api (MemsourceAPI): memsource_api object
+        tm_id (str): TM id
+        version (str, optional): Defaults to None. expected version, e.g. last import time of the TM
+        max_age (float, optional): Defaults to None. max age in seconds
+
+    Returns:
+        str: path of tmx file
+    """
+    return store.fetch(f"tmx/{tm_id}", lambda stream: memsource_api.download_tmx_file(tm_id, stream=stream),
+                       version, max_age)
+
+def fetch_termbase(store, memsource_api, termbase_uid, export_format="Tbx", version=None, max_age=None):
+    """
+    Get term base export from store or download it
+
+    Args:
+        store (ArtifactStore): artifact store
+        memsource_api (MemsourceAPI): memsource_api object
+        termbase_uid (str): term base uid
+        export_format (str, optional): Defaults to "Tbx". Tbx, Xlsx
+        version (str, optional): Defaults to None. expected version
+        max_age (float, optional): Defaults to None. max age in seconds
+
+    Returns:
+        str: path of exported file
+    """
+    return store.fetch(f"termbase/{termbase_uid}/{export_format}",
+                       lambda stream: memsource_api.export_termbase(termbase_uid, export_format, stream=stream),
+                       version, max_age)
+
+def fetch_mxlf(store, memsource_api, project_uid, job_uid, version=None, max_age=None):
+    """
+    Get bilingual file of job from store or download it
+
+    Args:
+        store (ArtifactStore): artifact store
+        memsource_api (MemsourceAPI): memsource_api object
+        project_uid (str): project uid
+        job_uid (str): job uid
+        version (str, optional): Defaults to None. expected version, e.g. dateModified or status of job
+        max_age (float, optional): Defaults to None. max age in seconds
+
+    Returns:
+        str: path of mxliff file
+    """
+    return store.fetch(f"mxlf/{job_uid}",
+                       lambda stream: memsource_api.download_mxlf_file(project_uid, job_uid, stream=stream),
+                       version, max_age)
+
+def fetch_target_file(store, memsource_api, project_uid, job_uid, target_file_format="ORIGINAL", version=None, max_age=None):
+    """
+    Get target file of job from store or download it
+
+    Args:
+        store (ArtifactStore): artifact store
+        memsource_api (MemsourceAPI): memsource_api object
+        project_uid (str): project uid
+        job_uid (str): job uid
+        target_file_format (str, optional): Defaults to "ORIGINAL". Enum: "ORIGINAL" "PDF"
+        version (str, optional): Defaults to None. expected version, e.g. dateModified or status of job
+        max_age (float, optional): Defaults to None. max age in seconds
+
+    Returns:
+        str: path of target file
+    """
+    def download(stream):
+        result = memsource_api.download_target_file_async(project_uid, job_uid)
+        async_req_id = result['asyncRequest']['id']
+        check_async_is_complete(memsource_api, async_req_id)
+        memsource_api.download_target_file_based_on_async_request(
+            project_uid, job_uid, async_req_id, target_file_format, stream=stream)
+    return store.fetch(f"target/{job_uid}/{target_file_format}", download, version, max_age)
@@ -0,0 +1,296 @@
+"""
+This modules is to receive memsource callbacks instead of polling
+"""
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+
+class CallbackTimeoutException(Exception):
+    """Callback Timeout Exception"""
+    def __init__(self, message):
+        self.message = message
+
+def get_callback_keys(payload):
+    """
+    Get keys of waiting futures from callback payload
+
+    Args:
+        payload (dict): callback json
+
+    Returns:
+        list: keys such as ("async", "123") and ("job", "abc")
+    """
+    keys = []
+    if not isinstance(payload, dict):
+        return keys
+    async_request = payload.get('asyncRequest')
+    if isinstance(async_request, dict) and async_request.get('id') is not None:
+        keys.append(("async", str(async_request['id'])))
+    for list_key in ('jobParts', 'jobs'):
+        for job in payload.get(list_key) or []:
+            if isinstance(job, dict) and job.get('uid') is not None:
+                keys.append(("job", job['uid']))
+    return keys
+
+class CallbackReceiver():
+    """
+    Object receiving memsource job and async request callbacks in background thread.
+    Set receiver.url to callback_url of create_job and wait the result with wait_for_async.
+    receiver.url has secret token and callbacks without the token are rejected.
+
+    Args:
+        host (str, optional): Defaults to "0.0.0.0". listening address
+        port (int, optional): Defaults to 0. listening port. 0 is any free port
+        public_url (str, optional): Defaults to None. url reachable from Memsource, e.g. behind reverse proxy.
+                                    required if host is wildcard address such as "0.0.0.0"
+        path (str, optional): Defaults to "/memsource/callback". callback path
+        early_ttl (float, optional): Defaults to 3600. seconds to keep callbacks received before expect()
+        max_early (int, optional): Defaults to 10000. max callbacks kept before expect(). the oldest is dropped
+        secret (str, optional): Defaults to None. token in "token" query parameter of url. random if None
+
+    Raises:
+        ValueError: host is wildcard address and public_url is not given
+    """
+
+    def __init__(self, host="0.0.0.0", port=0, public_url=None, path="/memsource/callback", early_ttl=3600, max_early=10000,
+                 secret=None):
+        if public_url is None and host in WILDCARD_HOSTS:
+            raise ValueError(f'public_url is required to listen on "{host}"')
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.path = path
+        self.secret = secrets.token_urlsafe(24) if secret is None else secret
+        self.server = None
+        self.thread = None
+        self.early_ttl = early_ttl
+        self.max_early = max_early
+        self.futures = {}
+        # number of expect() not discarded yet for each key of futures
+        self.waiters = {}
+        # callbacks nobody waits yet. key to (payload, received time) in the order of arrival
+        self.early = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        """
+        Callback url with secret token
+
+        Returns:
+            str: callback url
+        """
+        base_url = self.base_url
+        separator = "&" if "?" in base_url else "?"
+        return f"{base_url}{separator}token={urllib.parse.quote(self.secret)}"
+
+    @property
+    def base_url(self):
+        """
+        Callback url without secret token, e.g. for logging
+
+        Returns:
+            str: callback url
+        """
+        if self.public_url is not None:
+            return self.public_url
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    def start(self):
+        """
+        Start listening in background thread
+        """
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Handler of callback request"""
+
+            def do_POST(self):
+                """Receive callback"""
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                path, _, query = self.path.partition('?')
+                if path != receiver.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                token = urllib.parse.parse_qs(query).get('token', [""])[0]
+                if not hmac.compare_digest(token.encode('utf-8'), receiver.secret.encode('utf-8')):
+                    logger.warning('Rejected callback without valid token from %s', self.client_address[0])
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    payload = json.loads(body.decode('utf-8'))
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                receiver.receive(payload)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format_string, *args):
+                logger.debug(format_string, *args)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info('Listening memsource callback on %s...', self.base_url)
+
+    def stop(self):
+        """
+        Stop listening
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+
+    def receive(self, payload):
+        """
+        Resolve futures waiting the callback
+
+        Args:
+            payload (dict): callback json
+        """
+        for key in get_callback_keys(payload):
+            logger.debug('Received callback of %s "%s"', key[0], key[1], extra={'uid': key[1]})
+            with self.__lock:
+                future = self.futures.get(key)
+                if future is None:
+                    # keep it for expect() called later
+                    self.early.pop(key, None)
+                    self.early[key] = (payload, time.monotonic())
+                    self.__prune_early()
+                    continue
+            if not future.done():
+                future.set_result(payload)
+
+    def __prune_early(self):
+        """
+        Drop expired callbacks and the oldest callbacks over max_early. the lock must be held
+        """
+        expires = time.monotonic() - self.early_ttl
+        while self.early:
+            key, (_, received_at) = next(iter(self.early.items()))
+            if received_at >= expires and len(self.early) <= self.max_early:
+                break
+            del self.early[key]
+
+    def expect(self, key):
+        """
+        Get future resolved by the callback. callback received in early_ttl before this call is used.
+        The future is shared by callers expecting the same key and kept until all of them call discard
+
+        Args:
+            key (tuple): ("async", async request id) or ("job", job uid)
+
+        Returns:
+            Future: future of callback json
+        """
+        key = (key[0], str(key[1]))
+        with self.__lock:
+            future = self.futures.get(key)
+            if future is None:
+                future = Future()
+                self.futures[key] = future
+                self.__prune_early()
+                early = self.early.pop(key, None)
+                if early is not None:
+                    future.set_result(early[0])
+            self.waiters[key] = self.waiters.get(key, 0) + 1
+            return future
+
+    def discard(self, key):
+        """
+        Stop expecting key. the future is forgotten when no other caller expects it
+
+        Args:
+            key (tuple): ("async", async request id) or ("job", job uid)
+        """
+        key = (key[0], str(key[1]))
+        with self.__lock:
+            waiters = self.waiters.get(key, 0) - 1
+            if waiters > 0:
+                self.waiters[key] = waiters
+                return
+            self.waiters.pop(key, None)
+            self.futures.pop(key, None)
+
+    def wait(self, key, timeout=600, poll=None, poll_interval=10, poll_timeout=600):
+        """
+        Wait callback. poll is called only if no callback arrives in timeout
+
+        Args:
+            key (tuple): ("async", async request id) or ("job", job uid)
+            timeout (int, optional): Defaults to 600. seconds to wait callback
+            poll (callable, optional): Defaults to None. function returning result or None if not completed
+            poll_interval (int, optional): Defaults to 10. seconds between polls
+            poll_timeout (int, optional): Defaults to 600. seconds to poll
+
+        Raises:
+            CallbackTimeoutException: no callback and poll did not complete
+
+        Returns:
+            dict: callback json or result of poll
+        """
+        future = self.expect(key)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if poll is None:
+                raise CallbackTimeoutException(f'Callback of {key[0]} "{key[1]}" is not received')
+        finally:
+            self.discard(key)
+
+        logger.info('Callback of %s "%s" is not received. Polling...', key[0], key[1], extra={'uid': key[1]})
+        deadline = time.monotonic() + poll_timeout
+        while True:
+            result = poll()
+            if result is not None:
+                return result
+            if time.monotonic() + poll_interval > deadline:
+                raise CallbackTimeoutException(f'{key[0]} "{key[1]}" has not been completed yet')
+            time.sleep(poll_interval)
+
+    def wait_for_async(self, memsource_api, async_req_id, timeout=600, poll_interval=10, poll_timeout=600):
+        """
+        Wait async request is completed. get_async_request is polled only if no callback arrives in timeout
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+            async_req_id (str): async request id
+            timeout (int, optional): Defaults to 600. seconds to wait callback
+            poll_interval (int, optional): Defaults to 10. seconds between polls
+            poll_timeout (int, optional): Defaults to 600. seconds to poll
+
+        Returns:
+            dict: callback json or async Response
+        """
+        def poll():
+            result = memsource_api.get_async_request(async_req_id)
+            if result['asyncResponse']:
+                return result
+            return None
+        return self.wait(("async", async_req_id), timeout, poll, poll_interval, poll_timeout)
@@ -0,0 +1,146 @@
+"""
+This modules is to estimate memsource analysis locally from mxliff files without creating analysis in Memsource
+"""
+import hashlib
+import re
+from array import array
+from xml.sax.saxutils import unescape
+from .analysis import AnalysisRecord, AnalysisTable
+from .mxliff import iter_trans_units
+from .parallel import map_in_processes
+
+CJK_CHARACTERS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f'
+WORD_PATTERN = re.compile(f'[{CJK_CHARACTERS}]|[^\\s{CJK_CHARACTERS}]*[^\\W_][^\\s{CJK_CHARACTERS}]*')
+TAG_PATTERN = re.compile(r'\{[0-9]+>|<[0-9]+\}|\{[0-9]+\}')
+SPACE_PATTERN = re.compile(r'\s+')
+LOCAL_ANALYSIS_BANDS = ("All", "Repetitions", "0%-49%", "Only Tags")
+LOCAL_ANALYSIS_MEASURES = ("Segments", "Words", "Characters", "Tags")
+
+def count_text(string):
+    """
+    Count words, characters and tags of segment string
+
+    Args:
+        string (str): escaped segment string such as Segment.string
+
+    Returns:
+        tuple: words, characters without spaces and tags.
+               each CJK character is counted as a word
+    """
+    string = unescape(string)
+    tags = len(TAG_PATTERN.findall(string))
+    text = TAG_PATTERN.sub(" ", string)
+    words = len(WORD_PATTERN.findall(text))
+    characters = len(SPACE_PATTERN.sub("", text))
+    return words, characters, tags
+
+class SegmentCounts():
+    """
+    Object of counts of all segments in a file stored as column arrays
+
+    Args:
+        key (str): key of file such as job uid or path
+    """
+    __slots__ = ('key', 'words', 'characters', 'tags', 'only_tag', 'hashes')
+
+    def __init__(self, key):
+        self.key = key
+        self.words = array('l')
+        self.characters = array('l')
+        self.tags = array('l')
+        self.only_tag = array('b')
+        self.hashes = []
+
+    def __len__(self):
+        return len(self.words)
+
+def count_mxliff(key, source):
+    """
+    Count all segments of mxliff
+
+    Args:
+        key (str): key of file
+        source (str or bytes): path, content or file object of mxliff, or Mxliff object
+
+    Returns:
+        SegmentCounts: counts of segments
+    """
+    counts = SegmentCounts(key)
+    for _, trans_unit in iter_trans_units(source):
+        string = trans_unit.source.string
+        words, characters, tags = count_text(string)
+        counts.words.append(words)
+        counts.characters.append(characters)
+        counts.tags.append(tags)
+        counts.only_tag.append(trans_unit.only_tag)
+        # repetitions ignore difference of whitespace
+        normalized = SPACE_PATTERN.sub(" ", string.strip())
+        counts.hashes.append(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest())
+    return counts
+
+def estimate_analysis(sources, workers=None, cross_file_repetitions=True):
+    """
+    Estimate analysis of mxliff files in parallel processes.
+    Repetitions are the second and later segments with the same source.
+    Matches with TM are not available locally, so non repeated segments are in "0%-49%" band.
+
+    Args:
+        sources (dict or list): key to path or content of mxliff, or list of paths used as keys
+        workers (int, optional): Defaults to None. processes of map_in_processes
+        cross_file_repetitions (bool, optional): Defaults to True. count repetitions across files like one analysis of many jobs
+
+    Returns:
+        AnalysisTable: table with (band, measure) columns of LOCAL_ANALYSIS_BANDS and LOCAL_ANALYSIS_MEASURES
+    """
+    if not isinstance(sources, dict):
+        sources = {source: source for source in sources}
+    return create_table(map_in_processes(count_mxliff, sources.items(), workers), cross_file_repetitions)
+
+def create_table(all_counts, cross_file_repetitions=True):
+    """
+    Create analysis table from counts of files
+
+    Args:
+        all_counts (iterable): SegmentCounts objects in the order of analysis
+        cross_file_repetitions (bool, optional): Defaults to True. count repetitions across files
+
+    Returns:
+        AnalysisTable: table with (band, measure) columns of LOCAL_ANALYSIS_BANDS and LOCAL_ANALYSIS_MEASURES
+    """
+    columns = [(band, measure) for band in LOCAL_ANALYSIS_BANDS for measure in LOCAL_ANALYSIS_MEASURES]
+    table = AnalysisTable(columns)
+    seen = set()
+    for counts in all_counts:
+        if not cross_file_repetitions:
+            seen = set()
+        table.append(AnalysisRecord(counts.key, counts.key, aggregate_counts(counts, seen)))
+    return table
+
+def aggregate_counts(counts, seen):
+    """
+    Sum counts of segments per band
+
+    Args:
+        counts (SegmentCounts): counts of segments
+        seen (set): hashes of segments counted before. updated with hashes of counts
+
+    Returns:
+        array: numbers in the order of columns of estimate_analysis
+    """
+    measures = len(LOCAL_ANALYSIS_MEASURES)
+    values = array('d', bytes(8 * len(LOCAL_ANALYSIS_BANDS) * measures))
+    for words, characters, tags, only_tag, segment_hash in zip(
+            counts.words, counts.characters, counts.tags, counts.only_tag, counts.hashes):
+        if only_tag:
+            band = 3
+        elif segment_hash in seen:
+            band = 1
+        else:
+            band = 2
+            seen.add(segment_hash)
+        for offset in (0, band * measures):
+            values[offset] = values[offset] + 1
+            values[offset + 1] = values[offset + 1] + words
+            values[offset + 2] = values[offset + 2] + characters
+            values[offset + 3] = values[offset + 3] + tags
+    return values
@@ -0,0 +1,257 @@
+"""
+This modules is to collect metrics of memsource API calls
+"""
+import os
+import re
+import threading
+import urllib.parse
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_VERSION_PATTERN = re.compile(r'^v[0-9]+$')
+
+def endpoint_name(method, url):
+    """
+    Get endpoint name from method and url. uid and id in the url path are replaced to "{}"
+
+    Args:
+        method (str): http method
+        url (str): url
+
+    Returns:
+        str: endpoint name such as "GET v1/projects/{}/jobs/{}"
+    """
+    path = urllib.parse.urlsplit(url).path
+    path = path.split('/api2/', 1)[-1]
+    segments = []
+    for segment in path.split('/'):
+        if segment == "":
+            continue
+        # ids are numeric and uids are long random strings
+        if not _VERSION_PATTERN.match(segment) and (len(segment) >= 20 or any(char.isdigit() for char in segment)):
+            segment = "{}"
+        segments.append(segment)
+    return f"{method} {'/'.join(segments)}"
+
+def body_size(data):
+    """
+    Get size of request body
+
+    Args:
+        data (bytes or file object or None): request body
+
+    Returns:
+        int: size of body in bytes
+    """
+    if data is None:
+        return 0
+    if hasattr(data, 'fileno'):
+        try:
+            return os.fstat(data.fileno()).st_size
+        except (OSError, ValueError):
+            return 0
+    try:
+        return memoryview(data).nbytes
+    except TypeError:
+        return 0
+
+class EndpointStats():
+    """
+    Object of statistics of one endpoint
+
+    Args:
+        buckets (tuple): upper bounds of latency histogram in seconds
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        # last count is for calls over the last bucket
+        self.histogram = [0] * (len(buckets) + 1)
+
+    def observe(self, duration, bytes_sent, bytes_received, error):
+        """
+        Add a call to statistics
+
+        Args:
+            duration (float): latency in seconds
+            bytes_sent (int): request body size
+            bytes_received (int): response body size
+            error (bool): True if the call is failed
+        """
+        self.calls = self.calls + 1
+        if error:
+            self.errors = self.errors + 1
+        self.bytes_sent = self.bytes_sent + bytes_sent
+        self.bytes_received = self.bytes_received + bytes_received
+        self.total_time = self.total_time + duration
+        self.max_time = max(self.max_time, duration)
+        index = 0
+        for index, bound in enumerate(self.buckets):
+            if duration <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.histogram[index] = self.histogram[index] + 1
+
+    def percentile(self, percent):
+        """
+        Get approximate latency percentile from histogram
+
+        Args:
+            percent (float): percentile such as 95
+
+        Returns:
+            float or None: upper bound of the bucket including the percentile
+        """
+        if self.calls == 0:
+            return None
+        rank = self.calls * percent / 100
+        count = 0
+        for index, bucket_count in enumerate(self.histogram):
+            count = count + bucket_count
+            if count >= rank:
+                if index < len(self.buckets):
+                    return self.buckets[index]
+                break
+        return self.max_time
+
+    def to_dict(self):
+        """
+        Convert statistics to dict
+
+        Returns:
+            dict: statistics
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytesSent": self.bytes_sent,
+            "bytesReceived": self.bytes_received,
+            "totalTime": self.total_time,
+            "maxTime": self.max_time,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "histogram": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.histogram)),
+        }
+
+class MetricsCollector():
+    """
+    Object collecting metrics of MemsourceAPI calls.
+    Pass to MemsourceAPI(metrics=...) to enable metrics.
+
+    Args:
+        buckets (tuple, optional): Defaults to LATENCY_BUCKETS. upper bounds of latency histogram in seconds
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.endpoints = {}
+        self.hooks = []
+        self.__lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        Add hook called with event dict for each call and retry.
+        event keys are "event", "endpoint", "status", "duration", "bytesSent", "bytesReceived" and "error"
+
+        Args:
+            hook (callable): hook function
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """
+        Remove hook
+
+        Args:
+            hook (callable): hook function
+        """
+        self.hooks.remove(hook)
+
+    def record_call(self, endpoint, duration, bytes_sent=0, bytes_received=0, status=None, error=None):
+        """
+        Record a call
+
+        Args:
+            endpoint (str): endpoint name
+            duration (float): latency in seconds
+            bytes_sent (int, optional): Defaults to 0. request body size
+            bytes_received (int, optional): Defaults to 0. response body size
+            status (int, optional): Defaults to None. http status code
+            error (Exception, optional): Defaults to None. raised exception
+        """
+        with self.__lock:
+            stats = self.__get_stats(endpoint)
+            stats.observe(duration, bytes_sent, bytes_received, error is not None)
+        if self.hooks:
+            self.__emit({
+                "event": "call",
+                "endpoint": endpoint,
+                "status": status,
+                "duration": duration,
+                "bytesSent": bytes_sent,
+                "bytesReceived": bytes_received,
+                "error": error,
+            })
+
+    def record_retry(self, endpoint):
+        """
+        Record a retry
+
+        Args:
+            endpoint (str): endpoint name
+        """
+        with self.__lock:
+            stats = self.__get_stats(endpoint)
+            stats.retries = stats.retries + 1
+        if self.hooks:
+            self.__emit({"event": "retry", "endpoint": endpoint})
+
+    def get_stats(self, endpoint):
+        """
+        Get statistics of endpoint
+
+        Args:
+            endpoint (str): endpoint name
+
+        Returns:
+            EndpointStats or None: statistics
+        """
+        return self.endpoints.get(endpoint)
+
+    def snapshot(self):
+        """
+        Get statistics of all endpoints
+
+        Returns:
+            dict: endpoint name to statistics dict
+        """
+        with self.__lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in self.endpoints.items()}
+
+    def reset(self):
+        """
+        Clear all statistics
+        """
+        with self.__lock:
+            self.endpoints = {}
+
+    def __get_stats(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = EndpointStats(self.buckets)
+            self.endpoints[endpoint] = stats
+        return stats
+
+    def __emit(self, event):
+        for hook in self.hooks:
+            hook(event)
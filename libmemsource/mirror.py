@@ -0,0 +1,279 @@
+"""
+This modules is to mirror memsource projects, jobs and workflow steps to SQLite for fast local queries
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_PROJECT_STATUSES = ("COMPLETED", "CANCELLED", "COMPLETED_BY_VENDOR", "DECLINED_BY_VENDOR")
+
+def fingerprint(obj):
+    """
+    Create fingerprint of json to detect changes
+
+    Args:
+        obj (dict): project or job json
+
+    Returns:
+        str: dateModified and status if the json has dateModified, else hash of the whole json
+    """
+    if obj.get('dateModified') is not None:
+        return f"{obj['dateModified']} {obj.get('status')}"
+    return hashlib.sha1(json.dumps(obj, sort_keys=True).encode('utf-8')).hexdigest()
+
+class LocalMirror():
+    """
+    Object mirroring projects, jobs and workflow steps to SQLite.
+    sync() fetches project list and then fetches jobs only of new, changed or active projects.
+
+    Args:
+        path (str): path of the SQLite database. ":memory:" is not persisted
+        terminal_statuses (tuple, optional): Defaults to TERMINAL_PROJECT_STATUSES.
+                                             jobs of unchanged projects in these statuses are not fetched again
+        workers (int, optional): Defaults to 4. concurrent projects fetched in sync
+    """
+
+    def __init__(self, path, terminal_statuses=TERMINAL_PROJECT_STATUSES, workers=4):
+        self.path = path
+        self.terminal_statuses = tuple(terminal_statuses)
+        self.workers = workers
+        self.__lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS projects ("
+                " uid TEXT PRIMARY KEY,"
+                " internal_id INTEGER,"
+                " name TEXT,"
+                " status TEXT,"
+                " fingerprint TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " synced_at REAL NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " uid TEXT PRIMARY KEY,"
+                " project_uid TEXT NOT NULL,"
+                " workflow_level INTEGER,"
+                " status TEXT,"
+                " target_lang TEXT,"
+                " filename TEXT,"
+                " fingerprint TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " synced_at REAL NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS workflow_steps ("
+                " project_uid TEXT NOT NULL,"
+                " workflow_level INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (project_uid, workflow_level))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS projects_internal_id ON projects (internal_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS projects_name ON projects (name)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_project ON jobs (project_uid, workflow_level)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close database
+        """
+        self.connection.close()
+
+    def sync(self, memsource_api):
+        """
+        Fetch changes from Memsource
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+
+        Returns:
+            dict: numbers of changed, removed and fetched rows
+        """
+        stats = {"projectsChanged": 0, "projectsRemoved": 0, "projectsFetched": 0,
+                 "jobsChanged": 0, "jobsRemoved": 0}
+        with self.__lock:
+            known = {uid: (project_fingerprint, status) for uid, project_fingerprint, status
+                     in self.connection.execute("SELECT uid, fingerprint, status FROM projects")}
+
+        projects = list(memsource_api.iter_projects())
+        changed_projects = {}
+        fetch_projects = []
+        for project in projects:
+            project_fingerprint = fingerprint(project)
+            if known.get(project['uid'], (None,))[0] != project_fingerprint:
+                changed_projects[project['uid']] = (project, project_fingerprint)
+                fetch_projects.append(project['uid'])
+            elif project.get('status') not in self.terminal_statuses:
+                # job status changes do not always change the project
+                fetch_projects.append(project['uid'])
+        removed_projects = set(known) - {project['uid'] for project in projects}
+
+        with self.__lock, self.connection:
+            for uid in removed_projects:
+                self.connection.execute("DELETE FROM projects WHERE uid = ?", (uid,))
+                self.connection.execute("DELETE FROM jobs WHERE project_uid = ?", (uid,))
+                self.connection.execute("DELETE FROM workflow_steps WHERE project_uid = ?", (uid,))
+        stats["projectsChanged"] = len(changed_projects)
+        stats["projectsRemoved"] = len(removed_projects)
+        stats["projectsFetched"] = len(fetch_projects)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for project_uid, steps, jobs in executor.map(lambda uid: self.__fetch_project(memsource_api, uid), fetch_projects):
+                # changed project is saved with its jobs, so a failed fetch is retried by the next sync
+                changed, removed = self.__save_project_jobs(project_uid, steps, jobs, changed_projects.get(project_uid))
+                stats["jobsChanged"] = stats["jobsChanged"] + changed
+                stats["jobsRemoved"] = stats["jobsRemoved"] + removed
+        logger.info('Synced local mirror: %s', stats)
+        return stats
+
+    @staticmethod
+    def __fetch_project(memsource_api, project_uid):
+        """
+        Fetch workflow steps and jobs of all workflow levels
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+            project_uid (str): project uid
+
+        Returns:
+            tuple: project uid, workflow step json list and job json list
+        """
+        steps = memsource_api.get_workflow_steps(project_uid).get('projectWorkflowSteps') or []
+        levels = sorted({step['workflowLevel'] for step in steps}) or [1]
+        jobs = []
+        for workflow_level in levels:
+            for job in memsource_api.list_jobs(project_uid, workflow_level)['content']:
+                job.setdefault('workflowLevel', workflow_level)
+                jobs.append(job)
+        return project_uid, steps, jobs
+
+    def __save_project_jobs(self, project_uid, steps, jobs, changed_project=None):
+        """
+        Save project, jobs and workflow steps of project in one transaction. unchanged jobs are not written
+
+        Args:
+            project_uid (str): project uid
+            steps (list): workflow step json list
+            jobs (list): job json list
+            changed_project (tuple, optional): Defaults to None. project json and fingerprint if the project is changed
+
+        Returns:
+            tuple: numbers of changed and removed jobs
+        """
+        now = time.time()
+        with self.__lock, self.connection:
+            if changed_project is not None:
+                project, project_fingerprint = changed_project
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (project['uid'], project.get('internalId'), project.get('name'), project.get('status'),
+                     project_fingerprint, json.dumps(project), now))
+            known = dict(self.connection.execute(
+                "SELECT uid, fingerprint FROM jobs WHERE project_uid = ?", (project_uid,)))
+            rows = []
+            for job in jobs:
+                job_fingerprint = fingerprint(job)
+                if known.pop(job['uid'], None) != job_fingerprint:
+                    rows.append((job['uid'], project_uid, job.get('workflowLevel'), job.get('status'), job.get('targetLang'),
+                                 job.get('filename'), job_fingerprint, json.dumps(job), now))
+            self.connection.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.executemany("DELETE FROM jobs WHERE uid = ?", [(uid,) for uid in known])
+            self.connection.execute("DELETE FROM workflow_steps WHERE project_uid = ?", (project_uid,))
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO workflow_steps VALUES (?, ?, ?)",
+                [(project_uid, step['workflowLevel'], json.dumps(step)) for step in steps])
+        return len(rows), len(known)
+
+    def __query(self, sql, params=()):
+        with self.__lock:
+            return [json.loads(data) for data, in self.connection.execute(sql, params)]
+
+    def get_project(self, uid):
+        """
+        Get project by uid
+
+        Args:
+            uid (str): project uid
+
+        Returns:
+            dict or None: project json
+        """
+        rows = self.__query("SELECT data FROM projects WHERE uid = ?", (uid,))
+        return rows[0] if rows else None
+
+    def get_project_by_internal_id(self, internal_id):
+        """
+        Get project by internal id
+
+        Args:
+            internal_id (str or int): internal id
+
+        Returns:
+            dict or None: project json
+        """
+        rows = self.__query("SELECT data FROM projects WHERE internal_id = ?", (int(internal_id),))
+        return rows[0] if rows else None
+
+    def list_projects(self, name=None, status=None):
+        """
+        List projects
+
+        Args:
+            name (str, optional): Defaults to None. project name
+            status (str, optional): Defaults to None. project status
+
+        Returns:
+            list: project json list
+        """
+        sql = "SELECT data FROM projects WHERE (? IS NULL OR name = ?) AND (? IS NULL OR status = ?) ORDER BY internal_id"
+        return self.__query(sql, (name, name, status, status))
+
+    def get_job(self, uid):
+        """
+        Get job by uid
+
+        Args:
+            uid (str): job uid
+
+        Returns:
+            dict or None: job json
+        """
+        rows = self.__query("SELECT data FROM jobs WHERE uid = ?", (uid,))
+        return rows[0] if rows else None
+
+    def list_jobs(self, project_uid, workflow_level=None, status=None):
+        """
+        List jobs of project
+
+        Args:
+            project_uid (str): project uid
+            workflow_level (int, optional): Defaults to None. all workflow levels if None
+            status (str, optional): Defaults to None. job status
+
+        Returns:
+            list: job json list
+        """
+        sql = ("SELECT data FROM jobs WHERE project_uid = ? AND (? IS NULL OR workflow_level = ?)"
+               " AND (? IS NULL OR status = ?) ORDER BY workflow_level, rowid")
+        return self.__query(sql, (project_uid, workflow_level, workflow_level, status, status))
+
+    def get_workflow_steps(self, project_uid):
+        """
+        Get workflow steps of project
+
+        Args:
+            project_uid (str): project uid
+
+        Returns:
+            list: workflow step json list
+        """
+        return self.__query("SELECT data FROM workflow_steps WHERE project_uid = ? ORDER BY workflow_level", (project_uid,))
@@ -0,0 +1,603 @@
+"""
+This modules is local stand-in server of memsource API for benchmarks and tests
+"""
+import gzip
+import io
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# responses smaller than this are not compressed
+COMPRESS_MIN_SIZE = 1024
+MXLF_TEMPLATE = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" xmlns:m="http://www.memsource.com/mxlf/2.0" version="1.2">\n'
+                 '<file original="{filename}" source-language="en" target-language="{target_lang}" datatype="plaintext" m:job-uid="{job_uid}" m:level="1">\n'
+                 '<body>\n{groups}</body>\n</file>\n</xliff>\n')
+MXLF_GROUP_TEMPLATE = ('<group id="{index}"><trans-unit id="{job_uid}:{index}" m:para-id="{index}">'
+                       '<source>Segment {index} of {{1}}job{{2}} {job_uid}.</source>'
+                       '<target>{target}</target></trans-unit></group>\n')
+
+class MockMemsourceServer():
+    """
+    Object of local server implementing memsource API endpoints used by MemsourceAPI.
+    Use MemsourceAPI(..., base_url=server.base_url).
+
+    Args:
+        projects (int, optional): Defaults to 3. number of projects
+        jobs_per_project (int, optional): Defaults to 10. number of jobs in each project and workflow level
+        segments_per_job (int, optional): Defaults to 200. number of segments in each job
+        workflow_levels (int, optional): Defaults to 1. number of workflow levels
+        page_size (int, optional): Defaults to 50. max items per page of list endpoints
+        latency (float, optional): Defaults to 0.0. seconds added to each response
+        jitter (float, optional): Defaults to 0.0. random seconds added to latency
+        slow_rate (float, optional): Defaults to 0.0. rate of responses delayed by slow_latency, e.g. tail latency
+        slow_latency (float, optional): Defaults to 5.0. seconds added to slow responses
+        error_rate (float, optional): Defaults to 0.0. rate of 500 responses
+        async_polls (int, optional): Defaults to 1. get_async_request calls before async request is completed
+        seed (int, optional): Defaults to 0. random seed
+        host (str, optional): Defaults to "127.0.0.1". listening address
+        port (int, optional): Defaults to 0. listening port. 0 is any free port
+    """
+
+    def __init__(self, projects=3, jobs_per_project=10, segments_per_job=200, workflow_levels=1, page_size=50,
+                 latency=0.0, jitter=0.0, slow_rate=0.0, slow_latency=5.0, error_rate=0.0, async_polls=1,
+                 seed=0, host="127.0.0.1", port=0):
+        self.segments_per_job = segments_per_job
+        self.workflow_levels = workflow_levels
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.async_polls = async_polls
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.server = None
+        self.thread = None
+        self.__lock = threading.Lock()
+        self.__next_id = 1000
+        self.async_requests = {}
+        self.projects = {}
+        self.jobs = {}
+        self.trans_memories = {}
+        self.term_bases = {}
+        for project_index in range(projects):
+            project = self.__add_project(f"Project {project_index}")
+            for job_index in range(jobs_per_project):
+                self.__add_job(project['uid'], f"file{job_index}.txt", "de")
+        self.routes = [
+            ("POST", r"v1/auth/login", self.login),
+            ("GET", r"v1/projects/?", self.list_projects),
+            ("GET", r"v1/projects/(?P<project>[^/]+)", self.get_project),
+            ("PUT", r"v1/projects/(?P<project>[^/]+)", self.edit_project),
+            ("POST", r"v2/projects/applyTemplate/(?P<template>[^/]+)", self.create_project),
+            ("GET", r"v1/projects/(?P<project>[^/]+)/workflowSteps", self.get_workflow_steps),
+            ("GET", r"v2/projects/(?P<project>[^/]+)/jobs", self.list_jobs),
+            ("POST", r"v1/projects/(?P<project>[^/]+)/jobs", self.create_job),
+            ("POST", r"v1/projects/(?P<project>[^/]+)/jobs/segmentsCount", self.get_segments_count),
+            ("POST", r"v1/projects/(?P<project>[^/]+)/jobs/bilingualFile", self.download_bilingual_file),
+            ("POST", r"v1/projects/(?P<project>[^/]+)/jobs/preTranslate", self.create_async),
+            ("POST", r"v3/projects/(?P<project>[^/]+)/jobs/qualityAssurances/run/?", self.create_async),
+            ("POST", r"v1/projects/(?P<project>[^/]+)/applyTemplate/(?P<template>[^/]+)/assignProviders(/forJobParts)?", self.list_project_jobs),
+            ("GET", r"v1/projects/(?P<project>[^/]+)/jobs/(?P<job>[^/]+)", self.get_job),
+            ("GET", r"v1/projects/(?P<project>[^/]+)/jobs/(?P<job>[^/]+)/segments", self.get_segments),
+            ("PUT", r"v2/projects/(?P<project>[^/]+)/jobs/(?P<job>[^/]+)/targetFile", self.create_async),
+            ("GET", r"v2/projects/(?P<project>[^/]+)/jobs/(?P<job>[^/]+)/downloadTargetFile/(?P<async>[^/]+)", self.download_target_file),
+            ("GET", r"v1/jobs/(?P<job>[^/]+)/conversations", self.list_conversations),
+            ("PUT", r"v1/bilingualFiles", self.upload_bilingual_file),
+            ("GET", r"v1/async/(?P<async>[^/]+)", self.get_async_request),
+            ("POST", r"v2/analyses", self.create_analysis),
+            ("GET", r"v3/analyses/(?P<analysis>[^/]+)", self.get_analysis),
+            ("GET", r"v1/analyses/(?P<analysis>[^/]+)/download", self.download_analysis),
+            ("POST", r"v1/transMemories", self.create_trans_memory),
+            ("DELETE", r"v1/transMemories/(?P<tm>[^/]+)", self.delete_trans_memory),
+            ("POST", r"v1/transMemories/(?P<tm>[^/]+)/import", self.import_trans_memory),
+            ("GET", r"v1/transMemories/(?P<tm>[^/]+)/export", self.export_trans_memory),
+            ("POST", r"v1/transMemories/(?P<tm>[^/]+)/search", self.search_trans_memory),
+            ("POST", r"v1/transMemories/(?P<tm>[^/]+)/targetLanguages", self.add_target_language),
+            ("POST", r"v1/termBases", self.create_term_base),
+            ("GET", r"v1/termBases/(?P<tb>[^/]+)", self.get_term_base),
+            ("PUT", r"v1/termBases/(?P<tb>[^/]+)", self.edit_term_base),
+            ("GET", r"v1/termBases/(?P<tb>[^/]+)/export", self.export_term_base),
+            ("POST", r"v1/termBases/(?P<tb>[^/]+)/upload", self.upload_term_base),
+            ("DELETE", r"v1/termBases/(?P<tb>[^/]+)/terms", self.clear_term_base),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self):
+        """
+        Base url for MemsourceAPI
+
+        Returns:
+            str: base url
+        """
+        return f"http://{self.host}:{self.port}/web/api2"
+
+    def start(self):
+        """
+        Start server in background thread
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Handler of mock request"""
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                """Handle GET"""
+                server.handle(self, "GET")
+
+            def do_POST(self):
+                """Handle POST"""
+                server.handle(self, "POST")
+
+            def do_PUT(self):
+                """Handle PUT"""
+                server.handle(self, "PUT")
+
+            def do_DELETE(self):
+                """Handle DELETE"""
+                server.handle(self, "DELETE")
+
+            def log_message(self, format_string, *args):
+                logger.debug(format_string, *args)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop server
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+
+    def handle(self, handler, method):
+        """
+        Dispatch request to route
+
+        Args:
+            handler (BaseHTTPRequestHandler): request handler
+            method (str): http method
+        """
+        url = urllib.parse.urlsplit(handler.path)
+        path = url.path.split('/web/api2/', 1)[-1]
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        if handler.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = self.read_chunked(handler.rfile)
+        else:
+            length = int(handler.headers.get('Content-Length') or 0)
+            body = handler.rfile.read(length) if length else b""
+        if handler.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        with self.__lock:
+            self.requests = self.requests + 1
+            delay = self.latency + self.random.random() * self.jitter
+            if self.slow_rate and self.random.random() < self.slow_rate:
+                delay = delay + self.slow_latency
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            self.send(handler, 500, {"errorCode": "InternalError", "errorDescription": "Injected error"})
+            return
+        if not path.startswith("v1/auth/") and not handler.headers.get('Authorization', '').startswith('ApiToken '):
+            self.send(handler, 401, {"errorCode": "AuthUnauthorized", "errorDescription": "Missing token"})
+            return
+        for route_method, pattern, route in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                try:
+                    status, result, content_type = route(query=query, body=body, headers=handler.headers, **match.groupdict())
+                except KeyError as err:
+                    self.send(handler, 404, {"errorCode": "NotFound", "errorDescription": str(err)})
+                    return
+                self.send(handler, status, result, content_type)
+                return
+        self.send(handler, 404, {"errorCode": "NotFound", "errorDescription": f"{method} {path}"})
+
+    @staticmethod
+    def read_chunked(rfile):
+        """
+        Read chunked transfer encoding body
+
+        Args:
+            rfile (file object): request stream
+
+        Returns:
+            bytes: request body
+        """
+        chunks = []
+        while True:
+            size = int(rfile.readline().split(b";")[0].strip(), 16)
+            if size == 0:
+                # skip trailer
+                while rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(rfile.read(size))
+            rfile.readline()
+
+    @staticmethod
+    def send(handler, status, result, content_type="application/json"):
+        """
+        Send response
+
+        Args:
+            handler (BaseHTTPRequestHandler): request handler
+            status (int): http status code
+            result (dict or str or bytes or None): response body
+            content_type (str, optional): Defaults to "application/json". content type
+        """
+        if result is None:
+            body = b""
+        elif isinstance(result, bytes):
+            body = result
+        elif isinstance(result, str):
+            body = result.encode("utf-8")
+        else:
+            body = json.dumps(result).encode("utf-8")
+        handler.send_response(status)
+        if body:
+            handler.send_header("Content-Type", content_type)
+            accept_encoding = handler.headers.get('Accept-Encoding', '')
+            if len(body) >= COMPRESS_MIN_SIZE and 'gzip' in accept_encoding:
+                body = gzip.compress(body, compresslevel=1)
+                handler.send_header("Content-Encoding", "gzip")
+            elif len(body) >= COMPRESS_MIN_SIZE and 'deflate' in accept_encoding:
+                body = zlib.compress(body, 1)
+                handler.send_header("Content-Encoding", "deflate")
+        handler.send_header("Content-Length", str(len(body)))
+        try:
+            handler.end_headers()
+            handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # client timed out or hedged request was abandoned
+            pass
+
+    def __new_id(self):
+        with self.__lock:
+            self.__next_id = self.__next_id + 1
+            return self.__next_id
+
+    def __new_uid(self, prefix):
+        return f"{prefix}{self.__new_id():020d}"
+
+    def __add_project(self, name):
+        internal_id = self.__new_id()
+        project = {
+            "uid": self.__new_uid("p"),
+            "internalId": internal_id,
+            "id": str(internal_id),
+            "name": name,
+            "status": "NEW",
+            "sourceLang": "en",
+            "targetLangs": ["de"],
+            "dateCreated": time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime()),
+        }
+        project["dateModified"] = project["dateCreated"]
+        self.projects[project['uid']] = project
+        return project
+
+    def __add_job(self, project_uid, filename, target_lang):
+        jobs = []
+        for workflow_level in range(1, self.workflow_levels + 1):
+            job = {
+                "uid": self.__new_uid("j"),
+                "innerId": str(len(self.jobs) + 1),
+                "status": "NEW",
+                "filename": filename,
+                "targetLang": target_lang,
+                "workflowLevel": workflow_level,
+                "projectUid": project_uid,
+                "imported": True,
+            }
+            self.jobs[job['uid']] = job
+            jobs.append(job)
+        return jobs
+
+    def __check_project(self, project_uid):
+        if project_uid not in self.projects:
+            raise KeyError(project_uid)
+
+    def __new_async(self, action):
+        async_request = {"id": str(self.__new_id()), "action": action, "dateCreated": time.time()}
+        self.async_requests[async_request['id']] = {"asyncRequest": async_request, "polls": 0}
+        return async_request
+
+    @staticmethod
+    def page(items, query, page_size):
+        """
+        Create page json
+
+        Args:
+            items (list): all items
+            query (dict): query parameters
+            page_size (int): max page size
+
+        Returns:
+            dict: page json
+        """
+        size = min(int(query.get('pageSize', page_size)), page_size)
+        number = int(query.get('pageNumber', 0))
+        total_pages = max(1, -(-len(items) // size))
+        content = items[number * size:(number + 1) * size]
+        return {
+            "totalElements": len(items),
+            "totalPages": total_pages,
+            "pageSize": size,
+            "pageNumber": number,
+            "numberOfElements": len(content),
+            "content": content,
+        }
+
+    def mxliff(self, job):
+        """
+        Create mxliff of job
+
+        Args:
+            job (dict): job json
+
+        Returns:
+            str: mxliff
+        """
+        groups = "".join(MXLF_GROUP_TEMPLATE.format(index=index, job_uid=job['uid'], target="" if index % 3 else f"Segment {index}")
+                         for index in range(self.segments_per_job))
+        return MXLF_TEMPLATE.format(filename=job['filename'], target_lang=job['targetLang'], job_uid=job['uid'], groups=groups)
+
+    def login(self, query, body, headers):
+        """POST v1/auth/login"""
+        obj = json.loads(body)
+        if not obj.get('userName'):
+            return 401, {"errorCode": "AuthInvalidCredentials"}, "application/json"
+        expires = time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime(time.time() + 86400))
+        return 200, {"token": f"token-{self.__new_id()}", "expires": expires, "user": {"userName": obj['userName']}}, "application/json"
+
+    def list_projects(self, query, body, headers):
+        """GET v1/projects"""
+        projects = list(self.projects.values())
+        if 'name' in query:
+            projects = [project for project in projects if project['name'] == query['name']]
+        return 200, self.page(projects, query, self.page_size), "application/json"
+
+    def get_project(self, query, body, headers, project):
+        """GET v1/projects/{project}"""
+        return 200, self.projects[project], "application/json"
+
+    def edit_project(self, query, body, headers, project):
+        """PUT v1/projects/{project}"""
+        self.projects[project].update(json.loads(body))
+        self.projects[project]["dateModified"] = time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime())
+        return 200, self.projects[project], "application/json"
+
+    def create_project(self, query, body, headers, template):
+        """POST v2/projects/applyTemplate/{template}"""
+        obj = json.loads(body)
+        return 201, self.__add_project(obj['name']), "application/json"
+
+    def get_workflow_steps(self, query, body, headers, project):
+        """GET v1/projects/{project}/workflowSteps"""
+        steps = [{"id": str(level), "name": f"Step {level}", "workflowLevel": level} for level in range(1, self.workflow_levels + 1)]
+        return 200, {"projectWorkflowSteps": steps}, "application/json"
+
+    def list_jobs(self, query, body, headers, project):
+        """GET v2/projects/{project}/jobs"""
+        self.__check_project(project)
+        workflow_level = int(query.get('workflowLevel', 1))
+        jobs = [job for job in self.jobs.values() if job['projectUid'] == project and job['workflowLevel'] == workflow_level]
+        return 200, self.page(jobs, query, self.page_size), "application/json"
+
+    def list_project_jobs(self, query, body, headers, project, template):
+        """POST v1/projects/{project}/applyTemplate/{template}/assignProviders"""
+        jobs = [job for job in self.jobs.values() if job['projectUid'] == project]
+        return 200, {"jobs": jobs}, "application/json"
+
+    def create_job(self, query, body, headers, project):
+        """POST v1/projects/{project}/jobs"""
+        self.__check_project(project)
+        memsource = json.loads(headers.get('Memsource', '{}'))
+        disposition = headers.get('Content-Disposition', '')
+        filename = urllib.parse.unquote(disposition.split("''", 1)[-1]) or "file.txt"
+        jobs = []
+        for target_lang in memsource.get('targetLangs') or ["de"]:
+            jobs.extend(self.__add_job(project, filename, target_lang))
+        async_request = self.__new_async("IMPORT_JOB")
+        return 201, {"jobs": jobs, "asyncRequest": async_request}, "application/json"
+
+    def get_job(self, query, body, headers, project, job):
+        """GET v1/projects/{project}/jobs/{job}"""
+        return 200, self.jobs[job], "application/json"
+
+    def get_segments_count(self, query, body, headers, project):
+        """POST v1/projects/{project}/jobs/segmentsCount"""
+        obj = json.loads(body)
+        results = [{"jobPartUid": job['uid'], "counts": {"segmentsCount": self.segments_per_job}} for job in obj['jobs']]
+        return 200, {"segmentsCountsResults": results}, "application/json"
+
+    def get_segments(self, query, body, headers, project, job):
+        """GET v1/projects/{project}/jobs/{job}/segments"""
+        job = self.jobs[job]
+        begin_index = int(query.get('beginIndex', 0))
+        end_index = min(int(query.get('endIndex', 0)), self.segments_per_job - 1)
+        segments = [{
+            "id": f"{job['uid']}:{index}",
+            "source": f"Segment {index} of job {job['uid']}.",
+            "translation": "" if index % 3 else f"Segment {index}",
+            "workflowLevel": index % self.workflow_levels + 1,
+            "status": "CONFIRMED" if index % 3 == 0 else "NOT_CONFIRMED",
+        } for index in range(begin_index, end_index + 1)]
+        return 200, {"segments": segments}, "application/json"
+
+    def download_bilingual_file(self, query, body, headers, project):
+        """POST v1/projects/{project}/jobs/bilingualFile"""
+        jobs = [self.jobs[job['uid']] for job in json.loads(body)['jobs']]
+        if len(jobs) == 1:
+            return 200, self.mxliff(jobs[0]), "application/octet-stream"
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for job in jobs:
+                zip_file.writestr(f"{job['filename']}-{job['uid']}.mxliff", self.mxliff(job))
+        return 200, archive.getvalue(), "application/octet-stream"
+
+    def upload_bilingual_file(self, query, body, headers):
+        """PUT v1/bilingualFiles"""
+        uids = re.findall(rb'm:job-uid="([^"]+)"', body)
+        jobs = [self.jobs[uid.decode("utf-8")] for uid in uids]
+        return 200, {"jobs": jobs}, "application/json"
+
+    def create_async(self, query, body, headers, project, job=None):
+        """POST preTranslate, qualityAssurances and PUT targetFile"""
+        self.__check_project(project)
+        return 202, {"asyncRequest": self.__new_async("MOCK")}, "application/json"
+
+    def download_target_file(self, query, body, headers, project, job, **kwargs):
+        """GET v2/projects/{project}/jobs/{job}/downloadTargetFile/{async}"""
+        job = self.jobs[job]
+        text = "".join(f"Segment {index}\n" for index in range(self.segments_per_job))
+        return 200, text, "application/octet-stream"
+
+    def list_conversations(self, query, body, headers, job):
+        """GET v1/jobs/{job}/conversations"""
+        return 200, {"conversations": []}, "application/json"
+
+    def get_async_request(self, query, body, headers, **kwargs):
+        """GET v1/async/{async}"""
+        entry = self.async_requests[kwargs['async']]
+        with self.__lock:
+            entry['polls'] = entry['polls'] + 1
+            completed = entry['polls'] >= self.async_polls
+        result = dict(entry['asyncRequest'])
+        result['asyncResponse'] = {"dateCreated": time.time()} if completed else None
+        return 200, result, "application/json"
+
+    def create_analysis(self, query, body, headers):
+        """POST v2/analyses"""
+        obj = json.loads(body)
+        analyse_id = str(self.__new_id())
+        self.async_requests[f"analysis-{analyse_id}"] = {"jobs": [job['uid'] for job in obj['jobs']]}
+        async_request = self.__new_async("PRE_ANALYSE")
+        return 200, {"asyncRequests": [{"asyncRequest": async_request, "analyse": {"id": analyse_id}}]}, "application/json"
+
+    def get_analysis(self, query, body, headers, analysis):
+        """GET v3/analyses/{analysis}"""
+        return 200, {"id": analysis, "type": "PreAnalyse", "jobs": self.async_requests[f"analysis-{analysis}"]['jobs']}, "application/json"
+
+    def download_analysis(self, query, body, headers, analysis):
+        """GET v1/analyses/{analysis}/download"""
+        job_uids = self.async_requests[f"analysis-{analysis}"]['jobs']
+        bands = ["All", "Repetitions", "100%", "0%-49%"]
+        lines = [f'"Analysis";"Analysis #{analysis}"', "",
+                 '"File";"Job UID";' + ";".join(f'"{band}";;' for band in bands),
+                 ';;' + ";".join('"Segments";"Words";"Characters"' for _ in bands)]
+        for job_uid in job_uids:
+            segments = self.segments_per_job
+            numbers = [segments, segments * 6, segments * 30, 0, 0, 0, segments // 3, segments * 2, segments * 10,
+                       segments - segments // 3, segments * 4, segments * 20]
+            lines.append(f'"{self.jobs[job_uid]["filename"]}";"{job_uid}";' + ";".join(f'"{number}"' for number in numbers))
+        return 200, "\n".join(lines) + "\n", "text/csv"
+
+    def create_trans_memory(self, query, body, headers):
+        """POST v1/transMemories"""
+        obj = json.loads(body)
+        trans_memory = {"uid": self.__new_uid("t"), "id": str(self.__new_id()), "name": obj['name'],
+                        "sourceLang": obj['sourceLang'], "targetLangs": obj['targetLangs'], "units": 0}
+        self.trans_memories[trans_memory['uid']] = trans_memory
+        self.trans_memories[trans_memory['id']] = trans_memory
+        return 201, trans_memory, "application/json"
+
+    def delete_trans_memory(self, query, body, headers, tm):
+        """DELETE v1/transMemories/{tm}"""
+        trans_memory = self.trans_memories[tm]
+        self.trans_memories.pop(trans_memory['uid'], None)
+        self.trans_memories.pop(trans_memory['id'], None)
+        return 204, None, "application/json"
+
+    def import_trans_memory(self, query, body, headers, tm):
+        """POST v1/transMemories/{tm}/import"""
+        trans_memory = self.trans_memories[tm]
+        trans_memory['units'] = trans_memory['units'] + body.count(b"<tu>") + body.count(b"<tu ")
+        return 200, {"acceptedSegmentsCount": trans_memory['units']}, "application/json"
+
+    def export_trans_memory(self, query, body, headers, tm):
+        """GET v1/transMemories/{tm}/export"""
+        trans_memory = self.trans_memories[tm]
+        units = "".join(f'<tu><tuv xml:lang="en"><seg>Segment {index}</seg></tuv><tuv xml:lang="de"><seg>Segment {index}</seg></tuv></tu>\n'
+                        for index in range(max(trans_memory['units'], self.segments_per_job)))
+        tmx = f'<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4"><header srclang="en"/><body>\n{units}</body></tmx>\n'
+        return 200, tmx, "application/tmx"
+
+    def search_trans_memory(self, query, body, headers, tm):
+        """POST v1/transMemories/{tm}/search"""
+        if tm not in self.trans_memories:
+            raise KeyError(tm)
+        obj = json.loads(body)
+        return 200, {"searchResults": [{"score": 1.0, "source": {"text": obj['query']}}]}, "application/json"
+
+    def add_target_language(self, query, body, headers, tm):
+        """POST v1/transMemories/{tm}/targetLanguages"""
+        trans_memory = self.trans_memories[tm]
+        trans_memory['targetLangs'].append(json.loads(body)['language'])
+        return 201, trans_memory, "application/json"
+
+    def create_term_base(self, query, body, headers):
+        """POST v1/termBases"""
+        obj = json.loads(body)
+        term_base = {"uid": self.__new_uid("b"), "id": str(self.__new_id()), "name": obj['name'], "langs": obj['langs'], "terms": 0}
+        self.term_bases[term_base['uid']] = term_base
+        self.term_bases[term_base['id']] = term_base
+        return 201, term_base, "application/json"
+
+    def get_term_base(self, query, body, headers, tb):
+        """GET v1/termBases/{tb}"""
+        return 200, self.term_bases[tb], "application/json"
+
+    def edit_term_base(self, query, body, headers, tb):
+        """PUT v1/termBases/{tb}"""
+        self.term_bases[tb].update(json.loads(body))
+        return 200, self.term_bases[tb], "application/json"
+
+    def export_term_base(self, query, body, headers, tb):
+        """GET v1/termBases/{tb}/export"""
+        term_base = self.term_bases[tb]
+        entries = "".join(f'<termEntry id="{index}"><langSet xml:lang="en"><tig><term>term {index}</term></tig></langSet></termEntry>\n'
+                          for index in range(max(term_base['terms'], 100)))
+        tbx = f'<?xml version="1.0" encoding="UTF-8"?>\n<martif type="TBX"><text><body>\n{entries}</body></text></martif>\n'
+        return 200, tbx, "application/tbx"
+
+    def upload_term_base(self, query, body, headers, tb):
+        """POST v1/termBases/{tb}/upload"""
+        term_base = self.term_bases[tb]
+        term_base['terms'] = term_base['terms'] + body.count(b"<termEntry")
+        return 200, {"acceptedTermsCount": term_base['terms']}, "application/json"
+
+    def clear_term_base(self, query, body, headers, tb):
+        """DELETE v1/termBases/{tb}/terms"""
+        self.term_bases[tb]['terms'] = 0
+        return 204, None, "application/json"
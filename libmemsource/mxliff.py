@@ -2,23 +2,66 @@
 This modules is to handle mxliff file
 """
 
+import io
+import mmap
+import os
 import re
+import time
 from lxml import etree
 
+XLIFF_NAMESPACE = 'urn:oasis:names:tc:xliff:document:1.2'
+MXLF_NAMESPACE = 'http://www.memsource.com/mxlf/2.0'
+PARSE_CHUNK_SIZE = 1024 * 1024
+REWRITE_CHUNK_SIZE = 1024 * 1024
+FILE_TAG = f'{{{XLIFF_NAMESPACE}}}file'
+GROUP_TAG = f'{{{XLIFF_NAMESPACE}}}group'
+TRANS_UNIT_TAG = f'{{{XLIFF_NAMESPACE}}}trans-unit'
+TRANS_UNIT_START_PATTERN = re.compile(rb'<trans-unit[\s>]|<!--')
+COMMENT_START = b'<!--'
+COMMENT_END = b'-->'
+TRANS_UNIT_END = b'</trans-unit>'
+TARGET_PATTERN = re.compile(rb'(<target(?:\s[^>]*?)?)(/>|>(.*?)</target>)', re.DOTALL)
+XLIFF_START_PATTERN = re.compile(rb'<xliff[\s>][^>]*>')
+NAMESPACE_DECLARATION_PATTERN = re.compile(rb'\sxmlns(?::[\w.-]+)?=(?:"[^"]*"|\'[^\']*\')')
+
+def clean_element_string(string):
+    """
+    Clean the string of Element
+
+    Args:
+        string (str): plain text of Element
+
+    Returns:
+        str: string of deleted xml tag
+    """
+    string = string.strip()
+    string = re.sub('<.*?>', "", string, flags=re.DOTALL)
+    return string
+
 class Mxliff():
     """
     Object handling mxliff file
 
     Args:
-        path (str): path of the mxliff file
+        path (str or bytes): path of the mxliff file, mxliff content as bytes, memoryview, mmap or file object,
+                             or etree.ElementTree already parsed, e.g. by MxliffFeedParser
+        profile (bool, optional): Defaults to False. record time of each parse phase to self.stats
+        callback (callable, optional): Defaults to None. called with ParseStats after parse and back_to_xlf.
+                                       profile is enabled if callback is given
     """
 
-    def __init__(self, path):
+    def __init__(self, path, profile=False, callback=None):
         self.source_language = ""
         self.target_language = ""
         self.trans_unit_count = 0
-        self.path = path
-        self.tree = etree.parse(path)
+        self.path = path if isinstance(path, (str, os.PathLike)) else None
+        self.callback = callback
+        self.stats = ParseStats() if profile or callback is not None else None
+        if self.stats is not None:
+            # file object is read to the end by parsing
+            size = self.__get_size(path)
+            start = time.perf_counter()
+        self.tree = self.__parse(path)
         etree.register_namespace('xliff', 'urn:oasis:names:tc:xliff:document:1.2')
         etree.register_namespace('m', 'http://www.memsource.com/mxlf/2.0')
         self.root = self.tree.getroot()
@@ -26,8 +69,80 @@ class Mxliff():
             'xliff': 'urn:oasis:names:tc:xliff:document:1.2',
             'm': 'http://www.memsource.com/mxlf/2.0'
         }
-        self.files = self.__get_segment()
+        if self.stats is None:
+            self.files = self.__get_segment()
+            self.__set_language()
+            return
+
+        self.stats.add("parse", time.perf_counter() - start)
+        self.stats.bytes_processed = size
+        self.files = self.__get_segment(self.stats)
         self.__set_language()
+        self.stats.trans_unit_count = self.trans_unit_count
+        self.stats.file_count = len(self.files)
+        self.stats.add("total", time.perf_counter() - start)
+        if self.callback is not None:
+            self.callback(self.stats)
+
+    @staticmethod
+    def __parse(source):
+        """
+        Parse mxliff without copying the whole content
+
+        Args:
+            source (str or bytes): path, bytes, memoryview, mmap or file object
+
+        Returns:
+            etree.ElementTree: tree of mxliff
+        """
+        if isinstance(source, (str, os.PathLike)):
+            return etree.parse(source)
+        if hasattr(source, 'getroot'):
+            return source
+        if isinstance(source, bytes):
+            return etree.ElementTree(etree.fromstring(source))
+        if isinstance(source, mmap.mmap):
+            # mmap is read in chunks as file object
+            source.seek(0)
+            return etree.parse(source)
+        if hasattr(source, 'read'):
+            return etree.parse(source)
+        # lxml does not accept buffer. feed it in chunks to avoid copying the whole buffer
+        parser = etree.XMLParser()
+        with memoryview(source) as view:
+            view = view.cast('B')
+            for offset in range(0, view.nbytes, PARSE_CHUNK_SIZE):
+                parser.feed(bytes(view[offset:offset + PARSE_CHUNK_SIZE]))
+        return etree.ElementTree(parser.close())
+
+    @staticmethod
+    def __get_size(source):
+        """
+        Get size of mxliff source
+
+        Args:
+            source (str or bytes): path, bytes, memoryview, mmap or file object
+
+        Returns:
+            int: size in bytes from the current position. 0 if file object is not seekable
+        """
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        if isinstance(source, mmap.mmap):
+            return source.size()
+        if hasattr(source, 'getroot'):
+            return 0
+        if isinstance(source, io.BytesIO):
+            return source.getbuffer().nbytes - source.tell()
+        if hasattr(source, 'read'):
+            if not source.seekable():
+                return 0
+            position = source.tell()
+            end = source.seek(0, io.SEEK_END)
+            source.seek(position)
+            return end - position
+        with memoryview(source) as view:
+            return view.nbytes
 
     def __set_language(self):
         """
@@ -38,10 +153,13 @@ class Mxliff():
         self.source_language = files[0].get('source-language')
         self.target_language = files[0].get('target-language')
 
-    def __get_segment(self):
+    def __get_segment(self, stats=None):
         """
         Create File obcject from mxliff file
 
+        Args:
+            stats (ParseStats, optional): Defaults to None. stats to record time of each step of creating trans-units
+
         Returns:
             File: File objects
         """
@@ -50,91 +168,181 @@ class Mxliff():
         for file in self.root.findall('xliff:file', self.namespace):
             file_obj = File(file.get('original'))
             for trans_unit_element in file.findall('xliff:body/xliff:group/xliff:trans-unit', self.namespace):
-                trans_unit_obj = TransUnit(trans_unit_element.get('id'))
-                trans_unit_obj.source = self.__create_seg_obj(trans_unit_element, "source")
-                trans_unit_obj.set_only_tag_flag()
-                trans_unit_obj.target = self.__create_seg_obj(trans_unit_element, "target")
-                trans_unit_obj.metadata = self.__create_metadata(trans_unit_element)
+                trans_unit_obj = create_trans_unit(trans_unit_element, self.namespace, stats=stats)
                 trans_unit_count = trans_unit_count + 1
                 file_obj.trans_units.append(trans_unit_obj)
             files.append(file_obj)
         self.trans_unit_count = trans_unit_count
         return files
 
-    def __create_seg_obj(self, trans_unit_element, tag):
+    def back_to_xlf(self, path=None):
         """
-        Creale Segment object from etree.Element
+        Generate to xlf file from File object
 
         Args:
-            trans_unit_element (etree.Element): Element object of etree
-            tag (str): tag name (source, seg-source, target)
-
-        Returns:
-            Segment: Segment object in this class
+            path (str, optional): Defaults to None. output path. the parsed file is overwritten if None
         """
-
-        element = trans_unit_element.find('xliff:'+tag, self.namespace)
-
-        seg_obj = Segment()
-        seg_obj.string = self.__convert_element_to_string(element)
-        return seg_obj
-
-    def __create_metadata(self, trans_unit_element):
-        elements = trans_unit_element.findall('m:tunit-metadata/m:mark', self.namespace)
-        marks = dict()
-        for element in elements:
-            mark_obj = Mark()
-            if element.find('m:type', self.namespace) is not None:
-                mark_obj.type = self.__clean_element_string(etree.tostring(element.find('m:type', self.namespace), encoding='unicode'))
-            mark_obj.content = self.__clean_element_string(etree.tostring(element.find('m:content', self.namespace), encoding='unicode'))
-            marks[element.get('id')] = mark_obj
-        return marks
-
-
-    def __convert_element_to_string(self, element):
+        path = path if path is not None else self.path
+        if path is None:
+            raise ValueError("path is required when Mxliff is created from bytes")
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        self.__apply_targets()
+        self.tree.write(path, encoding="utf-8", xml_declaration=True)
+        if self.stats is not None:
+            self.stats.add("back_to_xlf", time.perf_counter() - start)
+            if self.callback is not None:
+                self.callback(self.stats)
+
+    def to_bytes(self):
         """
-        Convert Element object to string
-
-        Args:
-            element (etree.Element): Element object of etree
+        Generate xlf content from File object without writing file, e.g. for upload_mxlf_file
 
         Returns:
-            str: plain text of Element
+            bytes: mxliff content
         """
-
-        string = etree.tostring(element, encoding='unicode')
-        return self.__clean_element_string(string)
-
-    def back_to_xlf(self):
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        self.__apply_targets()
+        content = etree.tostring(self.tree, encoding="utf-8", xml_declaration=True)
+        if self.stats is not None:
+            self.stats.add("to_bytes", time.perf_counter() - start)
+            if self.callback is not None:
+                self.callback(self.stats)
+        return content
+
+    def __apply_targets(self):
         """
-        Generate to xlf file from File object
+        Replace <target> elements with target of TransUnit objects
         """
+        trans_unit_elements = {}
+        for file in self.root.findall('xliff:file', self.namespace):
+            original = file.get('original')
+            for trans_unit_element in file.findall('xliff:body/xliff:group/xliff:trans-unit', self.namespace):
+                trans_unit_elements[(original, trans_unit_element.get('id'))] = trans_unit_element
 
         for file in self.files:
             for trans_unit in file.trans_units:
                 new_target_element = self.__create_xml_string_for_element(trans_unit.target)
-                condition = ('xliff:file[@original="{0}"]/xliff:body/xliff:group/xliff:trans-unit[@id="{1}"]'
-                             .format(file.original, trans_unit.trans_unit_id))
-                trans_unit_element = self.root.find(condition, self.namespace)
+                trans_unit_element = trans_unit_elements[(file.original, trans_unit.trans_unit_id)]
                 target = trans_unit_element.find('xliff:target', self.namespace)
-                trans_unit_element.remove(target)
-                trans_unit_element.append(new_target_element)
-        self.tree.write(self.path, encoding="utf-8", xml_declaration=True)
+                if target is None:
+                    trans_unit_element.append(new_target_element)
+                else:
+                    trans_unit_element.replace(target, new_target_element)
+
+    @classmethod
+    def rewrite(cls, src, dst, target_fn):
+        """
+        Replace <target> of each trans-unit while reading mxliff in chunks.
+        Only one trans-unit is kept in memory and all markup except replaced targets is copied byte-for-byte,
+        so multi-GB files can be processed.
+
+        Args:
+            src (str or file object): path or binary file object of source mxliff
+            dst (str or file object): path or binary file object to write
+            target_fn (callable): target_fn(trans_unit) returning new target string or None to keep the target.
+                                  trans_unit is TransUnit object
+
+        Returns:
+            int: number of replaced targets
+        """
+        if isinstance(src, (str, os.PathLike)):
+            with open(src, 'rb') as src_file:
+                return cls.rewrite(src_file, dst, target_fn)
+        if isinstance(dst, (str, os.PathLike)):
+            with open(dst, 'wb') as dst_file:
+                return cls.rewrite(src, dst_file, target_fn)
+
+        namespace_declarations = None
+        replaced = 0
+        buffer = bytearray()
+        in_trans_unit = False
+        eof = False
+        while True:
+            if not eof:
+                chunk = src.read(REWRITE_CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+            while True:
+                if in_trans_unit:
+                    end = buffer.find(TRANS_UNIT_END)
+                    if end < 0:
+                        break
+                    end = end + len(TRANS_UNIT_END)
+                    trans_unit_bytes, is_replaced = cls.__rewrite_trans_unit(
+                        bytes(buffer[:end]), namespace_declarations, target_fn)
+                    dst.write(trans_unit_bytes)
+                    replaced = replaced + is_replaced
+                    del buffer[:end]
+                    in_trans_unit = False
+                    continue
+                match = TRANS_UNIT_START_PATTERN.search(buffer)
+                # skip comments which may contain <trans-unit>
+                while match is not None and match.group() == COMMENT_START:
+                    comment_end = buffer.find(COMMENT_END, match.end())
+                    if comment_end < 0:
+                        break
+                    match = TRANS_UNIT_START_PATTERN.search(buffer, comment_end + len(COMMENT_END))
+                if match is not None and match.group() == COMMENT_START and not eof:
+                    # keep incomplete comment until its end is read
+                    cut = match.start()
+                elif match is not None and match.group() != COMMENT_START:
+                    cut = match.start()
+                    in_trans_unit = True
+                elif eof:
+                    cut = len(buffer)
+                else:
+                    # keep incomplete tag at the end of chunk
+                    cut = buffer.rfind(b'<')
+                    if cut < 0 or buffer.find(b'>', cut) >= 0:
+                        cut = len(buffer)
+                if namespace_declarations is None:
+                    xliff_match = XLIFF_START_PATTERN.search(buffer, 0, cut)
+                    if xliff_match is not None:
+                        namespace_declarations = b''.join(NAMESPACE_DECLARATION_PATTERN.findall(xliff_match.group()))
+                dst.write(buffer[:cut])
+                del buffer[:cut]
+                if not in_trans_unit:
+                    break
+            if eof:
+                if in_trans_unit:
+                    raise ValueError("trans-unit is not closed")
+                return replaced
 
     @staticmethod
-    def __clean_element_string(string):
+    def __rewrite_trans_unit(trans_unit_bytes, namespace_declarations, target_fn):
         """
-        Clean the string of Element
+        Replace <target> in bytes of one trans-unit
 
         Args:
-            string (str): plain text of Element
+            trans_unit_bytes (bytes): <trans-unit>...</trans-unit>
+            namespace_declarations (bytes or None): xmlns attributes of <xliff>
+            target_fn (callable): target_fn(trans_unit) returning new target string or None
 
         Returns:
-            str: string of deleted xml tag
+            tuple: bytes of trans-unit and 1 if target is replaced else 0
         """
-        string = string.strip()
-        string = re.sub('<.*?>', "", string, flags=re.DOTALL)
-        return string
+        if namespace_declarations is None:
+            namespace_declarations = f' xmlns="{XLIFF_NAMESPACE}" xmlns:m="{MXLF_NAMESPACE}"'.encode('utf-8')
+        wrapper = etree.fromstring(b'<wrapper' + namespace_declarations + b'>' + trans_unit_bytes + b'</wrapper>')
+        trans_unit_element = wrapper[0]
+        namespace = {'xliff': XLIFF_NAMESPACE, 'm': MXLF_NAMESPACE}
+        trans_unit = create_trans_unit(trans_unit_element, namespace)
+        new_target = target_fn(trans_unit)
+        if new_target is None:
+            return trans_unit_bytes, 0
+
+        content = new_target.encode('utf-8')
+        source_end = max(trans_unit_bytes.find(b'</source>'), trans_unit_bytes.find(b'</seg-source>'))
+        match = TARGET_PATTERN.search(trans_unit_bytes, max(source_end, 0))
+        if match is None:
+            end = trans_unit_bytes.rfind(TRANS_UNIT_END)
+            return trans_unit_bytes[:end] + b'<target>' + content + b'</target>' + trans_unit_bytes[end:], 1
+        return (trans_unit_bytes[:match.start()] + match.group(1) + b'>' + content + b'</target>'
+                + trans_unit_bytes[match.end():]), 1
 
     @staticmethod
     def __create_xml_string_for_element(segment_obj):
@@ -147,10 +355,136 @@ class Mxliff():
         Returns:
             str: xml string
         """
-        xml_string = '<target>{0}</target>'.format(segment_obj.string)
+        xml_string = '<target xmlns="{0}">{1}</target>'.format(XLIFF_NAMESPACE, segment_obj.string)
         tree = etree.fromstring(xml_string)
         return tree
 
+def iter_trans_unit_elements(source):
+    """
+    Iterate <trans-unit> elements of mxliff one by one without keeping the whole tree.
+    Each element is cleared and removed with finished <group> and <file> elements when the next one is requested
+
+    Args:
+        source (str or bytes): path, content or file object of mxliff
+
+    Yields:
+        tuple: original of <file> and <trans-unit> element
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    original = None
+    for event, element in etree.iterparse(source, events=('start', 'end'), tag=(FILE_TAG, GROUP_TAG, TRANS_UNIT_TAG)):
+        if event == 'start':
+            if element.tag == FILE_TAG:
+                original = element.get('original')
+            continue
+        if element.tag == TRANS_UNIT_TAG:
+            yield original, element
+        # free elements already read
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+def iter_trans_units(source, metadata=False):
+    """
+    Iterate trans-units of mxliff one by one without keeping the whole tree
+
+    Args:
+        source (str or bytes): path, content or file object of mxliff, or Mxliff object
+        metadata (bool, optional): Defaults to False. create metadata of TransUnit
+
+    Yields:
+        tuple: original of <file> and TransUnit object
+    """
+    if isinstance(source, Mxliff):
+        for file in source.files:
+            for trans_unit in file.trans_units:
+                yield file.original, trans_unit
+        return
+    namespace = {'xliff': XLIFF_NAMESPACE, 'm': MXLF_NAMESPACE}
+    for original, element in iter_trans_unit_elements(source):
+        yield original, create_trans_unit(element, namespace, metadata)
+
+class MxliffFeedParser():
+    """
+    Writable object parsing mxliff while it is written, e.g. as stream of download_mxlf_file
+    """
+
+    def __init__(self):
+        self.parser = etree.XMLParser()
+        self.bytes_written = 0
+
+    def write(self, data):
+        """
+        Feed data to parser
+
+        Args:
+            data (bytes): chunk of mxliff content
+
+        Returns:
+            int: written bytes
+        """
+        self.parser.feed(bytes(data))
+        self.bytes_written = self.bytes_written + len(data)
+        return len(data)
+
+    def close(self, **kwargs):
+        """
+        Finish parsing and create Mxliff
+
+        Args:
+            **kwargs: profile and callback of Mxliff
+
+        Returns:
+            Mxliff: parsed mxliff
+        """
+        mxliff = Mxliff(etree.ElementTree(self.parser.close()), **kwargs)
+        if mxliff.stats is not None:
+            mxliff.stats.bytes_processed = self.bytes_written
+        return mxliff
+
+def create_trans_unit(trans_unit_element, namespace, metadata=True, stats=None):
+    """
+    Create TransUnit object from <trans-unit> element
+
+    Args:
+        trans_unit_element (etree.Element): Element object of etree
+        namespace (dict): prefix to namespace. "xliff" and "m" are required
+        metadata (bool, optional): Defaults to True. create metadata of TransUnit
+        stats (ParseStats, optional): Defaults to None. add time of "create_seg_obj", "set_only_tag_flag"
+                                      and "create_metadata" steps
+
+    Returns:
+        TransUnit: TransUnit object
+    """
+    if stats is not None:
+        start = time.perf_counter()
+    trans_unit_obj = TransUnit(trans_unit_element.get('id'))
+    for tag in ("source", "target"):
+        seg_obj = Segment()
+        element = trans_unit_element.find('xliff:' + tag, namespace)
+        if element is not None:
+            seg_obj.string = clean_element_string(etree.tostring(element, encoding='unicode', with_tail=False))
+        setattr(trans_unit_obj, tag, seg_obj)
+    if stats is not None:
+        seg_obj_end = time.perf_counter()
+        stats.add("create_seg_obj", seg_obj_end - start)
+    trans_unit_obj.set_only_tag_flag()
+    if stats is not None:
+        start = time.perf_counter()
+        stats.add("set_only_tag_flag", start - seg_obj_end)
+    if not metadata:
+        return trans_unit_obj
+    for element in trans_unit_element.findall('m:tunit-metadata/m:mark', namespace):
+        mark_obj = Mark()
+        if element.find('m:type', namespace) is not None:
+            mark_obj.type = clean_element_string(etree.tostring(element.find('m:type', namespace), encoding='unicode'))
+        mark_obj.content = clean_element_string(etree.tostring(element.find('m:content', namespace), encoding='unicode'))
+        trans_unit_obj.metadata[element.get('id')] = mark_obj
+    if stats is not None:
+        stats.add("create_metadata", time.perf_counter() - start)
+    return trans_unit_obj
+
 class File():
     """
     Object of <file> tag in mxliff
@@ -208,3 +542,38 @@ class Mark():
     def __init__(self):
         self.type = ""
         self.content = ""
+
+class ParseStats():
+    """
+    Object of time of each phase recorded by Mxliff(profile=True)
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.trans_unit_count = 0
+        self.file_count = 0
+        self.bytes_processed = 0
+
+    def add(self, phase, seconds):
+        """
+        Add time to phase
+
+        Args:
+            phase (str): phase name such as "parse" and "create_metadata"
+            seconds (float): wall time
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def to_dict(self):
+        """
+        Convert stats to dict
+
+        Returns:
+            dict: stats
+        """
+        return {
+            "phases": dict(self.phases),
+            "transUnitCount": self.trans_unit_count,
+            "fileCount": self.file_count,
+            "bytesProcessed": self.bytes_processed,
+        }
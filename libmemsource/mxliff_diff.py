@@ -0,0 +1,177 @@
+"""
+This modules is to compare two mxliff files of the same job without loading them to Mxliff
+"""
+import hashlib
+from lxml import etree
+from .mxliff import XLIFF_NAMESPACE, clean_element_string, iter_trans_unit_elements
+
+SOURCE_TAG = f'{{{XLIFF_NAMESPACE}}}source'
+TARGET_TAG = f'{{{XLIFF_NAMESPACE}}}target'
+ADDED = "added"
+REMOVED = "removed"
+SOURCE_CHANGED = "source-changed"
+TARGET_CHANGED = "target-changed"
+
+class UnitDigest():
+    """
+    Object of content hashes of a trans-unit
+
+    Args:
+        original (str): original of <file>
+        trans_unit_id (str): id of <trans-unit>
+        source_hash (bytes): hash of <source> content
+        target_hash (bytes): hash of <target> content
+        element (etree.Element): <trans-unit> element. it is cleared after the next trans-unit is read
+    """
+    __slots__ = ('original', 'trans_unit_id', 'source_hash', 'target_hash', 'element')
+
+    def __init__(self, original, trans_unit_id, source_hash, target_hash, element=None):
+        self.original = original
+        self.trans_unit_id = trans_unit_id
+        self.source_hash = source_hash
+        self.target_hash = target_hash
+        self.element = element
+
+    @property
+    def key(self):
+        """
+        Key of trans-unit
+
+        Returns:
+            tuple: (file original, trans-unit id)
+        """
+        return (self.original, self.trans_unit_id)
+
+class UnitDiff():
+    """
+    Object of a changed trans-unit
+
+    Args:
+        kind (str): ADDED, REMOVED, SOURCE_CHANGED or TARGET_CHANGED. SOURCE_CHANGED is used if both are changed
+        original (str): original of <file>
+        trans_unit_id (str): id of <trans-unit>
+        source (str or None): new source string. None for removed trans-unit
+        target (str or None): new target string. None for removed trans-unit
+        target_changed (bool): target is changed or added
+    """
+    __slots__ = ('kind', 'original', 'trans_unit_id', 'source', 'target', 'target_changed')
+
+    def __init__(self, kind, original, trans_unit_id, source=None, target=None, target_changed=False):
+        self.kind = kind
+        self.original = original
+        self.trans_unit_id = trans_unit_id
+        self.source = source
+        self.target = target
+        self.target_changed = target_changed
+
+    def to_dict(self):
+        """
+        Convert diff to dict
+
+        Returns:
+            dict: diff
+        """
+        return {
+            "kind": self.kind,
+            "original": self.original,
+            "transUnitId": self.trans_unit_id,
+            "source": self.source,
+            "target": self.target,
+            "targetChanged": self.target_changed,
+        }
+
+def hash_element(element):
+    """
+    Hash content of element. attributes of the element itself are ignored
+
+    Args:
+        element (etree.Element or None): <source> or <target>
+
+    Returns:
+        bytes: 16 bytes hash. hash of empty content if element is None
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if element is not None:
+        if element.text:
+            digest.update(element.text.encode('utf-8'))
+        for child in element:
+            digest.update(etree.tostring(child))
+    return digest.digest()
+
+def iter_unit_digests(source):
+    """
+    Iterate hashes of trans-units. trans-units are read one by one without keeping the whole tree
+
+    Args:
+        source (str or bytes): path, content or file object of mxliff
+
+    Yields:
+        UnitDigest: hashes of trans-unit
+    """
+    for original, element in iter_trans_unit_elements(source):
+        yield UnitDigest(original, element.get('id'),
+                         hash_element(element.find(SOURCE_TAG)), hash_element(element.find(TARGET_TAG)), element)
+
+def element_string(element):
+    """
+    Convert <source> or <target> to string same as Segment.string
+
+    Args:
+        element (etree.Element or None): element
+
+    Returns:
+        str: string of deleted xml tag
+    """
+    if element is None:
+        return ""
+    return clean_element_string(etree.tostring(element, encoding='unicode', with_tail=False))
+
+def diff_mxliff(old, new):
+    """
+    Compare trans-units of two mxliff files in linear time.
+    Only hashes of old file are kept in memory and diffs are yielded while new file is read.
+    Removed trans-units are yielded at the end.
+
+    Args:
+        old (str or bytes): path, content or file object of previous mxliff
+        new (str or bytes): path, content or file object of current mxliff
+
+    Yields:
+        UnitDiff: changed trans-unit
+    """
+    old_digests = {}
+    for digest in iter_unit_digests(old):
+        old_digests[digest.key] = (digest.source_hash, digest.target_hash)
+
+    for digest in iter_unit_digests(new):
+        old_hashes = old_digests.pop(digest.key, None)
+        if old_hashes is None:
+            kind = ADDED
+            target_changed = True
+        else:
+            source_changed = old_hashes[0] != digest.source_hash
+            target_changed = old_hashes[1] != digest.target_hash
+            if not source_changed and not target_changed:
+                continue
+            kind = SOURCE_CHANGED if source_changed else TARGET_CHANGED
+        yield UnitDiff(kind, digest.original, digest.trans_unit_id,
+                       element_string(digest.element.find(SOURCE_TAG)),
+                       element_string(digest.element.find(TARGET_TAG)), target_changed)
+
+    for original, trans_unit_id in old_digests:
+        yield UnitDiff(REMOVED, original, trans_unit_id)
+
+def summarize_diff(diffs):
+    """
+    Count diffs per kind
+
+    Args:
+        diffs (iterable): UnitDiff objects
+
+    Returns:
+        dict: kind to number of trans-units
+    """
+    summary = {ADDED: 0, REMOVED: 0, SOURCE_CHANGED: 0, TARGET_CHANGED: 0}
+    for diff in diffs:
+        summary[diff.kind] = summary[diff.kind] + 1
+    return summary
@@ -0,0 +1,29 @@
+"""
+This modules is to run CPU bound work on local files in worker processes
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+def map_in_processes(func, items, workers=None):
+    """
+    Call func with each argument tuple in worker processes.
+    Arguments are pickled to the processes, so objects which cannot be pickled such as Mxliff
+    can only be given with workers=1
+
+    Args:
+        func (callable): module level function
+        items (list): argument tuples of func
+        workers (int, optional): Defaults to None. processes. os.cpu_count() if None. 1 calls func in this process
+
+    Yields:
+        results of func in the order of items
+    """
+    items = list(items)
+    if workers == 1 or len(items) <= 1:
+        yield from itertools.starmap(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # a few chunks per process keep the processes busy with less pickling overhead
+        chunksize = max(1, len(items) // (4 * (workers or os.cpu_count() or 1)))
+        yield from executor.map(func, *zip(*items), chunksize=chunksize)
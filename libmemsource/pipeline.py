@@ -0,0 +1,93 @@
+"""
+This modules is to translate mxliff of jobs in memory without temporary files
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .mxliff import MxliffFeedParser
+
+logger = logging.getLogger(__name__)
+
+class PipelineException(Exception):
+    """Pipeline Exception"""
+    def __init__(self, message):
+        self.message = message
+
+def apply_transform(mxliff, transform):
+    """
+    Apply transform to target segments of mxliff
+
+    Args:
+        mxliff (Mxliff): mxliff object
+        transform (callable): transform(trans_unit) returning new target string or None to keep the target
+
+    Returns:
+        int: number of changed segments
+    """
+    count = 0
+    for file in mxliff.files:
+        for trans_unit in file.trans_units:
+            target = transform(trans_unit)
+            if target is None:
+                continue
+            trans_unit.target.string = target
+            trans_unit.mt_processed = True
+            count = count + 1
+    return count
+
+def translate_job(memsource_api, project_uid, job_uid, transform):
+    """
+    Download mxlf file of job, apply transform to target segments and upload the result.
+    The mxlf file is parsed while it is downloaded and the result is uploaded from memory.
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        project_uid (str): project uid
+        job_uid (str): job uid
+        transform (callable): transform(trans_unit) returning new target string or None to keep the target
+
+    Returns:
+        dict: number of changed segments and upload result. nothing is uploaded if no segment is changed
+    """
+    feed_parser = MxliffFeedParser()
+    memsource_api.download_mxlf_file(project_uid, job_uid, stream=feed_parser)
+    mxliff = feed_parser.close()
+    count = apply_transform(mxliff, transform)
+    if count == 0:
+        logger.info('No segment is changed in "%s". Skipping upload...', job_uid, extra={'uid': job_uid})
+        return {"segments": 0, "result": None}
+    result = memsource_api.upload_mxlf_file(mxliff.to_bytes())
+    return {"segments": count, "result": result}
+
+def translate_jobs(memsource_api, project_uid, job_uids, transform, workers=4):
+    """
+    Run translate_job for many jobs concurrently
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        project_uid (str): project uid
+        job_uids (list): job uids
+        transform (callable): transform(trans_unit) returning new target string or None to keep the target.
+                              it is called from worker threads
+        workers (int, optional): Defaults to 4. concurrent jobs
+
+    Raises:
+        PipelineException: some jobs are failed. the other jobs are uploaded
+
+    Returns:
+        dict: job uid to result of translate_job
+    """
+    results = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(translate_job, memsource_api, project_uid, job_uid, transform): job_uid
+                   for job_uid in job_uids}
+        for future in as_completed(futures):
+            job_uid = futures[future]
+            try:
+                results[job_uid] = future.result()
+            except Exception as err:
+                logger.error('Translating "%s" is failed: %s', job_uid, err, extra={'uid': job_uid})
+                failures[job_uid] = str(err)
+    if failures:
+        raise PipelineException({"failedJobs": failures, "results": results})
+    return results
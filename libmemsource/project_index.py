@@ -0,0 +1,161 @@
+"""
+This modules is to look up memsource projects without scanning project list
+"""
+import math
+import time
+
+class ProjectIndex():
+    """
+    Object indexing project json by internalId, uid and name
+
+    Args:
+        projects (list, optional): Defaults to None. project json list such as list_projects()['content']
+        full_refresh_interval (float, optional): Defaults to 86400. seconds after which refresh fetches all projects again.
+                                                 None never fetches all projects again
+    """
+
+    def __init__(self, projects=None, full_refresh_interval=86400):
+        self.projects = {}
+        self.internal_ids = {}
+        self.names = {}
+        self.full_refresh_interval = full_refresh_interval
+        self.refreshed_at = None
+        self.fully_refreshed_at = None
+        if projects is not None:
+            self.update(projects)
+
+    @classmethod
+    def from_api(cls, memsource_api):
+        """
+        Create ProjectIndex from all projects in Memsource
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+
+        Returns:
+            ProjectIndex: index of all projects
+        """
+        index = cls()
+        index.refresh(memsource_api)
+        return index
+
+    def __len__(self):
+        return len(self.projects)
+
+    def __contains__(self, uid):
+        return uid in self.projects
+
+    def __iter__(self):
+        return iter(self.projects.values())
+
+    def update(self, projects):
+        """
+        Add or replace projects in index
+
+        Args:
+            projects (list): project json list
+        """
+        for project in projects:
+            uid = project['uid']
+            if uid in self.projects:
+                self.__unlink(self.projects[uid])
+            self.projects[uid] = project
+            if project.get('internalId') is not None:
+                self.internal_ids[int(project['internalId'])] = uid
+            self.names.setdefault(project.get('name'), []).append(uid)
+
+    def remove(self, uid):
+        """
+        Remove project from index
+
+        Args:
+            uid (str): project uid
+        """
+        project = self.projects.pop(uid, None)
+        if project is not None:
+            self.__unlink(project)
+
+    def refresh(self, memsource_api, full=False):
+        """
+        Fetch projects created after the last refresh and add them to index.
+        Projects renamed, changed status or deleted after they are fetched are not found by this incremental refresh,
+        so all projects are fetched again and the index is rebuilt at the first refresh,
+        after full_refresh_interval or if full is True. use refresh_project or remove for known changes in between.
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+            full (bool, optional): Defaults to False. fetch all projects again
+        """
+        now = time.time()
+        if (full or self.fully_refreshed_at is None
+                or self.full_refresh_interval is not None and now - self.fully_refreshed_at >= self.full_refresh_interval):
+            projects = list(memsource_api.iter_projects())
+            self.projects = {}
+            self.internal_ids = {}
+            self.names = {}
+            self.update(projects)
+            self.fully_refreshed_at = now
+        else:
+            # add one hour for clock skew between client and Memsource
+            created_in_last_hours = math.ceil((now - self.refreshed_at) / 3600) + 1
+            self.update(memsource_api.iter_projects(created_in_last_hours=created_in_last_hours))
+        self.refreshed_at = now
+
+    def refresh_project(self, memsource_api, uid):
+        """
+        Fetch one project again, e.g. after it is renamed
+
+        Args:
+            memsource_api (MemsourceAPI): memsource_api object
+            uid (str): project uid
+        """
+        self.update([memsource_api.get_project(uid)])
+
+    def get_by_uid(self, uid):
+        """
+        Get project by uid
+
+        Args:
+            uid (str): project uid
+
+        Returns:
+            dict or None: project json
+        """
+        return self.projects.get(uid)
+
+    def get_by_internal_id(self, internal_id):
+        """
+        Get project by internal id
+
+        Args:
+            internal_id (str or int): internal id
+
+        Returns:
+            dict or None: project json
+        """
+        uid = self.internal_ids.get(int(internal_id))
+        if uid is None:
+            return None
+        return self.projects[uid]
+
+    def find_by_name(self, name):
+        """
+        Find projects by name
+
+        Args:
+            name (str): project name
+
+        Returns:
+            list: project json list
+        """
+        return [self.projects[uid] for uid in self.names.get(name, [])]
+
+    def __unlink(self, project):
+        internal_id = project.get('internalId')
+        if internal_id is not None and self.internal_ids.get(int(internal_id)) == project['uid']:
+            del self.internal_ids[int(internal_id)]
+        uids = self.names.get(project.get('name'))
+        if uids is not None:
+            uids.remove(project['uid'])
+            if not uids:
+                del self.names[project.get('name')]
@@ -0,0 +1,199 @@
+"""
+This modules is to check mxliff files locally before upload instead of running QA in Memsource
+"""
+import re
+from collections import Counter
+from .mxliff import iter_trans_units
+from .parallel import map_in_processes
+
+TAG_PATTERN = re.compile(r'\{[0-9]+\}|\{[0-9]+&gt;|&lt;[0-9]+\}')
+NUMBER_PATTERN = re.compile('[0-9]+(?:[.,\u00a0\u202f][0-9]+)*')
+NUMBER_SEPARATOR_PATTERN = re.compile('[.,\u00a0\u202f]')
+QA_CHECKS = ("tags", "tag_order", "empty_target", "only_tag", "numbers")
+
+def get_tags(string):
+    """
+    Get tags in segment string
+
+    Args:
+        string (str): escaped segment string such as Segment.string
+
+    Returns:
+        list: tags such as "{1}", "{2>" and "<2}" in order of appearance
+    """
+    return [tag.replace('&gt;', '>').replace('&lt;', '<') for tag in TAG_PATTERN.findall(string)]
+
+def get_numbers(string):
+    """
+    Get numbers in segment string without tags. thousands and decimal separators are ignored
+
+    Args:
+        string (str): escaped segment string
+
+    Returns:
+        Counter: numbers
+    """
+    text = TAG_PATTERN.sub(" ", string)
+    return Counter(NUMBER_SEPARATOR_PATTERN.sub("", number) for number in NUMBER_PATTERN.findall(text))
+
+def check_trans_unit(trans_unit, checks=QA_CHECKS):
+    """
+    Check a trans-unit
+
+    Args:
+        trans_unit (TransUnit): TransUnit object
+        checks (tuple, optional): Defaults to QA_CHECKS. checks to run
+
+    Returns:
+        list: (check, message) tuples of found issues
+    """
+    issues = []
+    source = trans_unit.source.string
+    target = trans_unit.target.string
+    if target.strip() == "":
+        if "empty_target" in checks and source.strip() != "":
+            issues.append(("empty_target", "target is empty"))
+        return issues
+
+    source_tags = get_tags(source)
+    target_tags = get_tags(target)
+    if "tags" in checks and source_tags != target_tags:
+        source_counter = Counter(source_tags)
+        target_counter = Counter(target_tags)
+        missing = list((source_counter - target_counter).elements())
+        extra = list((target_counter - source_counter).elements())
+        if missing:
+            issues.append(("tags", "missing " + " ".join(missing)))
+        if extra:
+            issues.append(("tags", "extra " + " ".join(extra)))
+    if "tag_order" in checks:
+        opened = set()
+        for tag in target_tags:
+            if tag.endswith('>'):
+                opened.add(tag[1:-1])
+            elif tag.startswith('<') and tag[1:-1] not in opened:
+                issues.append(("tag_order", f"{tag} is before {{{tag[1:-1]}>"))
+    if "only_tag" in checks and trans_unit.only_tag and target.strip() != source.strip():
+        issues.append(("only_tag", "target of only tag segment is different from source"))
+    if "numbers" in checks and not trans_unit.only_tag:
+        source_numbers = get_numbers(source)
+        target_numbers = get_numbers(target)
+        if source_numbers != target_numbers:
+            missing = list((source_numbers - target_numbers).elements())
+            extra = list((target_numbers - source_numbers).elements())
+            message = []
+            if missing:
+                message.append("missing " + " ".join(missing))
+            if extra:
+                message.append("extra " + " ".join(extra))
+            issues.append(("numbers", ", ".join(message)))
+    return issues
+
+def qa_mxliff(key, source, checks=QA_CHECKS, max_issues=None):
+    """
+    Check all trans-units of mxliff
+
+    Args:
+        key (str): key of file such as job uid or path
+        source (str or bytes): path, content or file object of mxliff, or Mxliff object
+        checks (tuple, optional): Defaults to QA_CHECKS. checks to run
+        max_issues (int, optional): Defaults to None. max issues kept in result. all issues are counted
+
+    Returns:
+        dict: segments, counts per check and (original, trans-unit id, check, message) issue tuples
+    """
+    segments = 0
+    counts = Counter()
+    issues = []
+    for original, trans_unit in iter_trans_units(source):
+        segments = segments + 1
+        for check, message in check_trans_unit(trans_unit, checks):
+            counts[check] = counts[check] + 1
+            if max_issues is None or len(issues) < max_issues:
+                issues.append((original, trans_unit.trans_unit_id, check, message))
+    return {"key": key, "segments": segments, "counts": dict(counts), "issues": issues}
+
+class QAReport():
+    """
+    Object of local QA result of files
+
+    Args:
+        results (list): results of qa_mxliff
+    """
+
+    def __init__(self, results):
+        self.files = {result['key']: result for result in results}
+
+    @property
+    def counts(self):
+        """
+        Number of issues per check in all files
+
+        Returns:
+            dict: check to number of issues
+        """
+        counts = Counter()
+        for result in self.files.values():
+            counts.update(result['counts'])
+        return dict(counts)
+
+    @property
+    def passed(self):
+        """
+        No issue is found
+
+        Returns:
+            bool: True if no issue is found
+        """
+        return not any(result['counts'] for result in self.files.values())
+
+    def failed_files(self):
+        """
+        Keys of files with issues
+
+        Returns:
+            list: keys of files
+        """
+        return [key for key, result in self.files.items() if result['counts']]
+
+    def to_dict(self):
+        """
+        Convert report to json serializable dict
+
+        Returns:
+            dict: report
+        """
+        return {
+            "passed": self.passed,
+            "segments": sum(result['segments'] for result in self.files.values()),
+            "counts": self.counts,
+            "files": {
+                str(key): {
+                    "segments": result['segments'],
+                    "counts": result['counts'],
+                    "issues": [
+                        {"original": original, "transUnitId": trans_unit_id, "check": check, "message": message}
+                        for original, trans_unit_id, check, message in result['issues']
+                    ],
+                }
+                for key, result in self.files.items() if result['counts']
+            },
+        }
+
+def run_local_qa(sources, workers=None, checks=QA_CHECKS, max_issues_per_file=100):
+    """
+    Check mxliff files in parallel processes
+
+    Args:
+        sources (dict or list): key to path or content of mxliff, or list of paths used as keys
+        workers (int, optional): Defaults to None. processes of map_in_processes
+        checks (tuple, optional): Defaults to QA_CHECKS. checks to run
+        max_issues_per_file (int, optional): Defaults to 100. max issues kept per file. all issues are counted
+
+    Returns:
+        QAReport: report
+    """
+    if not isinstance(sources, dict):
+        sources = {source: source for source in sources}
+    items = [(key, source, tuple(checks), max_issues_per_file) for key, source in sources.items()]
+    return QAReport(map_in_processes(qa_mxliff, items, workers))
@@ -0,0 +1,243 @@
+"""
+This modules is to keep memsource API calls of threads, processes and nodes within rate limits
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket():
+    """
+    Token bucket shared by threads in a process.
+    Tokens are added at rate per second up to burst and each API call takes a token.
+
+    Args:
+        rate (float): tokens per second
+        burst (float, optional): Defaults to None. max tokens. max(1, rate) if None, so rate below 1 can take a token
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(1, rate) if burst is None else burst
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __take(self, tokens):
+        """
+        Take tokens if available
+
+        Args:
+            tokens (float): tokens to take
+
+        Returns:
+            float: 0 if tokens are taken, else seconds until they are available
+        """
+        check_tokens(tokens, self.burst)
+        with self.__lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens = self.tokens - tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens without waiting
+
+        Args:
+            tokens (float, optional): Defaults to 1. tokens to take
+
+        Raises:
+            ValueError: tokens are more than burst
+
+        Returns:
+            bool: True if tokens are taken
+        """
+        return self.__take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Wait until tokens are taken
+
+        Args:
+            tokens (float, optional): Defaults to 1. tokens to take
+            timeout (float, optional): Defaults to None. max seconds to wait. wait forever if None
+
+        Raises:
+            ValueError: tokens are more than burst
+
+        Returns:
+            bool: True if tokens are taken, False if timed out
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.__take(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+class SharedTokenBucket():
+    """
+    Token bucket stored in SQLite and shared by processes and nodes.
+    The database can be on a shared file system with working file locks.
+    The object can be pickled to worker processes and the database is opened again in each process.
+
+    Args:
+        path (str): path of the SQLite database
+        rate (float): tokens per second of all processes
+        burst (float, optional): Defaults to None. max tokens. max(1, rate) if None, so rate below 1 can take a token
+        name (str, optional): Defaults to "memsource". name of bucket. buckets with the same name share tokens
+        max_wait (float, optional): Defaults to 1.0. max seconds to sleep before trying again
+    """
+
+    def __init__(self, path, rate, burst=None, name="memsource", max_wait=1.0):
+        self.path = path
+        self.rate = rate
+        self.burst = max(1, rate) if burst is None else burst
+        self.name = name
+        self.max_wait = max_wait
+        self.__lock = threading.Lock()
+        self.__connection = None
+        self.__pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_SharedTokenBucket__lock'] = None
+        state['_SharedTokenBucket__connection'] = None
+        state['_SharedTokenBucket__pid'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __connect(self):
+        """
+        Open the database once per process
+
+        Returns:
+            sqlite3.Connection: connection in autocommit mode
+        """
+        if self.__connection is None or self.__pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)")
+            self.__connection = connection
+            self.__pid = os.getpid()
+        return self.__connection
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self.__lock:
+            if self.__connection is not None and self.__pid == os.getpid():
+                self.__connection.close()
+            self.__connection = None
+
+    def __take(self, tokens):
+        """
+        Take tokens if available. time.time() is used because the bucket is shared by nodes
+
+        Args:
+            tokens (float): tokens to take
+
+        Returns:
+            float: 0 if tokens are taken, else seconds until they are available
+        """
+        check_tokens(tokens, self.burst)
+        with self.__lock:
+            connection = self.__connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                if row is None:
+                    available = self.burst
+                else:
+                    available = min(self.burst, row[0] + max(0, now - row[1]) * self.rate)
+                if available >= tokens:
+                    available = available - tokens
+                    wait = 0
+                else:
+                    wait = (tokens - available) / self.rate
+                connection.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (self.name, available, now))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return wait
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens without waiting
+
+        Args:
+            tokens (float, optional): Defaults to 1. tokens to take
+
+        Raises:
+            ValueError: tokens are more than burst
+
+        Returns:
+            bool: True if tokens are taken
+        """
+        return self.__take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Wait until tokens are taken
+
+        Args:
+            tokens (float, optional): Defaults to 1. tokens to take
+            timeout (float, optional): Defaults to None. max seconds to wait. wait forever if None
+
+        Raises:
+            ValueError: tokens are more than burst
+
+        Returns:
+            bool: True if tokens are taken, False if timed out
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.__take(tokens)
+            if wait == 0:
+                return True
+            # jitter spreads retries of processes waiting for the same token
+            wait = min(wait, self.max_wait) * random.uniform(1.0, 1.5)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            logger.debug('Waiting %.3fs for rate limit "%s"', wait, self.name)
+            time.sleep(wait)
+
+def check_tokens(tokens, burst):
+    """
+    Check tokens can be taken from bucket
+
+    Args:
+        tokens (float): tokens to take
+        burst (float): max tokens of bucket
+
+    Raises:
+        ValueError: tokens are more than burst. they are never available
+    """
+    if tokens > burst:
+        raise ValueError(f"{tokens} tokens are more than burst {burst}")
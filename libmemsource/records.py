@@ -0,0 +1,188 @@
+"""
+This modules is to parse large list responses into small typed records instead of nested dicts
+"""
+import json
+import sys
+
+class Record():
+    """
+    Base of slotted records created from json objects.
+    Only FIELDS are kept and the other keys and nested objects are dropped after parsing.
+    Values can be read by attribute, or by json key like dict for code written for json.
+    Records keep much less memory than dicts but parsing is not faster, because the json is parsed before conversion.
+
+    KEY is the json key identifying objects of the record. objects without KEY such as page envelope are kept as dict.
+    LIST_KEY is the json key of the object list in the response.
+    INTERNED are json keys of strings repeated in many objects such as status. they are shared with sys.intern
+    """
+    __slots__ = ()
+    KEY = None
+    LIST_KEY = "content"
+    FIELDS = ()
+    INTERNED = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.ATTRIBUTES = dict(zip(cls.FIELDS, cls.__slots__))
+        cls.INTERNED_INDEXES = tuple(cls.FIELDS.index(key) for key in cls.INTERNED)
+
+    @classmethod
+    def from_dict(cls, obj):
+        """
+        Create record from json object
+
+        Args:
+            obj (dict): json object
+
+        Returns:
+            Record: record
+        """
+        values = list(map(obj.get, cls.FIELDS))
+        for index in cls.INTERNED_INDEXES:
+            if isinstance(values[index], str):
+                values[index] = sys.intern(values[index])
+        return cls(*values)
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Parse response body and convert objects in LIST_KEY list to records.
+        bytes are parsed without decoding to str and nested objects are parsed by json without object_hook calls
+
+        Args:
+            data (bytes): json response body. only the first line is parsed
+
+        Returns:
+            dict or list: json whose objects with KEY in LIST_KEY list, or in top level list, are records
+        """
+        end = data.find(b'\n')
+        if end >= 0:
+            data = data[:end]
+        result = json.loads(data)
+        if isinstance(result, dict) and isinstance(result.get(cls.LIST_KEY), list):
+            result[cls.LIST_KEY] = cls.convert(result[cls.LIST_KEY])
+        elif isinstance(result, list):
+            result = cls.convert(result)
+        return result
+
+    @classmethod
+    def convert(cls, objects):
+        """
+        Convert json objects with KEY to records
+
+        Args:
+            objects (list): json objects
+
+        Returns:
+            list: records, and objects without KEY as they are
+        """
+        key = cls.KEY
+        from_dict = cls.from_dict
+        return [from_dict(obj) if isinstance(obj, dict) and key in obj else obj for obj in objects]
+
+    def __getitem__(self, key):
+        attribute = self.ATTRIBUTES.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def __contains__(self, key):
+        return key in self.ATTRIBUTES
+
+    def get(self, key, default=None):
+        """
+        Get value by json key
+
+        Args:
+            key (str): json key such as "internalId"
+            default (optional): Defaults to None. value if key is not a field. same as dict.get
+
+        Returns:
+            value of field. None if the key was missing or null in json
+        """
+        attribute = self.ATTRIBUTES.get(key)
+        if attribute is None:
+            return default
+        return getattr(self, attribute)
+
+    def to_dict(self):
+        """
+        Convert record to json object of FIELDS
+
+        Returns:
+            dict: json object. missing values are None
+        """
+        return {key: getattr(self, attribute) for key, attribute in self.ATTRIBUTES.items()}
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, attribute) == getattr(other, attribute) for attribute in self.__slots__)
+
+    def __repr__(self):
+        values = ", ".join(f"{attribute}={getattr(self, attribute)!r}" for attribute in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+class ProjectRecord(Record):
+    """
+    Record of project in list_projects and iter_projects
+
+    Args:
+        uid (str): project uid
+        internal_id (int): internalId
+        name (str): project name
+        status (str): project status
+        source_lang (str): source language
+        target_langs (list): target languages
+        date_created (str): dateCreated
+        date_modified (str): dateModified
+        date_due (str): dateDue
+    """
+    __slots__ = ('uid', 'internal_id', 'name', 'status', 'source_lang', 'target_langs',
+                 'date_created', 'date_modified', 'date_due')
+    KEY = "internalId"
+    FIELDS = ("uid", "internalId", "name", "status", "sourceLang", "targetLangs",
+              "dateCreated", "dateModified", "dateDue")
+    INTERNED = ("status", "sourceLang")
+
+    def __init__(self, uid, internal_id, name=None, status=None, source_lang=None, target_langs=None,
+                 date_created=None, date_modified=None, date_due=None):
+        self.uid = uid
+        self.internal_id = internal_id
+        self.name = name
+        self.status = status
+        self.source_lang = source_lang
+        self.target_langs = target_langs
+        self.date_created = date_created
+        self.date_modified = date_modified
+        self.date_due = date_due
+
+class JobRecord(Record):
+    """
+    Record of job in list_jobs
+
+    Args:
+        uid (str): job uid
+        inner_id (str): innerId such as "1"
+        status (str): job status
+        filename (str): file name
+        target_lang (str): target language
+        workflow_level (int): workflow level
+        date_due (str): dateDue
+        date_created (str): dateCreated
+    """
+    __slots__ = ('uid', 'inner_id', 'status', 'filename', 'target_lang', 'workflow_level', 'date_due', 'date_created')
+    KEY = "innerId"
+    FIELDS = ("uid", "innerId", "status", "filename", "targetLang", "workflowLevel", "dateDue", "dateCreated")
+    INTERNED = ("status", "targetLang")
+
+    def __init__(self, uid, inner_id, status=None, filename=None, target_lang=None, workflow_level=None,
+                 date_due=None, date_created=None):
+        self.uid = uid
+        self.inner_id = inner_id
+        self.status = status
+        self.filename = filename
+        self.target_lang = target_lang
+        self.workflow_level = workflow_level
+        self.date_due = date_due
+        self.date_created = date_created
@@ -0,0 +1,165 @@
+"""
+This modules is to isolate slow and failing memsource endpoints with hedged requests and circuit breakers
+"""
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class HedgePolicy():
+    """
+    Object deciding when a backup request of idempotent GET is sent.
+    The delay is the percentile of recent latencies of each endpoint.
+
+    Args:
+        percentile (float, optional): Defaults to 95. percentile of recent latencies used as delay
+        default_delay (float, optional): Defaults to 1.0. delay until min_samples latencies are observed
+        min_delay (float, optional): Defaults to 0.05. min delay in seconds
+        max_delay (float, optional): Defaults to None. max delay in seconds
+        window (int, optional): Defaults to 200. number of recent latencies kept per endpoint
+        min_samples (int, optional): Defaults to 20. latencies needed before percentile is used
+        max_workers (int, optional): Defaults to 16. max backup requests running at once. backup is skipped when reached
+    """
+
+    def __init__(self, percentile=95, default_delay=1.0, min_delay=0.05, max_delay=None, window=200, min_samples=20, max_workers=16):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.latencies = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, endpoint, seconds):
+        """
+        Record latency of successful request
+
+        Args:
+            endpoint (str): endpoint name
+            seconds (float): latency
+        """
+        with self.__lock:
+            latencies = self.latencies.get(endpoint)
+            if latencies is None:
+                latencies = self.latencies[endpoint] = collections.deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, endpoint):
+        """
+        Get seconds to wait before sending backup request
+
+        Args:
+            endpoint (str): endpoint name
+
+        Returns:
+            float: delay in seconds
+        """
+        with self.__lock:
+            latencies = self.latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                delay = self.default_delay
+            else:
+                ordered = sorted(latencies)
+                delay = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+        delay = max(delay, self.min_delay)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
+
+class CircuitBreaker():
+    """
+    Object failing fast calls to endpoints which failed continuously.
+    After failure_threshold consecutive failures the endpoint is open and calls are rejected for reset_timeout seconds.
+    Then one trial call is allowed (half open). The endpoint is closed if it succeeds, else open again.
+
+    Args:
+        failure_threshold (int, optional): Defaults to 5. consecutive failures to open
+        reset_timeout (float, optional): Defaults to 30. seconds until trial call is allowed
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.endpoints = {}
+        self.__lock = threading.Lock()
+
+    def __get(self, endpoint):
+        state = self.endpoints.get(endpoint)
+        if state is None:
+            state = self.endpoints[endpoint] = {"state": CLOSED, "failures": 0, "openedAt": None, "trial": False}
+        return state
+
+    def allow(self, endpoint):
+        """
+        Check call to endpoint is allowed
+
+        Args:
+            endpoint (str): endpoint name
+
+        Returns:
+            bool: False if endpoint is open
+        """
+        with self.__lock:
+            state = self.__get(endpoint)
+            if state['state'] == CLOSED:
+                return True
+            if state['state'] == OPEN:
+                if time.monotonic() - state['openedAt'] < self.reset_timeout:
+                    return False
+                state['state'] = HALF_OPEN
+                state['trial'] = False
+            if state['trial']:
+                # trial call is running
+                return False
+            state['trial'] = True
+            return True
+
+    def record_success(self, endpoint):
+        """
+        Record successful call
+
+        Args:
+            endpoint (str): endpoint name
+        """
+        with self.__lock:
+            state = self.__get(endpoint)
+            if state['state'] != CLOSED:
+                logger.info('Circuit of "%s" is closed', endpoint, extra={'endpoint': endpoint})
+            state.update({"state": CLOSED, "failures": 0, "openedAt": None, "trial": False})
+
+    def record_failure(self, endpoint):
+        """
+        Record failed call such as timeout, connection error and 5xx response
+
+        Args:
+            endpoint (str): endpoint name
+        """
+        with self.__lock:
+            state = self.__get(endpoint)
+            state['failures'] = state['failures'] + 1
+            if state['state'] == HALF_OPEN or state['failures'] >= self.failure_threshold:
+                if state['state'] != OPEN:
+                    logger.warning('Circuit of "%s" is open after %s failures', endpoint, state['failures'],
+                                   extra={'endpoint': endpoint})
+                state.update({"state": OPEN, "openedAt": time.monotonic(), "trial": False})
+
+    def get_state(self, endpoint):
+        """
+        Get state of endpoint
+
+        Args:
+            endpoint (str): endpoint name
+
+        Returns:
+            str: CLOSED, OPEN or HALF_OPEN
+        """
+        with self.__lock:
+            return self.__get(endpoint)['state']
@@ -0,0 +1,167 @@
+"""
+This modules is to cache memsource token
+"""
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".libmemsource", "tokens.json")
+
+def parse_expires(value):
+    """
+    Parse expires string of Memsource login response
+
+    Args:
+        value (str): datetime string such as "2021-01-01T00:00:00+0000" or "2021-01-01T00:00:00Z"
+
+    Returns:
+        datetime or None: timezone aware datetime
+    """
+    if not value:
+        return None
+    value = value.replace("Z", "+00:00")
+    # python 3.7 fromisoformat does not accept "+0000" and milliseconds other than 3 or 6 digits
+    value = re.sub(r'([+-]\d\d)(\d\d)$', r'\1:\2', value)
+    value = re.sub(r'\.\d+', "", value)
+    try:
+        expires = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires
+
+class FileTokenCache():
+    """
+    Object caching memsource token to local json file
+
+    Args:
+        path (str, optional): path of the cache file. Defaults to ~/.libmemsource/tokens.json
+    """
+
+    def __init__(self, path=DEFAULT_TOKEN_CACHE_PATH):
+        self.path = path
+
+    def load(self, username):
+        """
+        Load cached token
+
+        Args:
+            username (str): Memsource username
+
+        Returns:
+            tuple or None: (token, expires). expires is datetime or None
+        """
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                tokens = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        entry = tokens.get(username)
+        if entry is None:
+            return None
+        return entry['token'], parse_expires(entry.get('expires'))
+
+    def save(self, username, token, expires):
+        """
+        Save token to cache file
+
+        Args:
+            username (str): Memsource username
+            token (str): Memsource token
+            expires (datetime or None): expiry of token
+        """
+        tokens = self.__read_all()
+        tokens[username] = {
+            "token": token,
+            "expires": expires.isoformat() if expires else None,
+        }
+        self.__write_all(tokens)
+
+    def delete(self, username):
+        """
+        Delete cached token
+
+        Args:
+            username (str): Memsource username
+        """
+        tokens = self.__read_all()
+        if tokens.pop(username, None) is not None:
+            self.__write_all(tokens)
+
+    def __read_all(self):
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def __write_all(self, tokens):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            json.dump(tokens, cache_file)
+        os.replace(temp_path, self.path)
+
+class KeyringTokenCache():
+    """
+    Object caching memsource token to keyring
+
+    Args:
+        service (str, optional): keyring service name. Defaults to "libmemsource".
+    """
+
+    def __init__(self, service="libmemsource"):
+        try:
+            import keyring
+        except ImportError as err:
+            raise ImportError("KeyringTokenCache requires 'keyring' package. pip install keyring") from err
+        self.keyring = keyring
+        self.service = service
+
+    def load(self, username):
+        """
+        Load cached token
+
+        Args:
+            username (str): Memsource username
+
+        Returns:
+            tuple or None: (token, expires). expires is datetime or None
+        """
+        value = self.keyring.get_password(self.service, username)
+        if value is None:
+            return None
+        try:
+            entry = json.loads(value)
+        except ValueError:
+            return None
+        return entry['token'], parse_expires(entry.get('expires'))
+
+    def save(self, username, token, expires):
+        """
+        Save token to keyring
+
+        Args:
+            username (str): Memsource username
+            token (str): Memsource token
+            expires (datetime or None): expiry of token
+        """
+        value = json.dumps({"token": token, "expires": expires.isoformat() if expires else None})
+        self.keyring.set_password(self.service, username, value)
+
+    def delete(self, username):
+        """
+        Delete cached token
+
+        Args:
+            username (str): Memsource username
+        """
+        try:
+            self.keyring.delete_password(self.service, username)
+        except self.keyring.errors.PasswordDeleteError:
+            pass
@@ -0,0 +1,527 @@
+"""
+This modules is to shard bulk job operations across processes and nodes with a shared SQLite work queue
+"""
+import contextlib
+import hashlib
+import importlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from .api import change_uid_to_dict, check_async_is_complete
+from .pipeline import translate_job
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+class Task():
+    """
+    Object of leased task
+
+    Args:
+        task_id (int): task id
+        kind (str): handler name such as "download_mxlf"
+        key (str or None): unique key of task
+        payload (dict): arguments of handler
+        attempts (int): number of leases including this one
+        owner (str): worker holding the lease
+    """
+    __slots__ = ('task_id', 'kind', 'key', 'payload', 'attempts', 'owner')
+
+    def __init__(self, task_id, kind, key, payload, attempts, owner):
+        self.task_id = task_id
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.owner = owner
+
+class WorkQueue():
+    """
+    Object of task queue stored in SQLite.
+    Workers lease tasks for lease_seconds and extend the lease with heartbeat while running.
+    Tasks of crashed workers are leased again after the lease expires.
+    Failed tasks are retried with exponential backoff until max_attempts.
+    The database can be on a shared file system with working file locks to share tasks between nodes.
+
+    Args:
+        path (str): path of the SQLite database
+        lease_seconds (float, optional): Defaults to 300. seconds until lease of a task expires without heartbeat
+        max_attempts (int, optional): Defaults to 3. max leases of a task
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.__lock = threading.Lock()
+        # transactions are started explicitly with BEGIN IMMEDIATE to lease tasks atomically between processes
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self.__transaction():
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " task_id INTEGER PRIMARY KEY,"
+                " key TEXT UNIQUE,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " owner TEXT,"
+                " lease_expires REAL,"
+                " available_at REAL NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " updated_at REAL NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, available_at)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the database
+        """
+        self.connection.close()
+
+    @contextlib.contextmanager
+    def __transaction(self):
+        """
+        Run statements in BEGIN IMMEDIATE transaction. it is committed on success and rolled back on error
+        """
+        with self.__lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def put(self, kind, payload, key=None):
+        """
+        Add task
+
+        Args:
+            kind (str): handler name
+            payload (dict): json serializable arguments of handler
+            key (str, optional): Defaults to None. unique key. task with existing key is not added again
+
+        Returns:
+            bool: True if task is added
+        """
+        now = time.time()
+        with self.__transaction():
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO tasks (key, kind, payload, status, available_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload), PENDING, now, now))
+        return cursor.rowcount == 1
+
+    def lease(self, owner, limit=1):
+        """
+        Lease pending tasks and tasks whose lease is expired
+
+        Args:
+            owner (str): worker name
+            limit (int, optional): Defaults to 1. max tasks
+
+        Returns:
+            list: Task objects
+        """
+        now = time.time()
+        tasks = []
+        with self.__transaction():
+            self.connection.execute(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires = NULL, error = ?, updated_at = ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "lease expired", now, LEASED, now, self.max_attempts))
+            rows = self.connection.execute(
+                "SELECT task_id, kind, key, payload, attempts FROM tasks"
+                " WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)"
+                " ORDER BY task_id LIMIT ?",
+                (PENDING, now, LEASED, now, limit)).fetchall()
+            for task_id, kind, key, payload, attempts in rows:
+                self.connection.execute(
+                    "UPDATE tasks SET status = ?, owner = ?, attempts = ?, lease_expires = ?, updated_at = ? WHERE task_id = ?",
+                    (LEASED, owner, attempts + 1, now + self.lease_seconds, now, task_id))
+                tasks.append(Task(task_id, kind, key, json.loads(payload), attempts + 1, owner))
+        return tasks
+
+    def heartbeat(self, task):
+        """
+        Extend lease of task
+
+        Args:
+            task (Task): leased task
+
+        Returns:
+            bool: False if the lease is lost, e.g. it expired and other worker leased the task
+        """
+        now = time.time()
+        with self.__transaction():
+            cursor = self.connection.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE task_id = ? AND owner = ? AND status = ?",
+                (now + self.lease_seconds, now, task.task_id, task.owner, LEASED))
+        return cursor.rowcount == 1
+
+    def complete(self, task, result=None):
+        """
+        Mark task done
+
+        Args:
+            task (Task): leased task
+            result (dict, optional): Defaults to None. json serializable result
+
+        Returns:
+            bool: False if the lease is lost and the result is not saved
+        """
+        with self.__transaction():
+            cursor = self.connection.execute(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires = NULL, result = ?, error = NULL, updated_at = ?"
+                " WHERE task_id = ? AND owner = ? AND status = ?",
+                (DONE, json.dumps(result), time.time(), task.task_id, task.owner, LEASED))
+        return cursor.rowcount == 1
+
+    def fail(self, task, error, retry_delay=30):
+        """
+        Release task after error. The task is retried after retry_delay * 2 ** (attempts - 1) seconds
+        or marked failed after max_attempts
+
+        Args:
+            task (Task): leased task
+            error (str): error message
+            retry_delay (float, optional): Defaults to 30. seconds before the first retry
+
+        Returns:
+            str: "retried" if the task will be retried, "failed" if it is marked failed,
+                 "lost" if the lease is lost and the task is not changed
+        """
+        now = time.time()
+        retry = task.attempts < self.max_attempts
+        with self.__transaction():
+            cursor = self.connection.execute(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires = NULL, available_at = ?, error = ?, updated_at = ?"
+                " WHERE task_id = ? AND owner = ? AND status = ?",
+                (PENDING if retry else FAILED, now + retry_delay * 2 ** (task.attempts - 1), str(error), now,
+                 task.task_id, task.owner, LEASED))
+        if cursor.rowcount != 1:
+            return "lost"
+        return "retried" if retry else "failed"
+
+    def retry_failed(self, kind=None):
+        """
+        Make failed tasks pending again with attempts reset
+
+        Args:
+            kind (str, optional): Defaults to None. only tasks of kind. all failed tasks if None
+
+        Returns:
+            int: number of tasks
+        """
+        now = time.time()
+        with self.__transaction():
+            cursor = self.connection.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, available_at = ?, updated_at = ?"
+                " WHERE status = ? AND (? IS NULL OR kind = ?)",
+                (PENDING, now, now, FAILED, kind, kind))
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        Count tasks per status
+
+        Returns:
+            dict: status to number of tasks
+        """
+        with self.__lock:
+            rows = self.connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def is_finished(self):
+        """
+        Check no task is pending or leased
+
+        Returns:
+            bool: True if all tasks are done or failed
+        """
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+    def results(self, kind=None):
+        """
+        Iterate finished tasks
+
+        Args:
+            kind (str, optional): Defaults to None. only tasks of kind
+
+        Yields:
+            dict: key, kind, status, payload, result and error of done or failed task
+        """
+        with self.__lock:
+            rows = self.connection.execute(
+                "SELECT key, kind, status, payload, result, error FROM tasks"
+                " WHERE status IN (?, ?) AND (? IS NULL OR kind = ?) ORDER BY task_id",
+                (DONE, FAILED, kind, kind)).fetchall()
+        for key, task_kind, status, payload, result, error in rows:
+            yield {"key": key, "kind": task_kind, "status": status, "payload": json.loads(payload),
+                   "result": None if result is None else json.loads(result), "error": error}
+
+def enqueue_jobs(queue, kind, project_uid, job_uids, batch_size=1, **options):
+    """
+    Add tasks of jobs split into batches. Tasks already in the queue are not added again
+
+    Args:
+        queue (WorkQueue): work queue
+        kind (str): handler name such as "download_mxlf", "pretranslate", "run_qa" or "transform"
+        project_uid (str): project uid
+        job_uids (list): job uids
+        batch_size (int, optional): Defaults to 1. jobs per task
+        options: other payload such as dest_dir of download_mxlf and transform of transform
+
+    Returns:
+        int: number of added tasks
+    """
+    added = 0
+    job_uids = list(job_uids)
+    # tasks with other batches or other options are different tasks
+    options_hash = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    for begin in range(0, len(job_uids), batch_size):
+        batch = job_uids[begin:begin + batch_size]
+        payload = dict(options, projectUid=project_uid, jobUids=batch)
+        key = f"{kind}/{project_uid}/{','.join(sorted(batch))}/{options_hash}"
+        if queue.put(kind, payload, key=key):
+            added = added + 1
+    return added
+
+def resolve_callable(name):
+    """
+    Import callable from name
+
+    Args:
+        name (str): "module:attribute" such as "mypackage.transforms:machine_translate"
+
+    Returns:
+        callable: imported object
+    """
+    module_name, _, attribute = name.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+def download_mxlf_handler(memsource_api, payload):
+    """
+    Download mxlf files of jobs to payload["dest_dir"] as {job uid}.mxliff
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        payload (dict): projectUid, jobUids and dest_dir
+
+    Returns:
+        dict: job uid to downloaded bytes
+    """
+    os.makedirs(payload['dest_dir'], exist_ok=True)
+    result = {}
+    for job_uid in payload['jobUids']:
+        path = os.path.join(payload['dest_dir'], f"{job_uid}.mxliff")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as stream:
+                result[job_uid] = memsource_api.download_mxlf_file(payload['projectUid'], job_uid, stream=stream)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return result
+
+def pretranslate_handler(memsource_api, payload):
+    """
+    Pretranslate jobs using TM. payload["wait"] waits until the async request is complete
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        payload (dict): projectUid, jobUids and wait
+
+    Returns:
+        dict: asyncRequestId
+    """
+    result = memsource_api.pretranslate_using_tm(payload['projectUid'], list(map(change_uid_to_dict, payload['jobUids'])))
+    async_req_id = result['asyncRequest']['id']
+    if payload.get('wait'):
+        check_async_is_complete(memsource_api, async_req_id)
+    return {"asyncRequestId": async_req_id}
+
+def run_qa_handler(memsource_api, payload):
+    """
+    Run batch QA of jobs
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        payload (dict): projectUid and jobUids
+
+    Returns:
+        json: qa result
+    """
+    return memsource_api.run_qa_batch(payload['projectUid'], payload['jobUids'])
+
+def transform_handler(memsource_api, payload):
+    """
+    Run translate_job for jobs with payload["transform"]
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        payload (dict): projectUid, jobUids and transform name such as "mypackage.transforms:machine_translate"
+
+    Returns:
+        dict: job uid to number of changed segments
+    """
+    transform = resolve_callable(payload['transform'])
+    return {job_uid: translate_job(memsource_api, payload['projectUid'], job_uid, transform)['segments']
+            for job_uid in payload['jobUids']}
+
+DEFAULT_HANDLERS = {
+    "download_mxlf": download_mxlf_handler,
+    "pretranslate": pretranslate_handler,
+    "run_qa": run_qa_handler,
+    "transform": transform_handler,
+}
+
+def new_owner():
+    """
+    Create unique worker name
+
+    Returns:
+        str: hostname, process id and random suffix
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def run_worker(queue_path, api_factory, handlers=None, lease_seconds=300, max_attempts=3, retry_delay=30,
+               poll_interval=1.0, idle_timeout=0, max_tasks=None):
+    """
+    Run tasks of queue until no task is pending or leased.
+    The lease is extended by a heartbeat thread every lease_seconds / 3 while a handler is running.
+
+    Args:
+        queue_path (str): path of WorkQueue database
+        api_factory (callable): api_factory() returning MemsourceAPI. called once before the first task
+        handlers (dict, optional): Defaults to DEFAULT_HANDLERS. kind to handler(memsource_api, payload) returning json result
+        lease_seconds (float, optional): Defaults to 300. lease of task
+        max_attempts (int, optional): Defaults to 3. max leases of a task
+        retry_delay (float, optional): Defaults to 30. seconds before the first retry of failed task
+        poll_interval (float, optional): Defaults to 1.0. seconds between polls while tasks are leased by other workers
+        idle_timeout (float, optional): Defaults to 0. seconds to keep polling after the queue is finished
+        max_tasks (int, optional): Defaults to None. stop after running max_tasks
+
+    Returns:
+        dict: owner and numbers of done, retried, failed and lost tasks
+    """
+    handlers = DEFAULT_HANDLERS if handlers is None else handlers
+    owner = new_owner()
+    stats = {"owner": owner, "done": 0, "retried": 0, "failed": 0, "lost": 0}
+    memsource_api = None
+    idle_since = None
+    with WorkQueue(queue_path, lease_seconds, max_attempts) as queue:
+        while max_tasks is None or stats['done'] + stats['retried'] + stats['failed'] + stats['lost'] < max_tasks:
+            tasks = queue.lease(owner)
+            if not tasks:
+                if queue.is_finished():
+                    idle_since = time.monotonic() if idle_since is None else idle_since
+                    if time.monotonic() - idle_since >= idle_timeout:
+                        break
+                # pending tasks wait for backoff or other workers hold leases which may expire
+                time.sleep(poll_interval)
+                continue
+            idle_since = None
+            task = tasks[0]
+            if memsource_api is None:
+                memsource_api = api_factory()
+            stats[run_task(queue, task, memsource_api, handlers, retry_delay)] += 1
+    logger.info('Worker %s finished: %s', owner, stats)
+    return stats
+
+def run_task(queue, task, memsource_api, handlers, retry_delay=30):
+    """
+    Run leased task with heartbeat and save the result
+
+    Args:
+        queue (WorkQueue): work queue
+        task (Task): leased task
+        memsource_api (MemsourceAPI): memsource_api object
+        handlers (dict): kind to handler
+        retry_delay (float, optional): Defaults to 30. seconds before the first retry
+
+    Returns:
+        str: "done", "retried", "failed" or "lost"
+    """
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def beat():
+        while not stop.wait(queue.lease_seconds / 3):
+            if not queue.heartbeat(task):
+                lost.set()
+                return
+
+    heartbeat = threading.Thread(target=beat, daemon=True)
+    heartbeat.start()
+    try:
+        handler = handlers[task.kind]
+        logger.info('Running task %s "%s" (attempt %s)', task.task_id, task.key, task.attempts, extra={'uid': task.key})
+        result = handler(memsource_api, task.payload)
+    except Exception as err:
+        stop.set()
+        heartbeat.join()
+        outcome = queue.fail(task, f"{type(err).__name__}: {err}", retry_delay)
+        if outcome == "retried":
+            logger.warning('Task %s "%s" failed and will be retried: %s', task.task_id, task.key, err, extra={'uid': task.key})
+        elif outcome == "failed":
+            logger.error('Task %s "%s" failed: %s', task.task_id, task.key, err, extra={'uid': task.key})
+        else:
+            logger.warning('Lease of task %s "%s" was lost. The error is discarded: %s', task.task_id, task.key, err, extra={'uid': task.key})
+        return outcome
+    stop.set()
+    heartbeat.join()
+    if lost.is_set() or not queue.complete(task, result):
+        logger.warning('Lease of task %s "%s" was lost. The result is discarded', task.task_id, task.key, extra={'uid': task.key})
+        return "lost"
+    return "done"
+
+def run_local(queue_path, api_factory, workers=None, **worker_options):
+    """
+    Run workers in local processes. Run the same on other nodes sharing queue_path to add workers.
+    api_factory and handlers must be picklable, e.g. functools.partial(MemsourceAPI, username, password,
+    token_cache=FileTokenCache(), rate_limiter=SharedTokenBucket(path, rate)) so that
+    processes share the token and stay within the rate limit together.
+
+    Args:
+        queue_path (str): path of WorkQueue database
+        api_factory (callable): api_factory() returning MemsourceAPI in each process
+        workers (int, optional): Defaults to None. processes. os.cpu_count() if None
+        worker_options: other arguments of run_worker
+
+    Returns:
+        dict: total numbers of done, retried, failed and lost tasks and stats per worker
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, queue_path, api_factory, **worker_options) for _ in range(workers)]
+        all_stats = [future.result() for future in futures]
+    total = {"done": 0, "retried": 0, "failed": 0, "lost": 0}
+    for stats in all_stats:
+        for name in total:
+            total[name] = total[name] + stats[name]
+    total['workers'] = all_stats
+    return total
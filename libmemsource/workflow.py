@@ -0,0 +1,237 @@
+"""
+This modules is to run resumable per job workflows using memsource API
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .api import check_async_is_complete
+
+logger = logging.getLogger(__name__)
+
+class WorkflowException(Exception):
+    """Workflow Exception"""
+    def __init__(self, message):
+        self.message = message
+
+class CheckpointStore():
+    """
+    Object storing completed workflow tasks to SQLite
+
+    Args:
+        path (str): path of the SQLite database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " workflow TEXT NOT NULL,"
+                " job_uid TEXT NOT NULL,"
+                " stage TEXT NOT NULL,"
+                " result TEXT,"
+                " completed_at REAL NOT NULL,"
+                " PRIMARY KEY (workflow, job_uid, stage))")
+
+    def load(self, workflow):
+        """
+        Load completed tasks of workflow
+
+        Args:
+            workflow (str): workflow name
+
+        Returns:
+            dict: (job uid, stage name) to stage result
+        """
+        with self.__lock:
+            rows = self.connection.execute(
+                "SELECT job_uid, stage, result FROM checkpoints WHERE workflow = ?", (workflow,)).fetchall()
+        return {(job_uid, stage): json.loads(result) for job_uid, stage, result in rows}
+
+    def save(self, workflow, job_uid, stage, result):
+        """
+        Save completed task
+
+        Args:
+            workflow (str): workflow name
+            job_uid (str): job uid
+            stage (str): stage name
+            result (json): json serializable stage result
+        """
+        with self.__lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (workflow, job_uid, stage, json.dumps(result), time.time()))
+
+    def clear(self, workflow):
+        """
+        Delete all tasks of workflow
+
+        Args:
+            workflow (str): workflow name
+        """
+        with self.__lock, self.connection:
+            self.connection.execute("DELETE FROM checkpoints WHERE workflow = ?", (workflow,))
+
+    def close(self):
+        """
+        Close database
+        """
+        self.connection.close()
+
+class Stage():
+    """
+    Object of a stage run for each job
+
+    Args:
+        name (str): stage name
+        func (callable): func(memsource_api, project_uid, job_uid, results) returning json serializable result.
+                         results is dict of stage name to result of the stages in depends_on
+        depends_on (list, optional): Defaults to None. names of stages which must be completed before this stage
+    """
+
+    def __init__(self, name, func, depends_on=None):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+
+class Workflow():
+    """
+    Object running stages for each job as DAG.
+    Jobs progress independently and completed tasks are skipped when the workflow is run again.
+
+    Args:
+        memsource_api (MemsourceAPI): memsource_api object
+        project_uid (str): project uid
+        stages (list): Stage objects. stages must be listed after the stages they depend on
+        checkpoint_store (CheckpointStore): checkpoint store
+        name (str, optional): Defaults to project_uid. workflow name in checkpoint store
+        workers (int, optional): Defaults to 4. concurrent tasks
+    """
+
+    def __init__(self, memsource_api, project_uid, stages, checkpoint_store, name=None, workers=4):
+        self.memsource_api = memsource_api
+        self.project_uid = project_uid
+        self.stages = {}
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise WorkflowException(f'Stage "{stage.name}" depends on unknown stage "{dependency}"')
+            self.stages[stage.name] = stage
+        self.checkpoint_store = checkpoint_store
+        self.name = name or project_uid
+        self.workers = workers
+
+    def run(self, job_uids):
+        """
+        Run all stages of jobs
+
+        Args:
+            job_uids (list): job uids
+
+        Raises:
+            WorkflowException: some tasks are failed. completed tasks are saved to checkpoint store
+
+        Returns:
+            dict: job uid to dict of stage name to result
+        """
+        completed = self.checkpoint_store.load(self.name)
+        results = {job_uid: {} for job_uid in job_uids}
+        for (job_uid, stage), result in completed.items():
+            if job_uid in results:
+                results[job_uid][stage] = result
+        skipped = sum(len(stages) for stages in results.values())
+        if skipped:
+            logger.info('Skipping %s completed tasks of workflow "%s"...', skipped, self.name, extra={'uid': self.project_uid})
+
+        failures = {}
+        started = set(completed)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            def submit_ready_tasks(job_uid):
+                for stage in self.stages.values():
+                    if (job_uid, stage.name) in started:
+                        continue
+                    if all(dependency in results[job_uid] for dependency in stage.depends_on):
+                        started.add((job_uid, stage.name))
+                        dependencies = {dependency: results[job_uid][dependency] for dependency in stage.depends_on}
+                        future = executor.submit(stage.func, self.memsource_api, self.project_uid, job_uid, dependencies)
+                        futures[future] = (job_uid, stage.name)
+
+            for job_uid in job_uids:
+                submit_ready_tasks(job_uid)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_uid, stage = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as err:
+                        # dependent stages of the job are not run, the other jobs continue
+                        logger.error('Stage "%s" of "%s" is failed: %s', stage, job_uid, err, extra={'uid': job_uid})
+                        failures.setdefault(job_uid, {})[stage] = str(err)
+                        continue
+                    self.checkpoint_store.save(self.name, job_uid, stage, result)
+                    results[job_uid][stage] = result
+                    submit_ready_tasks(job_uid)
+        if failures:
+            raise WorkflowException({"failedTasks": failures, "results": results})
+        return results
+
+def pretranslate_analyse_download_stages(dest_dir, target_file_format="ORIGINAL"):
+    """
+    Create stages of pretranslate, analysis and target file download.
+    analysis and target file download run in parallel after pretranslate.
+
+    Args:
+        dest_dir (str): directory to save analysis and target files
+        target_file_format (str, optional): Defaults to "ORIGINAL". Enum: "ORIGINAL" "PDF"
+
+    Returns:
+        list: Stage objects
+    """
+
+    def pretranslate(memsource_api, project_uid, job_uid, results):
+        result = memsource_api.pretranslate_using_tm(project_uid, [{"uid": job_uid}])
+        async_req_id = result['asyncRequest']['id']
+        check_async_is_complete(memsource_api, async_req_id)
+        return async_req_id
+
+    def create_analysis(memsource_api, project_uid, job_uid, results):
+        result = memsource_api.create_analysis([job_uid])
+        async_request = result['asyncRequests'][0]
+        check_async_is_complete(memsource_api, async_request['asyncRequest']['id'])
+        return async_request['analyse']['id']
+
+    def download_analysis(memsource_api, project_uid, job_uid, results):
+        path = os.path.join(dest_dir, job_uid, "analysis.csv")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # csv is not returned as body, so it is written to the file in chunks
+        with open(path, "wb") as analysis_file:
+            memsource_api.download_analysis(results['analysis'], stream=analysis_file)
+        return path
+
+    def download_target(memsource_api, project_uid, job_uid, results):
+        job = memsource_api.get_job(project_uid, job_uid)
+        result = memsource_api.download_target_file_async(project_uid, job_uid)
+        async_req_id = result['asyncRequest']['id']
+        check_async_is_complete(memsource_api, async_req_id)
+        path = os.path.join(dest_dir, job_uid, os.path.basename(job['filename']))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target_file:
+            memsource_api.download_target_file_based_on_async_request(
+                project_uid, job_uid, async_req_id, target_file_format, stream=target_file)
+        return path
+
+    return [
+        Stage("pretranslate", pretranslate),
+        Stage("analysis", create_analysis, depends_on=["pretranslate"]),
+        Stage("download_analysis", download_analysis, depends_on=["analysis"]),
+        Stage("download_target", download_target, depends_on=["pretranslate"]),
+    ]
@@ -0,0 +1,32 @@
+"""
+Tests of analysis csv reader
+"""
+import codecs
+import csv
+import io
+
+import pytest
+
+from libmemsource import analysis
+from libmemsource.analysis import iter_csv_lines, read_analysis
+from libmemsource.api import MemsourceAPI
+from libmemsource.mock_server import MockMemsourceServer
+
+def test_iter_csv_lines_splits_like_newline_empty():
+    data = '﻿"a";"b c"\r\n"x\ny";"z"\n"last";"row"'.encode("utf-8")
+    expected = list(csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline=""), delimiter=";"))
+    for chunk_size in (1, 3, 1024):
+        reader = codecs.getreader("utf-8-sig")(io.BytesIO(data))
+        assert list(csv.reader(iter_csv_lines(reader, chunk_size), delimiter=";")) == expected
+    assert expected[0] == ["a", "b c"]
+
+@pytest.mark.parametrize("spool_size", [10, 1024 * 1024])
+def test_read_analysis_from_memory_and_file(monkeypatch, spool_size):
+    monkeypatch.setattr(analysis, "SPOOL_SIZE", spool_size)
+    with MockMemsourceServer(projects=1, jobs_per_project=3) as server:
+        memsource_api = MemsourceAPI("user", "password", base_url=server.base_url)
+        project_uid = next(iter(server.projects))
+        job_uids = [job['uid'] for job in memsource_api.list_jobs(project_uid)['content']]
+        analysis_id = memsource_api.create_analysis(job_uids)['asyncRequests'][0]['analyse']['id']
+        table = read_analysis(memsource_api, analysis_id)
+    assert len(table) == 3
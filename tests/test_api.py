@@ -0,0 +1,143 @@
+"""
+Tests of MemsourceAPI with mock server
+"""
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+
+import pytest
+
+from libmemsource.api import APIException, MemsourceAPI
+from libmemsource.metrics import MetricsCollector
+from libmemsource.mock_server import MockMemsourceServer
+from libmemsource.resilience import HedgePolicy
+
+@pytest.fixture
+def server():
+    with MockMemsourceServer(projects=1, jobs_per_project=4, segments_per_job=5) as mock_server:
+        yield mock_server
+
+@pytest.fixture
+def memsource_api(server):
+    return MemsourceAPI("user", "password", base_url=server.base_url)
+
+def replace_route(server, name, handler):
+    server.routes = [(method, pattern, handler if route.__name__ == name else route)
+                     for method, pattern, route in server.routes]
+
+def serve_archive(server, members):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for name, content in members:
+            zip_file.writestr(name, content)
+    replace_route(server, "download_bilingual_file",
+                  lambda query, body, headers, project: (200, archive.getvalue(), "application/octet-stream"))
+
+def test_download_mxlf_files_names_files_by_job_uid(server, memsource_api, tmp_path):
+    project_uid = next(iter(server.projects))
+    job_uids = [job['uid'] for job in memsource_api.list_jobs(project_uid)['content']]
+    paths = memsource_api.download_mxlf_files(project_uid, job_uids, str(tmp_path), batch_size=3)
+    assert paths == {job_uid: os.path.join(str(tmp_path), f"{job_uid}.mxliff") for job_uid in job_uids}
+    for job_uid, path in paths.items():
+        with open(path, "rb") as mxlf_file:
+            assert f'm:job-uid="{job_uid}"'.encode("utf-8") in mxlf_file.read()
+
+def test_download_mxlf_files_keeps_same_file_names_without_job_uid(server, memsource_api, tmp_path):
+    serve_archive(server, [("a/file.mxliff", b"<xliff/>"), ("b/file.mxliff", b"<xliff/>")])
+    paths = memsource_api.download_mxlf_files("p", ["j1", "j2"], str(tmp_path))
+    assert sorted(paths) == ["a/file.mxliff", "b/file.mxliff"]
+
+@pytest.mark.parametrize("members", [
+    [("file.mxliff", b'<xliff m:job-uid="../../escaped">')],
+    [("file.mxliff", b'<xliff m:job-uid="">')],
+    [("../escaped.mxliff", b"<xliff/>")],
+    [("/tmp/escaped.mxliff", b"<xliff/>")],
+    [("file.mxliff", b'<xliff m:job-uid="j1">'), ("other.mxliff", b'<xliff m:job-uid="j1">')],
+])
+def test_download_mxlf_files_rejects_unsafe_names(server, memsource_api, tmp_path, members):
+    dest_dir = tmp_path / "dest"
+    serve_archive(server, members)
+    with pytest.raises(APIException):
+        memsource_api.download_mxlf_files("p", ["j1", "j2"], str(dest_dir))
+    assert not (tmp_path / "escaped.mxliff").exists()
+    assert not [name for name in os.listdir(dest_dir) if name.endswith(".part")]
+
+def test_download_mxlf_files_removes_part_file_of_broken_archive(server, memsource_api, tmp_path):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("file.mxliff", b'<xliff m:job-uid="j1">' * 100)
+    data = bytearray(archive.getvalue())
+    data[data.find(b"<xliff") + 1] ^= 1
+    replace_route(server, "download_bilingual_file",
+                  lambda query, body, headers, project: (200, bytes(data), "application/octet-stream"))
+    with pytest.raises(zipfile.BadZipFile):
+        memsource_api.download_mxlf_files("p", ["j1", "j2"], str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+def test_create_jobs_from_directory_appends_manifest_and_resumes(server, memsource_api, tmp_path, monkeypatch):
+    project_uid = next(iter(server.projects))
+    root = tmp_path / "source"
+    for name in ("a.txt", "sub/b.txt", "sub/c.txt"):
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name, encoding="utf-8")
+    manifest_path = str(root / "manifest.jsonl")
+
+    create_job = MemsourceAPI.create_job
+    calls = []
+    broken = {"sub/c.txt"}
+    def failing_create_job(self, source_file_path, *args, **kwargs):
+        relative_path = os.path.relpath(source_file_path, str(root)).replace(os.sep, "/")
+        calls.append(relative_path)
+        if relative_path in broken:
+            raise RuntimeError("broken file")
+        return create_job(self, source_file_path, *args, **kwargs)
+    monkeypatch.setattr(MemsourceAPI, "create_job", failing_create_job)
+
+    with pytest.raises(APIException) as error:
+        memsource_api.create_jobs_from_directory(project_uid, str(root), ["de"], manifest_path=manifest_path, delay=0)
+    assert list(error.value.message['failedFiles']) == ["sub/c.txt"]
+    assert sorted(calls) == ["a.txt", "sub/b.txt", "sub/c.txt"]
+
+    # crash while writing a line
+    with open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        manifest_file.write('{"path": "sub/')
+    calls.clear()
+    broken.clear()
+    manifest = memsource_api.create_jobs_from_directory(project_uid, str(root), ["de"], manifest_path=manifest_path, delay=0)
+    assert calls == ["sub/c.txt"]
+    assert sorted(manifest) == ["a.txt", "sub/b.txt", "sub/c.txt"]
+    assert all(len(job_uids) == 1 for job_uids in manifest.values())
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        lines = manifest_file.read().splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[-1])['path'] == "sub/c.txt"
+
+class FailingMetricsCollector(MetricsCollector):
+    def record_call(self, *args, **kwargs):
+        raise RuntimeError("metrics backend is down")
+
+    def record_retry(self, endpoint):
+        raise RuntimeError("metrics backend is down")
+
+def test_failing_metrics_collector_does_not_fail_calls(server, caplog):
+    project_uid = next(iter(server.projects))
+    calls = []
+    def get_project(query, body, headers, project):
+        calls.append(project)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return 200, {"uid": project}, "application/json"
+    replace_route(server, "get_project", get_project)
+
+    hedge = HedgePolicy(default_delay=0.05, min_delay=0.05)
+    with caplog.at_level(logging.WARNING, logger="libmemsource.api"):
+        memsource_api = MemsourceAPI("user", "password", base_url=server.base_url,
+                                     metrics=FailingMetricsCollector(), hedge=hedge)
+        assert memsource_api.get_project(project_uid)['uid'] == project_uid
+        with pytest.raises(APIException):
+            memsource_api.get_job(project_uid, "missing")
+    assert len(calls) == 2
+    assert "Failed to record metrics" in caplog.text
@@ -0,0 +1,77 @@
+"""
+Tests of callback receiver
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from libmemsource.callback import CallbackReceiver, CallbackTimeoutException
+
+@pytest.fixture
+def receiver():
+    with CallbackReceiver(host="127.0.0.1", early_ttl=60, max_early=3) as callback_receiver:
+        yield callback_receiver
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    with urllib.request.urlopen(request) as response:
+        return response.getcode()
+
+def test_wildcard_host_requires_public_url():
+    with pytest.raises(ValueError):
+        CallbackReceiver()
+    receiver = CallbackReceiver(public_url="https://example.com/callback?client=1", secret="s")
+    assert receiver.url == "https://example.com/callback?client=1&token=s"
+
+def test_callback_without_valid_token_is_rejected(receiver):
+    for url in (receiver.base_url, receiver.base_url + "?token=wrong"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(url, {"asyncRequest": {"id": 1}})
+        assert error.value.code == 403
+    assert not receiver.early
+    assert post(receiver.url, {"asyncRequest": {"id": 1}}) == 200
+    assert receiver.wait(("async", 1), timeout=1) == {"asyncRequest": {"id": 1}}
+
+def test_early_callbacks_are_bounded_and_create_no_future(receiver):
+    for async_id in range(10):
+        post(receiver.url, {"asyncRequest": {"id": async_id}})
+    assert receiver.futures == {}
+    assert list(receiver.early) == [("async", "7"), ("async", "8"), ("async", "9")]
+    assert receiver.wait(("async", 9), timeout=1) == {"asyncRequest": {"id": 9}}
+    assert receiver.futures == {}
+    with pytest.raises(CallbackTimeoutException):
+        receiver.wait(("async", 0), timeout=0.1)
+
+def test_discard_keeps_future_of_other_waiter(receiver):
+    results = []
+    waiting = threading.Event()
+    def wait():
+        future = receiver.expect(("job", "j1"))
+        waiting.set()
+        try:
+            results.append(future.result(timeout=5))
+        finally:
+            receiver.discard(("job", "j1"))
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    waiting.wait()
+    with pytest.raises(CallbackTimeoutException):
+        receiver.wait(("job", "j1"), timeout=0.1)
+    assert ("job", "j1") in receiver.futures
+
+    post(receiver.url, {"jobParts": [{"uid": "j1"}]})
+    thread.join()
+    assert results == [{"jobParts": [{"uid": "j1"}]}]
+    assert receiver.futures == {}
+    assert receiver.waiters == {}
+
+def test_wait_polls_without_callback(receiver):
+    polls = []
+    def poll():
+        polls.append(1)
+        return {"done": True} if len(polls) == 2 else None
+    assert receiver.wait(("async", 5), timeout=0.05, poll=poll, poll_interval=0.01) == {"done": True}
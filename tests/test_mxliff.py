@@ -0,0 +1,87 @@
+"""
+Tests of streaming rewrite of mxliff
+"""
+import io
+import os
+import sys
+
+import pytest
+
+from libmemsource import mxliff
+from libmemsource.mxliff import Mxliff
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from mxliff_corpus import generate_mxliff  # noqa: E402
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" xmlns:m="http://www.memsource.com/mxlf/2.0" '
+          'version="1.2">\n<!-- comment <trans-unit> -->\n'
+          '<file original="a&amp;b.docx" source-language="en" target-language="ja" m:job-uid="j1">\n<body>\n')
+UNITS = [
+    ('1', '<source>A &amp; B {1&gt;bold&lt;1}</source><target xml:lang="ja">A &amp; B {1&gt;bold&lt;1}</target>'),
+    ('2', '<source>caf&#233; &lt;x&gt; {2}</source><target/>'),
+    ('3', '<source>no target &quot;quoted&quot;</source>'),
+    ('4', '<seg-source><mrk mtype="seg">x</mrk></seg-source><target>日本 &#x1F600;</target>'),
+    ('5', '<source>kept</source><target>kept &amp; same</target>'),
+]
+FOOTER = '</body>\n</file>\n</xliff>\n'
+REWRITTEN_UNITS = [
+    ('1', '<source>A &amp; B {1&gt;bold&lt;1}</source><target xml:lang="ja">新 &amp; {1&gt;x&lt;1}</target>'),
+    ('2', '<source>caf&#233; &lt;x&gt; {2}</source><target>新 &amp; {2}</target>'),
+    ('3', '<source>no target &quot;quoted&quot;</source><target>新 &amp; {2}</target>'),
+    ('4', '<seg-source><mrk mtype="seg">x</mrk></seg-source><target>新 &amp; {2}</target>'),
+    UNITS[4],
+]
+
+def create_mxliff(units):
+    return (HEADER + "".join(f'<group id="{trans_unit_id}"><trans-unit id="{trans_unit_id}" m:confirmed="0">'
+                             f'{content}</trans-unit></group>\n' for trans_unit_id, content in units)
+            + FOOTER).encode("utf-8")
+
+def new_target(trans_unit):
+    if trans_unit.trans_unit_id == '1':
+        return '新 &amp; {1&gt;x&lt;1}'
+    if trans_unit.trans_unit_id in ('2', '3', '4'):
+        return '新 &amp; {2}'
+    return None
+
+@pytest.fixture(params=[1, 7, 64, 1024 * 1024])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(mxliff, "REWRITE_CHUNK_SIZE", request.param)
+    return request.param
+
+def test_rewrite_without_change_copies_bytes(chunk_size):
+    source = create_mxliff(UNITS)
+    dst = io.BytesIO()
+    assert Mxliff.rewrite(io.BytesIO(source), dst, lambda trans_unit: None) == 0
+    assert dst.getvalue() == source
+
+def test_rewrite_replaces_only_targets(chunk_size):
+    source = create_mxliff(UNITS)
+    expected = create_mxliff(REWRITTEN_UNITS)
+    seen = []
+    def target_fn(trans_unit):
+        seen.append((trans_unit.trans_unit_id, trans_unit.source.string))
+        return new_target(trans_unit)
+    dst = io.BytesIO()
+    assert Mxliff.rewrite(io.BytesIO(source), dst, target_fn) == 4
+    assert dst.getvalue() == expected
+    assert seen[0] == ('1', 'A &amp; B {1&gt;bold&lt;1}')
+    assert [trans_unit_id for trans_unit_id, _ in seen] == ['1', '2', '3', '4', '5']
+
+    result = Mxliff(io.BytesIO(dst.getvalue()))
+    targets = [trans_unit.target.string for trans_unit in result.files[0].trans_units]
+    assert targets[:4] == ['新 &amp; {1&gt;x&lt;1}'] + ['新 &amp; {2}'] * 3
+    assert targets[4] == 'kept &amp; same'
+
+def test_rewrite_corpus_with_paths(chunk_size, tmp_path):
+    src = tmp_path / "src.mxliff"
+    dst = tmp_path / "dst.mxliff"
+    generate_mxliff(str(src), trans_units=50, files=2, seed=1)
+    assert Mxliff.rewrite(str(src), str(dst), lambda trans_unit: None) == 0
+    assert dst.read_bytes() == src.read_bytes()
+
+def test_rewrite_rejects_unclosed_trans_unit(chunk_size):
+    source = create_mxliff(UNITS)
+    with pytest.raises(ValueError):
+        Mxliff.rewrite(io.BytesIO(source[:source.rfind(b'</trans-unit>')]), io.BytesIO(), new_target)
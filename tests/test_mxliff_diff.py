@@ -0,0 +1,71 @@
+"""
+Tests of diff of mxliff files
+"""
+from libmemsource.mxliff_diff import ADDED, REMOVED, SOURCE_CHANGED, TARGET_CHANGED, diff_mxliff, summarize_diff
+
+def create_mxliff(files):
+    content = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" xmlns:m="http://www.memsource.com/mxlf/2.0" '
+               'version="1.2">\n')
+    for original, units in files.items():
+        content = content + f'<file original="{original}" source-language="en" target-language="ja"><body>\n'
+        for trans_unit_id, (source, target, confirmed) in units.items():
+            content = content + (f'<group><trans-unit id="{trans_unit_id}" m:confirmed="{confirmed}">'
+                                 f'<source>{source}</source><target>{target}</target></trans-unit></group>\n')
+        content = content + '</body></file>\n'
+    return (content + '</xliff>\n').encode("utf-8")
+
+OLD = {
+    "a.docx": {
+        "1": ("same", "同じ", 1),
+        "2": ("old source {1}", "古い", 1),
+        "3": ("target", "古い {1&gt;x&lt;1}", 0),
+        "4": ("both", "古い", 0),
+        "5": ("removed", "削除", 0),
+    },
+    "b.docx": {
+        "1": ("other file", "別", 0),
+    },
+}
+NEW = {
+    "a.docx": {
+        "1": ("same", "同じ", 0),
+        "2": ("new source {1}", "古い", 1),
+        "3": ("target", "新しい {1&gt;x&lt;1}", 0),
+        "4": ("both changed", "新しい", 0),
+        "6": ("added &amp; new", "", 0),
+    },
+    "b.docx": {
+        "1": ("other file", "別", 0),
+        "2": ("added", "追加", 0),
+    },
+}
+
+def test_diff_mxliff_finds_each_kind():
+    diffs = {(diff.original, diff.trans_unit_id): diff for diff in diff_mxliff(create_mxliff(OLD), create_mxliff(NEW))}
+    assert {key: (diff.kind, diff.target_changed) for key, diff in diffs.items()} == {
+        ("a.docx", "2"): (SOURCE_CHANGED, False),
+        ("a.docx", "3"): (TARGET_CHANGED, True),
+        ("a.docx", "4"): (SOURCE_CHANGED, True),
+        ("a.docx", "6"): (ADDED, True),
+        ("b.docx", "2"): (ADDED, True),
+        ("a.docx", "5"): (REMOVED, False),
+    }
+    assert (diffs[("a.docx", "2")].source, diffs[("a.docx", "2")].target) == ("new source {1}", "古い")
+    assert diffs[("a.docx", "3")].target == "新しい {1&gt;x&lt;1}"
+    assert (diffs[("a.docx", "6")].source, diffs[("a.docx", "6")].target) == ("added &amp; new", "")
+    assert diffs[("a.docx", "5")].to_dict() == {
+        "kind": REMOVED, "original": "a.docx", "transUnitId": "5", "source": None, "target": None, "targetChanged": False,
+    }
+
+def test_diff_mxliff_yields_removed_at_end_and_summarizes(tmp_path):
+    old_path = tmp_path / "old.mxliff"
+    new_path = tmp_path / "new.mxliff"
+    old_path.write_bytes(create_mxliff(OLD))
+    new_path.write_bytes(create_mxliff(NEW))
+    diffs = list(diff_mxliff(str(old_path), str(new_path)))
+    assert diffs[-1].kind == REMOVED
+    assert summarize_diff(diffs) == {ADDED: 2, REMOVED: 1, SOURCE_CHANGED: 2, TARGET_CHANGED: 1}
+
+def test_diff_mxliff_of_same_file_is_empty():
+    assert list(diff_mxliff(create_mxliff(OLD), create_mxliff(OLD))) == []
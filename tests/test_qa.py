@@ -0,0 +1,56 @@
+"""
+Tests of local QA of mxliff files
+"""
+from libmemsource.qa import run_local_qa
+
+UNITS = {
+    "ok": ("Page 1.5 of {1&gt;10&lt;1}", "ページ 1,5 / {1&gt;10&lt;1}"),
+    "empty": ("text", ""),
+    "missing_tag": ("a {1} b {2}", "a b {2}"),
+    "extra_tag": ("a {1}", "a {1} {3}"),
+    "tag_order": ("{1&gt;bold&lt;1}", "&lt;1}bold{1&gt;"),
+    "only_tag": ("{1}", "{1} x"),
+    "numbers": ("1,000 apples and 2", "1000 りんご 3"),
+}
+
+def create_mxliff(units):
+    content = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<xliff xmlns="urn:oasis:names:tc:xliff:document:1.2" xmlns:m="http://www.memsource.com/mxlf/2.0" '
+               'version="1.2">\n<file original="a.docx" source-language="en" target-language="ja"><body>\n')
+    for trans_unit_id, (source, target) in units.items():
+        content = content + (f'<group><trans-unit id="{trans_unit_id}">'
+                             f'<source>{source}</source><target>{target}</target></trans-unit></group>\n')
+    return (content + '</body></file>\n</xliff>\n').encode("utf-8")
+
+def test_each_check_fires():
+    report = run_local_qa({"job": create_mxliff(UNITS)}, workers=1)
+    issues = [(trans_unit_id, check, message) for _, trans_unit_id, check, message in report.files["job"]['issues']]
+    assert issues == [
+        ("empty", "empty_target", "target is empty"),
+        ("missing_tag", "tags", "missing {1}"),
+        ("extra_tag", "tags", "extra {3}"),
+        ("tag_order", "tag_order", "<1} is before {1>"),
+        ("only_tag", "only_tag", "target of only tag segment is different from source"),
+        ("numbers", "numbers", "missing 2, extra 3"),
+    ]
+    assert report.counts == {"empty_target": 1, "tags": 2, "tag_order": 1, "only_tag": 1, "numbers": 1}
+    assert not report.passed
+    assert report.files["job"]['segments'] == len(UNITS)
+
+def test_checks_can_be_selected_and_issues_are_limited():
+    report = run_local_qa({"job": create_mxliff(UNITS)}, workers=1, checks=("tags", "numbers"), max_issues_per_file=1)
+    assert report.counts == {"tags": 2, "numbers": 1}
+    assert len(report.files["job"]['issues']) == 1
+
+def test_files_are_checked_in_processes(tmp_path):
+    paths = []
+    for name, units in (("ok", {"1": UNITS["ok"]}), ("ng", {"1": UNITS["numbers"]})):
+        path = tmp_path / f"{name}.mxliff"
+        path.write_bytes(create_mxliff(units))
+        paths.append(str(path))
+    report = run_local_qa(paths, workers=2)
+    assert report.failed_files() == [paths[1]]
+    result = report.to_dict()
+    assert list(result['files']) == [paths[1]]
+    assert result['segments'] == 2
+    assert result['files'][paths[1]]['issues'][0]['check'] == "numbers"
@@ -0,0 +1,61 @@
+"""
+Tests of rate_limit
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from libmemsource.rate_limit import SharedTokenBucket, TokenBucket
+
+def test_slow_rate_can_take_a_token():
+    bucket = TokenBucket(0.5)
+    assert bucket.burst == 1
+    assert bucket.acquire(timeout=3)
+    assert not bucket.try_acquire()
+
+def test_acquire_waits_for_rate():
+    bucket = TokenBucket(20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        assert bucket.acquire()
+    assert time.monotonic() - start >= 0.15
+
+def test_acquire_times_out():
+    bucket = TokenBucket(1)
+    assert bucket.try_acquire()
+    assert not bucket.acquire(timeout=0.1)
+
+@pytest.mark.parametrize("bucket_type", [TokenBucket, SharedTokenBucket])
+def test_tokens_over_burst_are_rejected(bucket_type, tmp_path):
+    if bucket_type is SharedTokenBucket:
+        bucket = SharedTokenBucket(str(tmp_path / "bucket.sqlite"), 5, burst=2)
+    else:
+        bucket = TokenBucket(5, burst=2)
+    with pytest.raises(ValueError):
+        bucket.acquire(3)
+    with pytest.raises(ValueError):
+        bucket.try_acquire(3)
+
+def take_tokens(bucket, count):
+    for _ in range(count):
+        bucket.acquire()
+    return count
+
+def test_shared_bucket_is_shared_by_processes(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / "bucket.sqlite"), 0.001, burst=2)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(take_tokens, bucket, 2).result() == 2
+    assert not bucket.try_acquire()
+    bucket.close()
+
+def test_shared_bucket_limits_rate_of_two_processes(tmp_path):
+    rate = 20
+    bucket = SharedTokenBucket(str(tmp_path / "bucket.sqlite"), rate, burst=1, max_wait=0.05)
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        taken = sum(executor.map(take_tokens, [bucket, bucket], [10, 10]))
+    elapsed = time.monotonic() - start
+    assert taken == 20
+    # the first token is in the bucket and the others are added at rate
+    assert elapsed >= (taken - 1) / rate * 0.9
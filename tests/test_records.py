@@ -0,0 +1,30 @@
+"""
+Tests of records
+"""
+import json
+
+from libmemsource.records import JobRecord, ProjectRecord
+
+def test_loads_converts_objects_in_content():
+    body = json.dumps({"totalPages": 1, "pageNumber": 0, "content": [
+        {"uid": "p1", "internalId": 1, "name": "Project", "status": "NEW", "owner": {"uid": "u1"}, "dateDue": None},
+    ]}).encode("utf-8") + b"\nignored"
+    result = ProjectRecord.loads(body)
+    assert result['totalPages'] == 1
+    [project] = result['content']
+    assert isinstance(project, ProjectRecord)
+    assert project.uid == project['uid'] == "p1"
+    assert project.to_dict()['name'] == "Project"
+    assert "owner" not in project
+
+def test_loads_converts_top_level_list_and_keeps_other_objects():
+    body = json.dumps([{"uid": "j1", "innerId": "1"}, {"uid": "x"}]).encode("utf-8")
+    job, other = JobRecord.loads(body)
+    assert job == JobRecord("j1", "1")
+    assert other == {"uid": "x"}
+
+def test_get_returns_stored_none_and_default_for_unknown_key():
+    project = ProjectRecord.from_dict({"uid": "p1", "internalId": 1, "dateDue": None})
+    assert project.get("uid", "default") == "p1"
+    assert project.get("dateDue", "default") is None
+    assert project.get("owner", "default") == "default"
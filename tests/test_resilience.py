@@ -0,0 +1,123 @@
+"""
+Tests of circuit breaker and hedged requests with mock server
+"""
+import threading
+import time
+
+import pytest
+
+from libmemsource.api import CircuitOpenException, MemsourceAPI, ServerErrorException
+from libmemsource.mock_server import MockMemsourceServer
+from libmemsource.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HedgePolicy
+
+ENDPOINT = "GET v1/projects/{}"
+
+@pytest.fixture
+def server():
+    with MockMemsourceServer(projects=1, jobs_per_project=1) as mock_server:
+        yield mock_server
+
+@pytest.fixture
+def project_uid(server):
+    return next(iter(server.projects))
+
+def replace_route(server, name, handler):
+    server.routes = [(method, pattern, handler if route.__name__ == name else route)
+                     for method, pattern, route in server.routes]
+
+def test_circuit_opens_and_recovers_after_trial_call(server, project_uid):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    memsource_api = MemsourceAPI("user", "password", base_url=server.base_url, circuit_breaker=breaker)
+    server.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(ServerErrorException):
+            memsource_api.get_project(project_uid)
+    assert breaker.get_state(ENDPOINT) == OPEN
+
+    requests = server.requests
+    with pytest.raises(CircuitOpenException):
+        memsource_api.get_project(project_uid)
+    assert server.requests == requests
+
+    # failed trial call opens the circuit again
+    time.sleep(0.25)
+    with pytest.raises(ServerErrorException):
+        memsource_api.get_project(project_uid)
+    assert breaker.get_state(ENDPOINT) == OPEN
+    with pytest.raises(CircuitOpenException):
+        memsource_api.get_project(project_uid)
+
+    time.sleep(0.25)
+    server.error_rate = 0.0
+    assert breaker.allow(ENDPOINT)
+    assert breaker.get_state(ENDPOINT) == HALF_OPEN
+    # only one trial call at once
+    assert not breaker.allow(ENDPOINT)
+    breaker.record_failure(ENDPOINT)
+    time.sleep(0.25)
+    assert memsource_api.get_project(project_uid)['uid'] == project_uid
+    assert breaker.get_state(ENDPOINT) == CLOSED
+
+def test_non_http_error_is_recorded_as_failure(server, project_uid):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    memsource_api = MemsourceAPI("user", "password", base_url=server.base_url, circuit_breaker=breaker)
+    routes = server.routes
+    replace_route(server, "get_project", lambda query, body, headers, project: (200, "{broken", "application/json"))
+    with pytest.raises(ValueError):
+        memsource_api.get_project(project_uid)
+    assert breaker.get_state(ENDPOINT) == OPEN
+
+    # failed trial call must not leave the trial running
+    time.sleep(0.15)
+    with pytest.raises(ValueError):
+        memsource_api.get_project(project_uid)
+    assert breaker.get_state(ENDPOINT) == OPEN
+    time.sleep(0.15)
+    server.routes = routes
+    assert memsource_api.get_project(project_uid)['uid'] == project_uid
+    assert breaker.get_state(ENDPOINT) == CLOSED
+
+def test_backup_request_is_sent_after_delay_and_first_response_wins(server, project_uid):
+    calls = []
+    lock = threading.Lock()
+    def get_project(query, body, headers, project):
+        with lock:
+            calls.append(time.monotonic())
+            first = len(calls) == 1
+        if first:
+            time.sleep(1.0)
+        return 200, {"uid": project, "name": "slow" if first else "backup"}, "application/json"
+    replace_route(server, "get_project", get_project)
+
+    hedge = HedgePolicy(default_delay=0.1, min_delay=0.1)
+    memsource_api = MemsourceAPI("user", "password", base_url=server.base_url, hedge=hedge)
+    api_calls = memsource_api.api_calls
+    start = time.monotonic()
+    result = memsource_api.get_project(project_uid)
+    elapsed = time.monotonic() - start
+
+    assert result['name'] == "backup"
+    assert elapsed < 0.8
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.09
+    assert memsource_api.api_calls == api_calls + 2
+
+def test_backup_requests_are_skipped_over_max_workers(server, project_uid):
+    calls = []
+    lock = threading.Lock()
+    def get_project(query, body, headers, project):
+        with lock:
+            calls.append(project)
+        time.sleep(0.5)
+        return 200, {"uid": project}, "application/json"
+    replace_route(server, "get_project", get_project)
+
+    hedge = HedgePolicy(default_delay=0.05, min_delay=0.05, max_workers=1)
+    memsource_api = MemsourceAPI("user", "password", base_url=server.base_url, hedge=hedge)
+    threads = [threading.Thread(target=memsource_api.get_project, args=(project_uid,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 3 requests and 1 backup request
+    assert len(calls) == 4
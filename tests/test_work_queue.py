@@ -0,0 +1,134 @@
+"""
+Tests of work_queue with temporary SQLite database and mock server
+"""
+import functools
+import os
+import time
+
+import pytest
+
+from libmemsource.api import MemsourceAPI
+from libmemsource.mock_server import MockMemsourceServer
+from libmemsource.work_queue import DONE, FAILED, LEASED, PENDING, WorkQueue, enqueue_jobs, run_worker
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.sqlite")
+
+def available_at(queue, task):
+    return queue.connection.execute("SELECT available_at FROM tasks WHERE task_id = ?", (task.task_id,)).fetchone()[0]
+
+def make_available(queue):
+    # skip backoff without waiting
+    queue.connection.execute("UPDATE tasks SET available_at = 0 WHERE status = ?", (PENDING,))
+
+def test_enqueue_jobs_keys_by_all_job_uids_and_options(queue_path):
+    with WorkQueue(queue_path) as queue:
+        assert enqueue_jobs(queue, "download_mxlf", "p1", ["j1", "j2", "j3"], batch_size=2, dest_dir="a") == 2
+        assert enqueue_jobs(queue, "download_mxlf", "p1", ["j1", "j2", "j3"], batch_size=2, dest_dir="a") == 0
+        # same first job in other batch or with other options is other task
+        assert enqueue_jobs(queue, "download_mxlf", "p1", ["j1"], dest_dir="a") == 1
+        assert enqueue_jobs(queue, "download_mxlf", "p1", ["j2", "j1"], dest_dir="b", batch_size=2) == 1
+        assert enqueue_jobs(queue, "download_mxlf", "p1", ["j2", "j1"], dest_dir="a", batch_size=2) == 0
+        assert queue.counts()[PENDING] == 4
+
+def test_expired_lease_is_leased_again_and_late_worker_is_rejected(queue_path):
+    with WorkQueue(queue_path, lease_seconds=0.2) as queue:
+        queue.put("kind", {"value": 1})
+        [first] = queue.lease("worker-1")
+        assert first.attempts == 1
+        assert queue.lease("worker-2") == []
+
+        time.sleep(0.3)
+        [second] = queue.lease("worker-2")
+        assert second.task_id == first.task_id
+        assert second.attempts == 2
+
+        assert not queue.heartbeat(first)
+        assert not queue.complete(first, {"from": "worker-1"})
+        assert queue.fail(first, "late error") == "lost"
+        assert queue.counts()[LEASED] == 1
+
+        assert queue.complete(second, {"from": "worker-2"})
+        [result] = queue.results()
+        assert result['status'] == DONE
+        assert result['result'] == {"from": "worker-2"}
+
+def test_heartbeat_keeps_lease(queue_path):
+    with WorkQueue(queue_path, lease_seconds=0.3) as queue:
+        queue.put("kind", {})
+        [task] = queue.lease("worker-1")
+        for _ in range(3):
+            time.sleep(0.15)
+            assert queue.heartbeat(task)
+        assert queue.lease("worker-2") == []
+        assert queue.complete(task)
+
+def test_fail_backs_off_until_max_attempts(queue_path):
+    with WorkQueue(queue_path, max_attempts=3) as queue:
+        queue.put("kind", {})
+        for attempt, delay in ((1, 10), (2, 20)):
+            [task] = queue.lease("worker")
+            assert task.attempts == attempt
+            before = time.time()
+            assert queue.fail(task, "error", retry_delay=10) == "retried"
+            assert before + delay <= available_at(queue, task) <= time.time() + delay
+            assert queue.lease("worker") == []
+            make_available(queue)
+
+        [task] = queue.lease("worker")
+        assert task.attempts == 3
+        assert queue.fail(task, "last error", retry_delay=10) == "failed"
+        make_available(queue)
+        assert queue.lease("worker") == []
+        [result] = queue.results()
+        assert result['status'] == FAILED
+        assert result['error'] == "last error"
+
+        assert queue.retry_failed() == 1
+        [task] = queue.lease("worker")
+        assert task.attempts == 1
+
+def test_expired_lease_of_last_attempt_is_failed(queue_path):
+    with WorkQueue(queue_path, lease_seconds=0.1, max_attempts=1) as queue:
+        queue.put("kind", {})
+        [task] = queue.lease("worker-1")
+        time.sleep(0.2)
+        assert queue.lease("worker-2") == []
+        assert queue.counts()[FAILED] == 1
+        assert not queue.complete(task)
+
+def test_run_worker_downloads_mxlf_files(queue_path, tmp_path):
+    dest_dir = str(tmp_path / "mxliff")
+    with MockMemsourceServer(projects=1, jobs_per_project=5) as server:
+        memsource_api = MemsourceAPI("user", "password", base_url=server.base_url)
+        project_uid = next(iter(server.projects))
+        job_uids = [job['uid'] for job in memsource_api.list_jobs(project_uid)['content']]
+        with WorkQueue(queue_path) as queue:
+            assert enqueue_jobs(queue, "download_mxlf", project_uid, job_uids, batch_size=2, dest_dir=dest_dir) == 3
+
+        api_factory = functools.partial(MemsourceAPI, "user", "password", base_url=server.base_url)
+        stats = run_worker(queue_path, api_factory, poll_interval=0.01)
+
+    assert stats['done'] == 3
+    assert sorted(os.listdir(dest_dir)) == sorted(f"{job_uid}.mxliff" for job_uid in job_uids)
+    with WorkQueue(queue_path) as queue:
+        assert queue.is_finished()
+        assert all(result['status'] == DONE for result in queue.results("download_mxlf"))
+
+def test_run_worker_retries_failed_handler(queue_path):
+    calls = []
+    def flaky(memsource_api, payload):
+        calls.append(payload['value'])
+        if len(calls) == 1:
+            raise RuntimeError("temporary error")
+        return {"value": payload['value']}
+
+    with WorkQueue(queue_path) as queue:
+        queue.put("flaky", {"value": 1})
+    stats = run_worker(queue_path, lambda: None, handlers={"flaky": flaky}, retry_delay=0.01, poll_interval=0.01)
+    assert stats['retried'] == 1
+    assert stats['done'] == 1
+    with WorkQueue(queue_path) as queue:
+        [result] = queue.results()
+    assert result['result'] == {"value": 1}
@@ -0,0 +1,29 @@
+"""
+Tests of workflow with mock server
+"""
+import os
+
+from libmemsource.api import MemsourceAPI
+from libmemsource.mock_server import MockMemsourceServer
+from libmemsource.workflow import CheckpointStore, Workflow, pretranslate_analyse_download_stages
+
+def test_pretranslate_analyse_download_stages(tmp_path):
+    dest_dir = str(tmp_path / "out")
+    with MockMemsourceServer(projects=1, jobs_per_project=2) as server:
+        memsource_api = MemsourceAPI("user", "password", base_url=server.base_url)
+        project_uid = next(iter(server.projects))
+        job_uids = [job['uid'] for job in memsource_api.list_jobs(project_uid)['content']]
+        store = CheckpointStore(str(tmp_path / "checkpoint.sqlite"))
+        stages = pretranslate_analyse_download_stages(dest_dir)
+        results = Workflow(memsource_api, project_uid, stages, store).run(job_uids)
+
+        calls = memsource_api.api_calls
+        # completed tasks are skipped
+        assert Workflow(memsource_api, project_uid, stages, store).run(job_uids) == results
+        assert memsource_api.api_calls == calls
+        store.close()
+
+    for job_uid in job_uids:
+        with open(results[job_uid]['download_analysis'], "rb") as analysis_file:
+            assert analysis_file.read().startswith(b'"Analysis";')
+        assert os.path.getsize(results[job_uid]['download_target']) > 0